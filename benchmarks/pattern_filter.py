@@ -0,0 +1,51 @@
+"""
+Micro-benchmark for ``PatternFilter`` with the default exclude list.
+
+Events are a mix of excluded (``/proc``, ``/sys``, uid 0) and passed ones,
+the result is events/s on one core.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/pattern_filter.py [events]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from collections import namedtuple
+
+from duetector.filters.pattern import PatternFilter
+from duetector.log import logger
+
+data_t = namedtuple("OpenTracking", ["pid", "uid", "gid", "comm", "fname", "timestamp"])
+
+EVENTS = [
+    data_t(pid=1000, uid=1000, gid=1000, comm="python", fname="/proc/self/stat", timestamp=0),
+    data_t(pid=1000, uid=1000, gid=1000, comm="python", fname="/sys/fs/cgroup", timestamp=0),
+    data_t(pid=1000, uid=0, gid=0, comm="systemd", fname="/var/log/syslog", timestamp=0),
+    data_t(pid=1000, uid=1000, gid=1000, comm="python", fname="/home/u/data.csv", timestamp=0),
+    data_t(pid=1000, uid=1000, gid=1000, comm="vim", fname="/tmp/a", timestamp=0),
+    data_t(pid=os.getpid(), uid=1000, gid=1000, comm="duetector", fname="/tmp/b", timestamp=0),
+]
+
+
+def main(events: int = 500000):
+    logger.remove()
+    f = PatternFilter()
+    batch = EVENTS * (events // len(EVENTS))
+
+    start = time.perf_counter()
+    passed = sum(1 for data in batch if f(data))
+    elapsed = time.perf_counter() - start
+    print(
+        f"PatternFilter: {len(batch)} events, {passed} passed, "
+        f"{len(batch) / elapsed:.0f} events/s, {elapsed / len(batch) * 1e9:.0f} ns/event"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
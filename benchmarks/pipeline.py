@@ -0,0 +1,237 @@
+"""
+Benchmark for the monitor -> collector path.
+
+Compare the baseline path, which builds a validated pydantic ``Tracking`` on the hot path
+and submits each event to a collector's own thread pool,
+with the current path, which builds a slotted ``TrackingRecord``
+and converts it once for all collectors.
+
+The baseline is a copy of the implementation before ``TrackingRecord``,
+so changes to ``Tracking``, ``Monitor`` or collectors do not leak into it.
+
+For each path, time and ``tracemalloc`` allocations per event are reported:
+bytes and blocks still allocated after the events (each tracking is kept by the collector),
+and the peak bytes while handling them.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/pipeline.py [events]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from duetector.collectors.models import Tracking, TrackingRecord
+from duetector.log import logger
+from duetector.monitors.base import Monitor
+from duetector.tracers.dummy import DummyTracer
+
+CONFIG = {
+    "filter": {"disabled": True},
+    "injector": {"disabled": True},
+    "collector": {
+        "include_extension": False,
+        "dbcollector": {"disabled": True},
+        "otelcollector": {"disabled": True},
+        "dequecollector": {"disabled": False, "queue": {"max_size": 0}},
+    },
+}
+
+MAXLEN = 1024
+"""
+Trackings kept by each collector, allocations are measured with fewer events than this
+"""
+
+
+def baseline_from_namedtuple(tracer, data) -> Tracking | None:
+    """
+    ``Tracking.from_namedtuple`` of the baseline.
+    """
+    tracer_name = getattr(data, "tracer_name", None)
+    if not tracer_name:
+        if isinstance(tracer, type):
+            tracer_name = getattr(tracer, "__name__")
+        elif isinstance(tracer, str):
+            tracer_name = tracer
+        else:
+            tracer_name = getattr(tracer, "name", tracer.__class__.__name__)
+
+    tracer_name = tracer_name.lower()
+    args: dict[str, Any] = {
+        "tracer": tracer_name,
+        "extended": {},
+    }
+    for field in data._fields:
+        k, v = Tracking.normalize_field(field, getattr(data, field))
+        if k in Tracking.model_fields:
+            args[k] = v
+        else:
+            args["extended"][k] = v
+
+    if not args.get("cwd"):
+        try:
+            args["cwd"] = open(f"/proc/{args['pid']}/cwd").read()
+        except Exception:
+            pass
+    try:
+        return Tracking(**args)
+    except ValueError:
+        return None
+
+
+def baseline_patch(data, patch_kwargs: dict[str, Any]):
+    """
+    ``Injector.patch`` of the baseline, a new namedtuple type for each event.
+    """
+    fields = set(data._fields + tuple(patch_kwargs.keys()))
+    new_data_t = namedtuple(data.__class__.__name__, fields)
+    param: dict = data._asdict()
+    for k, v in patch_kwargs.items():
+        param.setdefault(k, v)
+    return new_data_t(**param)
+
+
+class BaselineDequeCollector:
+    """
+    ``DequeCollector`` of the baseline, each event is converted on the hot path
+    and submitted to the collector's own thread pool.
+    """
+
+    def __init__(self):
+        self._backend = ThreadPoolExecutor(max_workers=10)
+        self._trackings: dict[str, deque[Tracking]] = {}
+
+    def emit(self, tracer, data):
+        return self._backend.submit(self._emit, baseline_from_namedtuple(tracer, data))
+
+    def _emit(self, t: Tracking):
+        self._trackings.setdefault(t.tracer, deque(maxlen=MAXLEN))
+        self._trackings[t.tracer].append(t)
+
+    def shutdown(self):
+        self._backend.shutdown()
+
+
+class BaselineMonitor:
+    """
+    ``Monitor`` callback of the baseline, without injectors and filters as in ``CONFIG``.
+    """
+
+    def __init__(self):
+        self.collectors = [BaselineDequeCollector()]
+
+    def _get_callback_fn(self, tracer) -> Callable:
+        def _(data):
+            data = baseline_patch(data, {})
+            for collector in self.collectors:
+                collector.emit(tracer, data)
+
+        return _
+
+    def shutdown(self):
+        for c in self.collectors:
+            c.shutdown()
+
+
+class CurrentMonitor:
+    """
+    ``Monitor`` with ``CONFIG``.
+    """
+
+    def __init__(self):
+        self.monitor = Monitor(CONFIG)
+        self.collectors = self.monitor.collectors
+
+    def _get_callback_fn(self, tracer) -> Callable:
+        return self.monitor._get_callback_fn(tracer)
+
+    def shutdown(self):
+        for c in self.collectors:
+            c.shutdown()
+
+
+def _allocations(run: Callable[[int], Any], events: int) -> tuple[float, float, float]:
+    """
+    Bytes and blocks per event still allocated after ``run(events)``, and peak bytes per event.
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    kept = run(events)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    size = sum(d.size_diff for d in diff)
+    count = sum(d.count_diff for d in diff)
+    del kept
+    return size / events, count / events, (peak - base) / events
+
+
+def _report(name: str, ns: float, allocations: tuple[float, float, float], extra: str = ""):
+    size, count, peak = allocations
+    print(
+        f"{name:<28}{ns:>10.0f} ns/event{extra}"
+        f"{size:>10.0f} B/event{count:>8.1f} blocks/event{peak:>10.0f} peak B/event"
+    )
+
+
+def bench_build(name: str, build: Callable, events: int):
+    tracer = DummyTracer()
+    data = DummyTracer.get_dummy_data()
+
+    start = time.perf_counter_ns()
+    for _ in range(events):
+        build(tracer, data)
+    ns = (time.perf_counter_ns() - start) / events
+
+    allocations = _allocations(lambda n: [build(tracer, data) for _ in range(n)], MAXLEN // 2)
+    _report(name, ns, allocations)
+
+
+def bench_monitor(name: str, monitor_cls: type, events: int):
+    tracer = DummyTracer()
+    data = DummyTracer.get_dummy_data()
+
+    m = monitor_cls()
+    callback = m._get_callback_fn(tracer)
+    start = time.perf_counter_ns()
+    for _ in range(events):
+        callback(data)
+    hot_path = (time.perf_counter_ns() - start) / events
+    m.shutdown()
+    total = (time.perf_counter_ns() - start) / events
+
+    def _run(n: int):
+        m = monitor_cls()
+        callback = m._get_callback_fn(tracer)
+        for _ in range(n):
+            callback(data)
+        m.shutdown()
+        return m
+
+    allocations = _allocations(_run, MAXLEN // 2)
+    _report(name, hot_path, allocations, f"{total:>10.0f} ns/event (total)")
+
+
+def main(events: int = 100000):
+    logger.remove()
+    print(f"Events: {events}")
+    bench_build("Tracking (baseline)", baseline_from_namedtuple, events)
+    bench_build("Tracking.from_namedtuple", Tracking.from_namedtuple, events)
+    bench_build("TrackingRecord", TrackingRecord.from_namedtuple, events)
+    bench_monitor("Monitor (baseline)", BaselineMonitor, events)
+    bench_monitor("Monitor (current)", CurrentMonitor, events)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
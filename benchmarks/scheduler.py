@@ -0,0 +1,128 @@
+"""
+Benchmark for executor layouts of monitors and collectors.
+
+Three monitors are polled concurrently, each tracer emits a burst of events per poll
+to a ``DequeCollector`` and a batched ``DBCollector``.
+
+- before: every monitor and every collector owns a ``ThreadPoolExecutor(max_workers=10)``
+  and each monitor has its own collectors
+- after: monitors share one ``PipelineRuntime``, polling uses ``Scheduler``'s ``poll`` lane,
+  ``DequeCollector`` emits inline and ``DBCollector`` uses the ``emit`` lane
+- batch: as ``after``, with monitor's batch mode, events of one poll go through the pipeline together
+
+Reports peak thread count, context switches (``getrusage``) and events/s.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/scheduler.py [events_per_poll] [polls]
+"""
+
+from __future__ import annotations
+
+import copy
+import resource
+import sys
+import threading
+import time
+
+from duetector.log import logger
+from duetector.monitors.base import Monitor
+from duetector.monitors.pipeline import PipelineRuntime
+from duetector.tracers.dummy import DummyTracer
+
+MONITORS = 3
+TRACERS = 3
+
+CONFIG = {
+    "filter": {"disabled": True},
+    "injector": {"disabled": True},
+    "tracer": {"disabled": True},
+    "collector": {
+        "include_extension": False,
+        "otelcollector": {"disabled": True},
+        "dequecollector": {"disabled": False, "maxlen": 1024, "queue": {"max_size": 0}},
+        "dbcollector": {
+            "disabled": False,
+            "queue": {"max_size": 0},
+            "batch": {"enabled": True},
+            "db": {"engine": {"url": "sqlite:///:memory:"}},
+        },
+    },
+}
+
+
+def _config(executor: str, collectors: dict[str, str], batch: bool = False) -> dict:
+    config = copy.deepcopy(CONFIG)
+    config["monitor"] = {"executor": executor, "batch": {"enabled": batch}}
+    for name, mode in collectors.items():
+        config["collector"][name]["executor"] = mode
+    return config
+
+
+LAYOUTS = {
+    "before": _config("dedicated", {"dequecollector": "dedicated", "dbcollector": "dedicated"}),
+    "after": _config("pooled", {"dequecollector": "inline", "dbcollector": "pooled"}),
+    "batch": _config("pooled", {"dequecollector": "inline", "dbcollector": "pooled"}, batch=True),
+}
+
+
+class BurstMonitor(Monitor):
+    """
+    Each poll of a tracer emits ``events`` events.
+    """
+
+    events = 1000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracers = [type(f"DummyTracer{i}", (DummyTracer,), {})() for i in range(TRACERS)]
+        self.data = DummyTracer.get_dummy_data()
+
+    def poll(self, tracer):
+        callback = self._get_callback_fn(tracer)
+        for _ in range(self.events):
+            callback(self.data)
+
+
+def _context_switches() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_nvcsw + usage.ru_nivcsw
+
+
+def bench(name: str, events: int, polls: int):
+    config = LAYOUTS[name]
+    BurstMonitor.events = events
+    runtime = PipelineRuntime(config) if name != "before" else None
+    monitors = [BurstMonitor(config, runtime=runtime) for _ in range(MONITORS)]
+
+    peak_threads = threading.active_count()
+    switches = _context_switches()
+    start = time.perf_counter()
+    for _ in range(polls):
+        results = [m.poll_all() for m in monitors]
+        for r in results:
+            list(r)
+        peak_threads = max(peak_threads, threading.active_count())
+    for m in monitors:
+        m.shutdown()
+    elapsed = time.perf_counter() - start
+    switches = _context_switches() - switches
+
+    total = events * polls * MONITORS * TRACERS
+    print(
+        f"{name:<8}{peak_threads:>10} threads{switches:>12} ctx switches"
+        f"{total / elapsed:>14.0f} events/s"
+    )
+
+
+def main(events: int = 1000, polls: int = 20):
+    logger.remove()
+    print(f"{MONITORS} monitors x {TRACERS} tracers, {events} events per poll, {polls} polls")
+    for name in LAYOUTS:
+        bench(name, events, polls)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""
+Benchmark for running the pipeline in worker processes.
+
+One monitor, each poll of its tracer emits a burst of events with distinct pids,
+going through ``PatternFilter`` and a ``DequeCollector``.
+Compares ``workers.processes`` = 0 (pipeline in monitor's process) with worker processes.
+
+Reports events/s, measured until ``shutdown`` returns, so all events are collected.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/workers.py [events_per_poll] [polls]
+"""
+
+from __future__ import annotations
+
+import copy
+import sys
+import time
+
+from duetector.log import logger
+from duetector.monitors.base import Monitor
+from duetector.tracers.dummy import DummyTracer
+
+CONFIG = {
+    "filter": {"patternfilter": {"ignore_current_pid": False, "re_exclude_fname": ["^/proc"]}},
+    "injector": {"disabled": True},
+    "tracer": {"disabled": True},
+    "collector": {
+        "include_extension": False,
+        "otelcollector": {"disabled": True},
+        "dbcollector": {"disabled": True},
+        "dequecollector": {"disabled": False, "maxlen": 1024, "executor": "inline"},
+    },
+}
+
+
+class BurstMonitor(Monitor):
+    """
+    Each poll of the tracer emits ``events`` events.
+    """
+
+    events = 10000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracers = [DummyTracer()]
+        data = DummyTracer.get_dummy_data()
+        self.data = [data._replace(pid=pid) for pid in range(64)]
+
+    def poll(self, tracer):
+        callback = self._get_callback_fn(tracer)
+        data = self.data
+        for i in range(self.events):
+            callback(data[i % 64])
+
+
+def bench(processes: int, events: int, polls: int):
+    config = copy.deepcopy(CONFIG)
+    config["monitor"] = {"batch": {"enabled": True}, "workers": {"processes": processes}}
+    BurstMonitor.events = events
+    monitor = BurstMonitor(config)
+
+    start = time.perf_counter()
+    for _ in range(polls):
+        list(monitor.poll_all())
+    monitor.shutdown()
+    elapsed = time.perf_counter() - start
+    print(f"{processes:>3} processes{events * polls / elapsed:>14.0f} events/s")
+
+
+def main(events: int = 10000, polls: int = 20):
+    logger.remove()
+    print(f"{events} events per poll, {polls} polls")
+    for processes in (0, 2, 4):
+        bench(processes, events, polls)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -31,7 +31,7 @@ class Analyzer(Configuable):
         """
         Config scope for this analyzer.
 
-        Subclasses cloud override this.
+        Subclasses could override this.
         """
         return self.__class__.__name__.lower()
 
@@ -125,3 +125,19 @@ class Analyzer(Configuable):
     async def analyze(self):
         # TODO: Not design yet.
         pass
+
+    def warmup(self):
+        """
+        Prepare expensive resources, e.g. engines or channels,
+        before serving the first query. Subclasses could override this.
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Release resources prepared by ``warmup`` or queries.
+
+        Could be a coroutine function,
+        for resources bound to the event loop, e.g. ``grpc.aio`` channels.
+        """
+        pass
@@ -76,6 +76,18 @@ class DBAnalyzer(Analyzer):
         # Init as a submodel
         self.sm: SessionManager = SessionManager(self.config._config_dict)
 
+    def warmup(self):
+        """
+        Create engine and its connection pool.
+        """
+        self.sm.engine
+
+    def shutdown(self):
+        """
+        Dispose engine and its connection pool.
+        """
+        self.sm.dispose()
+
     async def query(
         self,
         tracers: list[str] | None = None,
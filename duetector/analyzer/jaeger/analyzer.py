@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import functools
 from datetime import datetime
-from typing import Any, Callable
+from typing import Any, AsyncContextManager, Callable
 
 import grpc
 from google.protobuf.duration_pb2 import Duration
@@ -21,7 +22,7 @@ from duetector.log import logger
 from duetector.otel import OTelInspector
 from duetector.utils import get_grpc_cred_from_path
 
-ChannelInitializer = Callable[[], grpc.aio.Channel]
+ChannelInitializer = Callable[[], AsyncContextManager[grpc.aio.Channel]]
 
 
 class JaegerConnector(OTelInspector):
@@ -212,6 +213,7 @@ class JaegerAnalyzer(Analyzer):
 
     def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
+        self._channel: grpc.aio.Channel | None = None
 
     @functools.cached_property
     def channel_initializer(self) -> ChannelInitializer:
@@ -237,9 +239,32 @@ class JaegerAnalyzer(Analyzer):
 
         return functools.partial(target_func, **kwargs)
 
+    @contextlib.asynccontextmanager
+    async def shared_channel(self):
+        """
+        Channel shared by all queries, opened on first use and closed by ``shutdown``.
+        """
+        if self._channel is None:
+            self._channel = self.channel_initializer()
+        yield self._channel
+
     @functools.cached_property
     def connector(self):
-        return JaegerConnector(self.channel_initializer)
+        return JaegerConnector(self.shared_channel)
+
+    def warmup(self):
+        """
+        Load credentials and build channel initializer.
+        """
+        self.connector
+
+    async def shutdown(self):
+        """
+        Close the shared channel, a later query opens a new one.
+        """
+        channel, self._channel = self._channel, None
+        if channel is not None:
+            await channel.close()
 
     async def get_all_tracers(self) -> list[str]:
         """
@@ -12,6 +12,7 @@ from duetector.log import logger
 from duetector.managers.analyzer import AnalyzerManager
 from duetector.monitors import BccMonitor, ShMonitor, SubprocessMonitor
 from duetector.monitors.base import Monitor
+from duetector.monitors.pipeline import PipelineRuntime
 from duetector.tools.config_generator import ConfigGenerator
 
 
@@ -159,13 +160,19 @@ def start(
         config_dump_dir=config_dump_dir,
     ).load_config()
     monitors: List[Monitor] = []
+    # All monitors share filters, injectors and collectors,
+    # they are created by the first enabled monitor and shutdown by the last one
+    runtime = PipelineRuntime(c)
     if enable_bcc_monitor:
         check_privileges()
-        monitors.append(BccMonitor(c))
+        monitors.append(BccMonitor(c, runtime=runtime))
     if enable_sh_monitor:
-        monitors.append(ShMonitor(c))
+        monitors.append(ShMonitor(c, runtime=runtime))
     if enable_sp_monitor:
-        monitors.append(SubprocessMonitor(c))
+        monitors.append(SubprocessMonitor(c, runtime=runtime))
+
+    if not runtime.refs:
+        logger.warning("No monitor enabled.")
 
     for m in monitors:
         m.start_polling()
@@ -1,44 +1,109 @@
 from __future__ import annotations
 
+import functools
 import platform
+import threading
 from collections import deque, namedtuple
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 from duetector.config import Config, Configuable
+from duetector.exceptions import ConfigError
 from duetector.extension.collector import hookimpl
 from duetector.log import logger
+from duetector.tools.scheduler import Scheduler
 
-from .models import Tracking
+from .models import Tracking, TrackingRecord
 
 
 class Collector(Configuable):
     """
-    Base class for all collectors, provide a ThreadPoolExecutor each instance for async emit.
+    Base class for all collectors, emit trackings by an executor from ``Scheduler``.
 
     By default, the config scope of ``Collector`` is ``collector.{class_name}``.
 
     Implementations should override ``_emit`` and ``summary`` method, see ``DequeCollector`` as an example.
+
+    ``executor`` decides where ``_emit`` runs:
+        - ``inline``: In caller's thread (the poller), for cheap ``_emit`` like ``DequeCollector``
+        - ``pooled``: In ``Scheduler``'s shared ``emit`` pool
+        - ``dedicated``: In own ``ThreadPoolExecutor`` with ``backend_args``
+
+    Trackings waiting for the backend are bounded by ``queue.max_size``, ``0`` means unbounded.
+    When the queue is full, ``queue.overflow_policy`` decides what to do:
+        - ``block``: Block the caller (the poller) until there is room
+        - ``drop_newest``: Drop the incoming tracking
+        - ``drop_oldest``: Drop the oldest tracking which is not being emitted yet
+        - ``sample``: Keep one of every ``queue.sample_every`` overflowing trackings by dropping the oldest one,
+          drop the others
+
+    Inline collectors have no queue, ``queue`` config is ignored.
+
+    ``emit_batch`` emits a batch of trackings as one task,
+    implementations can override ``_emit_batch`` for a bulk write (and set ``batch_capable``),
+    it falls back to ``_emit``.
+    A batch counts as its size in the queue, and is dropped as a whole.
+
+    Counters of the queue are available by ``queue_stats``.
     """
 
     default_config = {
         "disabled": False,
         "statis_id": "",
+        "executor": "pooled",
         "backend_args": {
             "max_workers": 10,
         },
+        "queue": {
+            "max_size": 10240,
+            "overflow_policy": "block",
+            "sample_every": 10,
+        },
     }
     """
     Default config for ``Collector``
     """
+
+    batch_capable: bool = False
+    """
+    If ``_emit_batch`` is a bulk implementation, set by subclasses overriding it.
+
+    ``CollectorManager`` may override it by ``batch_capable`` hook of plugins.
+    """
+
     _backend_imp = ThreadPoolExecutor
     """
-    Default backend implementation for ``Collector``
+    Backend implementation for ``dedicated`` executor
+    """
+
+    overflow_policies = ("block", "drop_newest", "drop_oldest", "sample")
+    """
+    Available overflow policies for ``queue.overflow_policy``
     """
 
     def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
-        self._backend = self._backend_imp(**self.backend_args._config_dict)
+        if self.overflow_policy not in self.overflow_policies:
+            raise ConfigError(
+                f"Unknown overflow policy {self.overflow_policy}, should be one of {self.overflow_policies}"
+            )
+        self._backend = Scheduler().get_executor(
+            self.executor,
+            lane="emit",
+            dedicated_factory=lambda: self._backend_imp(**self.backend_args._config_dict),
+            dedicated_workers=int(self.backend_args.max_workers or 1),
+        )
+        self._inline = self.executor == "inline"
+
+        # Condition uses a RLock, cancelling a future calls ``_release`` in the same thread
+        self._queue_cond = threading.Condition()
+        # (future, count of trackings)
+        self._pending: deque[tuple[Future, int]] = deque()
+        self._inflight = 0
+        self._overflowed = 0
+        self._queued = 0
+        self._dropped = 0
+        self._high_water_mark = 0
 
     @property
     def config_scope(self):
@@ -63,6 +128,13 @@ class Collector(Configuable):
         """
         return self.config.statis_id or platform.node()
 
+    @property
+    def executor(self) -> str:
+        """
+        Executor mode, one of ``Scheduler.executor_modes``
+        """
+        return self.config.executor
+
     @property
     def backend_args(self):
         """
@@ -71,16 +143,176 @@ class Collector(Configuable):
 
         return self.config.backend_args
 
-    def emit(self, tracer, data: namedtuple):
+    @property
+    def queue_max_size(self) -> int:
+        """
+        Max trackings waiting for backend, ``0`` means unbounded
+        """
+        return int(self.config.queue.max_size or 0)
+
+    @property
+    def overflow_policy(self) -> str:
+        """
+        What to do when the queue is full, one of ``overflow_policies``
+        """
+        return self.config.queue.overflow_policy
+
+    @property
+    def sample_every(self) -> int:
+        """
+        Keep one of every ``sample_every`` overflowing trackings for ``sample`` policy
+        """
+        return max(int(self.config.queue.sample_every), 1)
+
+    def queue_stats(self) -> dict[str, int]:
+        """
+        Counters of the emit queue
+        """
+        with self._queue_cond:
+            return {
+                "queued": self._queued,
+                "dropped": self._dropped,
+                "pending": self._inflight,
+                "high_water_mark": self._high_water_mark,
+            }
+
+    def _release(self, count: int, future: Future):
+        with self._queue_cond:
+            self._inflight -= count
+            self._queue_cond.notify()
+
+    def _drop_oldest(self) -> bool:
+        """
+        Cancel the oldest tracking (or batch) which is not being emitted yet.
+        """
+        while self._pending:
+            future, count = self._pending.popleft()
+            if future.cancel():
+                self._dropped += count
+                return True
+        return False
+
+    def _reserve(self) -> bool:
+        """
+        Make room for a tracking according to ``overflow_policy``, return ``False`` to drop it.
+
+        Should be called with ``self._queue_cond`` held.
+        """
+        while self._pending and self._pending[0][0].done():
+            self._pending.popleft()
+
+        max_size = self.queue_max_size
+        if not max_size or self._inflight < max_size:
+            return True
+
+        policy = self.overflow_policy
+        if policy == "block":
+            self._queue_cond.wait_for(lambda: self._inflight < max_size)
+            return True
+        if policy == "drop_oldest":
+            return self._drop_oldest()
+        if policy == "sample":
+            self._overflowed += 1
+            if self._overflowed % self.sample_every == 0:
+                return self._drop_oldest()
+        return False
+
+    def emit(self, tracer, data: namedtuple | TrackingRecord | Tracking):
         """
         Wrapper for ``self._emit``, submit to backend executor
+
+        ``data`` can be a ``TrackingRecord`` built by monitor, which is shared by all collectors,
+        a ``Tracking``, or tracer's raw data which will be converted to a ``TrackingRecord``.
+
+        Return ``None`` if the tracking is dropped by ``overflow_policy``, or emitted inline.
         """
 
         if self.disabled:
             return
         if not tracer:
             logger.warning("Empty tracer, skip emit")
-        return self._backend.submit(self._emit, Tracking.from_namedtuple(tracer, data))
+        if not isinstance(data, (TrackingRecord, Tracking)):
+            data = TrackingRecord.from_namedtuple(tracer, data)
+        if self._inline:
+            with self._queue_cond:
+                self._queued += 1
+            try:
+                self._emit_record(data)
+            except Exception as e:
+                logger.exception(e)
+            return None
+        return self._submit(self._emit_record, data, 1)
+
+    def emit_batch(
+        self, tracer, batch: list[namedtuple | TrackingRecord | Tracking]
+    ) -> Future | None:
+        """
+        Emit a batch of trackings of ``tracer`` as one task, see ``emit`` for ``data`` types.
+
+        Return ``None`` if the batch is dropped by ``overflow_policy``, or emitted inline.
+        """
+        if self.disabled or not batch:
+            return None
+        records = [
+            (
+                data
+                if isinstance(data, (TrackingRecord, Tracking))
+                else TrackingRecord.from_namedtuple(tracer, data)
+            )
+            for data in batch
+        ]
+        if self._inline:
+            with self._queue_cond:
+                self._queued += len(records)
+            try:
+                self._emit_records(records)
+            except Exception as e:
+                logger.exception(e)
+            return None
+        return self._submit(self._emit_records, records, len(records))
+
+    def _submit(self, fn, arg, count: int) -> Future | None:
+        """
+        Submit ``fn(arg)`` of ``count`` trackings to backend, return ``None`` if dropped.
+        """
+        with self._queue_cond:
+            if not self._reserve():
+                self._dropped += count
+                return None
+            future = self._backend.submit(fn, arg)
+            self._pending.append((future, count))
+            self._inflight += count
+            self._queued += count
+            self._high_water_mark = max(self._high_water_mark, self._inflight)
+            future.add_done_callback(functools.partial(self._release, count))
+        return future
+
+    def _emit_record(self, r: TrackingRecord | Tracking):
+        """
+        Convert record to ``Tracking`` in backend, then call ``self._emit``
+        """
+        t = r.to_tracking() if isinstance(r, TrackingRecord) else r
+        if t:
+            self._emit(t)
+
+    def _emit_records(self, records: list[TrackingRecord | Tracking]):
+        """
+        Convert records to ``Tracking`` in backend, then call ``self._emit_batch``
+        """
+        trackings = [
+            t
+            for t in (r.to_tracking() if isinstance(r, TrackingRecord) else r for r in records)
+            if t
+        ]
+        if trackings:
+            self._emit_batch(trackings)
+
+    def _emit_batch(self, trackings: list[Tracking]):
+        """
+        Emit a batch of trackings, fallback to ``self._emit`` for each
+        """
+        for t in trackings:
+            self._emit(t)
 
     def _emit(self, t: Tracking):
         """
@@ -90,15 +322,19 @@ class Collector(Configuable):
 
     def summary(self) -> dict:
         """
-        Get summary of current collector, should be implemented by subclasses
+        Get summary of current collector keyed by tracer, should be implemented by subclasses
+
+        Counters of the queue should be included under ``queue``, see ``queue_stats``.
         """
         raise NotImplementedError
 
     def shutdown(self):
         """
-        Shutdown backend executor
+        Wait for pending trackings, then release backend executor
         """
-        self._backend.shutdown()
+        with self._queue_cond:
+            self._queue_cond.wait_for(lambda: self._inflight == 0)
+        Scheduler().release(self._backend)
 
 
 class DequeCollector(Collector):
@@ -112,6 +348,7 @@ class DequeCollector(Collector):
     default_config = {
         **Collector.default_config,
         "disabled": True,
+        "executor": "inline",
         "maxlen": 1024,
     }
     """
@@ -135,13 +372,16 @@ class DequeCollector(Collector):
 
     def summary(self) -> dict:
         return {
-            tracer: {
-                "count": len(trackings),
-                "first": trackings[0].dt,
-                "last": trackings[-1].dt,
-                "most_recent": trackings[-1].model_dump(),
-            }
-            for tracer, trackings in self._trackings.items()
+            **{
+                tracer: {
+                    "count": len(trackings),
+                    "first": trackings[0].dt,
+                    "last": trackings[-1].dt,
+                    "most_recent": trackings[-1].as_dict,
+                }
+                for tracer, trackings in self._trackings.items()
+            },
+            "queue": self.queue_stats(),
         }
 
 
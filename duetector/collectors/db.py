@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import copy
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from typing import Any
 
-from sqlalchemy import func, select  # type: ignore
+from sqlalchemy import func, insert, select  # type: ignore
 
 from duetector.collectors.base import Collector
-from duetector.collectors.models import Tracking
+from duetector.collectors.models import Tracking, TrackingRecord
 from duetector.db import SessionManager
 from duetector.extension.collector import hookimpl
+from duetector.log import logger
 
 
 class DBCollector(Collector):
@@ -19,6 +25,22 @@ class DBCollector(Collector):
 
     Config:
         - ``db``: A ``SessionManager`` config
+        - ``batch``: Batched writer config
+            - ``enabled``: Use a single writer thread to insert trackings in batches
+            - ``max_size``: Flush when a tracer has this many pending trackings
+              (should not exceed ``queue.max_size``)
+            - ``max_age_ms``: Flush when the oldest pending tracking is older than this
+
+    In batch mode, trackings are enqueued by the caller instead of being submitted to an executor,
+    a dedicated writer thread drains the queue and inserts them with one ``executemany``
+    per tracer table, in one transaction per batch.
+    A tracking counts in ``queue.max_size`` until it's written, so ``queue.overflow_policy``
+    applies to trackings waiting for the writer, and the future of ``emit`` is done when it's written,
+    with the exception if writing failed.
+    ``summary`` and ``shutdown`` flush all pending trackings before returning.
+    If the writer thread dies, pending and later trackings fail instead of waiting forever.
+
+    Without batch mode, trackings from ``emit_batch`` are still inserted with one ``executemany``.
     """
 
     default_config = {
@@ -29,8 +51,24 @@ class DBCollector(Collector):
                 "url": "sqlite:///duetector-dbcollector.sqlite3",
             },
         },
+        "batch": {
+            "enabled": False,
+            "max_size": 1024,
+            "max_age_ms": 500,
+        },
     }
 
+    batch_capable = True
+
+    _FLUSH = object()
+    """
+    Marker for writer thread to flush all pending trackings
+    """
+    _STOP = object()
+    """
+    Marker for writer thread to flush and exit
+    """
+
     def __repr__(self):
         config_without_db = copy.deepcopy(self.config._config_dict)
         config_without_db.pop("db", None)
@@ -41,26 +79,253 @@ class DBCollector(Collector):
         # Init as a submodel
         self.sm = SessionManager(self.config._config_dict)
 
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._flush_count = 0
+        # Set by the writer thread on exit, guarded by ``_queue_cond``
+        self._writer_exited = False
+        self._writer: threading.Thread | None = None
+        if self.batch_enabled:
+            # Trackings go to the writer's queue, not the executor
+            self._inline = False
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    @property
+    def batch_enabled(self) -> bool:
+        """
+        If batched writer is enabled
+        """
+        return bool(self.config.batch.enabled)
+
+    @property
+    def batch_max_size(self) -> int:
+        """
+        Max pending trackings of a tracer before flushing
+        """
+        return int(self.config.batch.max_size)
+
+    @property
+    def batch_max_age_ms(self) -> float:
+        """
+        Max age of the oldest pending tracking before flushing
+        """
+        return float(self.config.batch.max_age_ms)
+
+    def _submit(self, fn, arg, count: int) -> Future | None:
+        if not self.batch_enabled:
+            return super()._submit(fn, arg, count)
+
+        with self._queue_cond:
+            if not self._reserve():
+                self._dropped += count
+                return None
+            # Done by the writer thread when written, or cancelled by ``drop_oldest`` before that
+            future: Future = Future()
+            self._pending.append((future, count))
+            self._inflight += count
+            self._queued += count
+            self._high_water_mark = max(self._high_water_mark, self._inflight)
+            future.add_done_callback(functools.partial(self._release, count))
+            if self._writer_exited:
+                future.set_exception(RuntimeError(f"Writer thread of {self} exited"))
+            else:
+                self._queue.put((future, arg if isinstance(arg, list) else [arg]))
+        return future
+
     def _emit(self, t: Tracking):
         m = self.sm.get_tracking_model(t.tracer, self.id)
         with self.sm.begin() as session:
-            tracking = m(**t.model_dump(exclude=["tracer"]))
+            tracking = m(**self._to_row(t))
             session.add(tracking)
             session.commit()
 
+    def _emit_batch(self, trackings: list[Tracking]):
+        rows: dict[str, list[dict[str, Any]]] = {}
+        for t in trackings:
+            rows.setdefault(t.tracer, []).append(self._to_row(t))
+        error: Exception | None = None
+        for tracer, tracer_rows in rows.items():
+            try:
+                self._write_batch(tracer, tracer_rows)
+            except Exception as e:
+                error = error or e
+        if error:
+            raise error
+
+    @staticmethod
+    def _to_row(t: Tracking) -> dict[str, Any]:
+        return {k: v for k, v in t.as_dict.items() if k != "tracer"}
+
+    def _write_batch(self, tracer: str, rows: list[dict[str, Any]]):
+        """
+        Insert a batch of trackings of one tracer in one transaction.
+
+        Exceptions are logged and raised.
+        """
+        try:
+            m = self.sm.get_tracking_model(tracer, self.id)
+            with self.sm.engine.begin() as conn:
+                conn.execute(insert(m), rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} trackings of {tracer}")
+            logger.exception(e)
+            raise
+
+    def _write_loop(self):
+        """
+        Writer thread, drain the queue and flush on size, age, ``_FLUSH`` or ``_STOP``.
+        """
+        pending: dict[str, list[dict[str, Any]]] = {}
+        # Futures of pending trackings and their tracers, done after flushing
+        written: list[tuple[Future, set[str]]] = []
+        oldest: float | None = None
+        max_age = self.batch_max_age_ms / 1000
+
+        def _flush():
+            nonlocal oldest
+            errors: dict[str, Exception] = {}
+            for tracer, rows in pending.items():
+                try:
+                    self._write_batch(tracer, rows)
+                except Exception as e:
+                    errors[tracer] = e
+            pending.clear()
+            oldest = None
+            for future, tracers in written:
+                error = next((errors[t] for t in tracers if t in errors), None)
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+            written.clear()
+
+        def _add(future: Future, records: list[TrackingRecord | Tracking]) -> bool:
+            """
+            Add records of ``future`` to pending rows, return ``True`` if a tracer is full.
+            """
+            tracers: set[str] = set()
+            full = False
+            for r in records:
+                try:
+                    t = r.to_tracking() if isinstance(r, TrackingRecord) else r
+                    if not t:
+                        continue
+                    row = self._to_row(t)
+                except Exception as e:
+                    logger.exception(e)
+                    continue
+                rows = pending.setdefault(t.tracer, [])
+                rows.append(row)
+                tracers.add(t.tracer)
+                full = full or len(rows) >= self.batch_max_size
+            written.append((future, tracers))
+            return full
+
+        try:
+            while True:
+                timeout = None if oldest is None else max(oldest + max_age - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._FLUSH or item is self._STOP:
+                    _flush()
+                    with self._flushed:
+                        self._flush_count += 1
+                        self._flushed.notify_all()
+                    if item is self._STOP:
+                        return
+                    continue
+
+                if item is not None:
+                    future, records = item
+                    if not future.set_running_or_notify_cancel():
+                        # Dropped by overflow policy
+                        continue
+                    if oldest is None:
+                        oldest = time.monotonic()
+                    if _add(future, records):
+                        _flush()
+
+                if oldest is not None and time.monotonic() - oldest >= max_age:
+                    _flush()
+        except Exception as e:
+            logger.error(f"Writer thread of {self} exited unexpectedly")
+            logger.exception(e)
+        finally:
+            self._fail_pending(written)
+
+    def _fail_pending(self, written: list[tuple[Future, set[str]]]):
+        """
+        Fail futures not written when the writer thread exits, and later ones.
+        """
+        error = RuntimeError(f"Writer thread of {self} exited")
+        with self._queue_cond:
+            self._writer_exited = True
+        for future, _ in written:
+            if not future.done():
+                future.set_exception(error)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is self._FLUSH or item is self._STOP:
+                continue
+            future, _ = item
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+        with self._flushed:
+            self._flushed.notify_all()
+
+    def _request_flush(self, marker):
+        """
+        Send ``marker`` to the writer thread and wait until it's handled.
+        """
+        writer = self._writer
+        if not writer or not writer.is_alive():
+            return
+        with self._flushed:
+            target = self._flush_count + 1
+            self._queue.put(marker)
+            # Writer thread may exit without handling it
+            while not self._flushed.wait_for(lambda: self._flush_count >= target, timeout=1):
+                if not writer.is_alive():
+                    return
+
+    def flush(self):
+        """
+        Flush all pending trackings, only meaningful in batch mode.
+        """
+        self._request_flush(self._FLUSH)
+
     def summary(self) -> dict:
+        self.flush()
         with self.sm.begin() as session:
             return {
-                tracer: {
-                    "count": session.execute(select(func.count()).select_from(m)).scalar(),
-                    "first at": session.execute(select(m)).first()[0].dt,
-                    "last": session.execute(select(m).order_by(m.id.desc()))  # type: ignore
-                    .first()[0]
-                    .to_collector_tracking(),
-                }
-                for tracer, m in self.sm.get_all_models().items()
+                **{
+                    tracer: {
+                        "count": session.execute(select(func.count()).select_from(m)).scalar(),
+                        "first at": session.execute(select(m)).first()[0].dt,
+                        "last": session.execute(select(m).order_by(m.id.desc()))  # type: ignore
+                        .first()[0]
+                        .to_collector_tracking(),
+                    }
+                    for tracer, m in self.sm.get_all_models().items()
+                },
+                "queue": self.queue_stats(),
             }
 
+    def shutdown(self):
+        # Pending trackings are not done until flushed
+        self.flush()
+        super().shutdown()
+        self._request_flush(self._STOP)
+        if self._writer:
+            self._writer.join()
+
 
 @hookimpl
 def init_collector(config):
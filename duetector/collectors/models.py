@@ -1,23 +1,38 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import cached_property
 from typing import Any, Dict, NamedTuple, Optional
 
 import pydantic
 
-from duetector.injectors.inspector import Inspector
+from duetector.injectors.inspector import CwdCache, Inspector
 from duetector.log import logger
 from duetector.utils import get_boot_time_duration_ns
 
+_extended_timestamps = ("first_timestamp",)
+"""
+Extended fields in nanoseconds since boot like ``timestamp``, e.g. of ``aggregate_t``,
+normalized to epoch seconds like serialized ``dt`` by ``Tracking.normalize_field``
+"""
+
 
 class Tracking(pydantic.BaseModel):
     """
     Tracking model for all tracers, bring tracer's data into a common model
 
     Extended fields will be stored in ``_extended`` field as a dict
-    Use ``Tracking.from_namedtuple`` to create a Tracking instance from tracer's data
+    Use ``Tracking.from_namedtuple`` to create a Tracking instance from tracer's data,
+    or ``TrackingRecord.to_tracking`` to convert a record.
+
+    A Tracking is immutable, it's converted from a ``TrackingRecord`` and shared by all collectors,
+    collectors converting the same record at the same time may each build an equal one.
+    Serialized forms (``as_dict``, ``as_json``, ``span_attributes``) are computed lazily and cached,
+    they are shared too and should not be modified.
     """
 
+    model_config = pydantic.ConfigDict(frozen=True)
+
     tracer: str
     """
     Tracer's name
@@ -66,6 +81,8 @@ class Tracking(pydantic.BaseModel):
         if field == "timestamp":
             field = "dt"
             data = get_boot_time_duration_ns(data)
+        elif field in _extended_timestamps and data is not None:
+            data = datetime.timestamp(get_boot_time_duration_ns(data))
         return field, data
 
     @classmethod
@@ -83,55 +100,177 @@ class Tracking(pydantic.BaseModel):
         """
         Create a Tracking instance from tracer's data
         """
-        tracer_name = getattr(data, "tracer_name", None)
-        if not tracer_name:
-            if isinstance(tracer, type):
-                tracer_name = getattr(tracer, "__name__")
-            elif isinstance(tracer, str):
-                tracer_name = tracer
+        return TrackingRecord.from_namedtuple(tracer, data).to_tracking()
+
+    @cached_property
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Cached ``model_dump()``
+        """
+        return self.model_dump()
+
+    @cached_property
+    def as_json(self) -> bytes:
+        """
+        Cached ``model_dump_json()`` as bytes
+        """
+        return self.model_dump_json().encode("utf-8")
+
+    @cached_property
+    def span_attributes(self) -> Dict[str, Any]:
+        """
+        Cached span attributes, ``None`` values are skipped
+        """
+        attributes = {}
+        for k in Tracking.model_fields:
+            if k in ("tracer", "extended"):
+                continue
+            v = getattr(self, k)
+            if v is not None:
+                k, v = self.serialize_field(k, v)
+                attributes[k.replace(Inspector.sep, ".")] = v
+        for k, v in self.extended.items():
+            attributes[k.replace(Inspector.sep, ".")] = v
+        return attributes
+
+    def set_span(self, collector, span):
+        span.set_attributes(self.span_attributes)
+        span.set_attribute("collector.id", collector.id)
+
+
+def get_tracer_name(tracer, data: NamedTuple | None = None) -> str:
+    """
+    Get tracer's name from data's ``tracer_name`` field, or tracer's name, type or instance.
+    """
+    tracer_name = getattr(data, "tracer_name", None)
+    if not tracer_name:
+        if isinstance(tracer, type):
+            tracer_name = getattr(tracer, "__name__")
+        elif isinstance(tracer, str):
+            tracer_name = tracer
+        else:
+            # Is instance of tracer
+            tracer_name = getattr(tracer, "name", tracer.__class__.__name__)
+
+    return tracer_name.lower()
+
+
+class TrackingRecord:
+    """
+    A compact record of an event, used on the hot path from monitor to collectors.
+
+    Unlike ``Tracking``, there is no validation, and ``timestamp`` is kept as raw nanoseconds since boot.
+    Use ``to_tracking`` to convert it to a ``Tracking`` at the storage or API boundary,
+    the result is cached so all collectors share one ``Tracking``.
+
+    Use ``TrackingRecord.from_namedtuple`` to create a record from tracer's data.
+    """
+
+    __slots__ = (
+        "tracer",
+        "pid",
+        "uid",
+        "gid",
+        "comm",
+        "cwd",
+        "fname",
+        "timestamp",
+        "dt",
+        "extended",
+        "_tracking",
+    )
+
+    fields = frozenset(__slots__[:-2])
+    """
+    Fields stored in slots, others are stored in ``extended``
+    """
+
+    _tracking_fields = ("pid", "uid", "gid", "comm", "cwd", "fname", "timestamp")
+    """
+    Fields normalized by ``Tracking.normalize_field`` on conversion, ``dt`` is taken as is
+    """
+
+    def __init__(
+        self,
+        tracer: str,
+        pid: int | None = None,
+        uid: int | None = None,
+        gid: int | None = None,
+        comm: str | None = "Unknown",
+        cwd: str | None = None,
+        fname: str | None = None,
+        timestamp: int | None = None,
+        dt: datetime | None = None,
+        extended: dict[str, Any] | None = None,
+    ):
+        self.tracer = tracer
+        self.pid = pid
+        self.uid = uid
+        self.gid = gid
+        self.comm = comm
+        self.cwd = cwd
+        self.fname = fname
+        self.timestamp = timestamp
+        self.dt = dt
+        self.extended = {} if extended is None else extended
+        self._tracking: Tracking | None = None
+
+    def __repr__(self):
+        return f"<TrackingRecord [{self.tracer}] {self.pid} {self.comm} {self.timestamp}>"
+
+    @staticmethod
+    def from_namedtuple(tracer, data: NamedTuple) -> TrackingRecord:
+        """
+        Create a record from tracer's data
+        """
+        r = TrackingRecord(get_tracer_name(tracer, data))
+        fields = TrackingRecord.fields
+        extended = r.extended
+        for field, v in zip(data._fields, data):  # type: ignore
+            if field in fields:
+                setattr(r, field, v)
             else:
-                # Is instance of tracer
-                tracer_name = getattr(tracer, "name", tracer.__class__.__name__)
-
-        tracer_name = tracer_name.lower()
-        args = {
-            "tracer": tracer_name,
-            "extended": {},
-        }
-        for field in data._fields:  # type: ignore
-            k, v = Tracking.normalize_field(field, getattr(data, field))
+                extended[field] = v
+
+        if not r.cwd and r.pid and getattr(tracer, "resolve_cwd", True):
+            # Try get cwd from /proc/<pid>/cwd, at most once per process
+            # Not necessary for all tracers, kept by `ProcessTracer` if enabled
+            r.cwd = CwdCache().get(r.pid)
+        return r
+
+    def _build_tracking(self) -> Tracking | None:
+        args: dict[str, Any] = {"tracer": self.tracer, "dt": self.dt}
+        extended: dict[str, Any] = {}
+        for field in self._tracking_fields:
+            v = getattr(self, field)
+            if field == "timestamp" and v is None:
+                continue
+            k, v = Tracking.normalize_field(field, v)
+            args[k] = v
+        for field, v in self.extended.items():
+            k, v = Tracking.normalize_field(field, v)
             if k in Tracking.model_fields:
                 args[k] = v
             else:
-                args["extended"][k] = v
-
-        if not args.get("cwd"):
-            # Try get cwd from /proc/<pid>/cwd
-            # Not necessary for all tracers, TODO: Add a tracer for `exec`
-            try:
-                args["cwd"] = open(f"/proc/{args['pid']}/cwd").read()
-            except Exception:
-                # Process may already exit
-                pass
+                extended[k] = v
         try:
-            return Tracking(**args)
+            return Tracking(**args, extended=extended)
         except ValueError as e:
             logger.error("Failed to create Tracking instance: %s", e)
             logger.exception(e)
+            return None
 
-    def set_span(self, collector, span):
-        for k in self.model_fields:
-            if k in ("tracer", "extended"):
-                continue
-            v = getattr(self, k)
-            if v is not None:
-                k, v = self.serialize_field(k, v)
-                k = k.replace(Inspector.sep, ".")
-                span.set_attribute(k, v)
-        for k, v in self.extended.items():
-            k = k.replace(Inspector.sep, ".")
-            span.set_attribute(k, v)
-        span.set_attribute("collector.id", collector.id)
+    def to_tracking(self) -> Tracking | None:
+        """
+        Convert to a validated ``Tracking``, ``None`` if validation failed.
+
+        The result is cached, without a lock: collectors converting at the same time
+        may each build one, they are equal and the last one is kept.
+        """
+        tracking = self._tracking
+        if tracking is None:
+            tracking = self._tracking = self._build_tracking()
+        return tracking
 
 
 if __name__ == "__main__":
@@ -138,6 +138,8 @@ class OTelCollector(Collector, OTelInspector):
     default_config = {
         **Collector.default_config,
         "disabled": True,
+        # Spans are exported by ``BatchSpanProcessor`` in its own thread
+        "executor": "inline",
         "exporter": "console",
         "exporter_kwargs": {},
         "grpc_exporter_kwargs": {
@@ -207,7 +209,7 @@ class OTelCollector(Collector, OTelInspector):
             t.set_span(self, span)
 
     def summary(self) -> dict:
-        return {}
+        return {"queue": self.queue_stats()}
 
     def shutdown(self):
         super().shutdown()
@@ -164,6 +164,15 @@ class SessionManager(Configuable):
             self._engine = sqlalchemy.create_engine(**self.engine_config)
         return self._engine
 
+    def dispose(self):
+        """
+        Dispose engine and its connection pool, a new engine will be created on next use.
+        """
+        if self._engine:
+            self._engine.dispose()
+        self._engine = None
+        self._sessionmaker = None
+
     @property
     def sessionmaker(self):
         """
@@ -6,6 +6,10 @@ class TreacerDisabledError(TracerError):
     pass
 
 
+class TracerCompileError(TracerError):
+    pass
+
+
 class ConfigError(Exception):
     pass
 
@@ -1,3 +1,3 @@
-from .base import Filter
+from .base import Filter, KernelRules
 
-__all__ = ["Filter"]
+__all__ = ["Filter", "KernelRules"]
@@ -1,10 +1,40 @@
 from __future__ import annotations
 
 from collections import namedtuple
+from typing import NamedTuple
 
 from duetector.config import Configuable
 
 
+class KernelRules(NamedTuple):
+    """
+    Rules simple enough to be checked by bpf programs before events are output,
+    see ``Filter.kernel_rules`` and ``BccTracer.set_kernel_filter``.
+
+    Events matching them must also be dropped by the filter,
+    so checking them in kernel only saves copying events to user space.
+    """
+
+    pids: frozenset[int] = frozenset()
+    """
+    Drop events of these pids (thread ids, as ``pid`` field of tracers)
+    """
+    tgids: frozenset[int] = frozenset()
+    """
+    Drop events of all threads of these processes,
+    the filter must check the process of the ``pid`` field (a thread id) too
+    """
+    uids: frozenset[int] = frozenset()
+    gids: frozenset[int] = frozenset()
+    path_prefixes: frozenset[str] = frozenset()
+    """
+    Drop events whose path starts with one of these
+    """
+
+    def merge(self, other: KernelRules) -> KernelRules:
+        return KernelRules(*(a | b for a, b in zip(self, other)))
+
+
 class Filter(Configuable):
     """
     A base class for all filters.
@@ -41,6 +71,15 @@ class Filter(Configuable):
     Default config for ``Filter``.
     """
 
+    batch_capable: bool = False
+    """
+    If ``filter_batch`` is a bulk implementation, set by subclasses overriding it.
+
+    Monitor gives batch capable filters whole batches,
+    and runs others per event, see ``Monitor``'s batch mode.
+    ``FilterManager`` may override it by ``batch_capable`` hook of plugins.
+    """
+
     @property
     def config_scope(self):
         """
@@ -55,12 +94,40 @@ class Filter(Configuable):
         """
         return self.config.disabled
 
+    @property
+    def required_fields(self) -> set[str] | None:
+        """
+        Fields of data read by this filter, ``None`` means unknown.
+
+        Monitor runs a filter before injectors if none of its fields can be injected,
+        so events can be dropped before expensive injection.
+        Filters with unknown fields always run after injectors.
+        """
+        return None
+
+    def kernel_rules(self) -> KernelRules | None:
+        """
+        Part of this filter's rules that bpf programs can check, ``None`` if not supported.
+        """
+        return None
+
     def filter(self, data: namedtuple) -> namedtuple | None:
         """
         Filter data, return ``None`` to drop data, return data to keep data.
         """
         raise NotImplementedError
 
+    def filter_batch(self, batch: list[namedtuple]) -> list[namedtuple]:
+        """
+        Filter a batch of data, return kept data in order.
+
+        Fallback to call the filter for each data,
+        override it for a cheaper bulk implementation and set ``batch_capable``.
+        """
+        if self.disabled:
+            return batch
+        return [data for data in map(self, batch) if data]
+
     def __call__(self, data: namedtuple) -> namedtuple | None:
         if self.disabled:
             return data
@@ -1,12 +1,39 @@
 from __future__ import annotations
 
-import os
 import re
 from ast import literal_eval
 from collections import namedtuple
+from typing import Any, NamedTuple
 
 from duetector.extension.filter import hookimpl
-from duetector.filters import Filter
+from duetector.filters import Filter, KernelRules
+from duetector.utils import AgentPids
+
+
+class RulePlan(NamedTuple):
+    """
+    Immutable rules compiled from ``PatternFilter`` config.
+    """
+
+    ignore_pids: frozenset[int]
+    """
+    Processes (tgids) whose threads are dropped, ``AgentPids`` if ``ignore_current_pid``
+    """
+    exclude: tuple[tuple[str, frozenset[int], frozenset[str]], ...]
+    """
+    ``(field, int values, str values)`` of each ``exclude_*``
+    """
+    re_exclude: tuple[tuple[str, tuple[re.Pattern, ...]], ...]
+    """
+    ``(field, patterns)`` of each ``re_exclude_*``, patterns are combined into one if possible
+    """
+
+    @property
+    def fields(self) -> set[str]:
+        fields = {f for f, _, _ in self.exclude} | {f for f, _ in self.re_exclude}
+        if self.ignore_pids:
+            fields.add("pid")
+        return fields
 
 
 class PatternFilter(Filter):
@@ -41,6 +68,14 @@ class PatternFilter(Filter):
             - It's OK: ``{PREFIX...}RE_EXCLUDE_FNAME="/proc*, /sys*"``
             - Wrong: ``{PREFIX...}RE_EXCLUDE_FNAME=[/proc*, /sys*]``, this will be converted to a list of ``"[/proc*"`` and ``"/sys*]"``.
 
+    Config is compiled into a ``RulePlan`` on init, and recompiled when ``config`` is replaced
+    or ``AgentPids`` changes. Call ``reload_rules`` after modifying ``config`` in place.
+
+    ``ignore_current_pid`` drops events of all threads of the agent's processes (``AgentPids``),
+    the ``pid`` field of events is a thread id, as in kernel, the thread's process is checked.
+
+    ``exclude_pid``, ``exclude_uid``, ``exclude_gid``, ``ignore_current_pid``
+    and literal path prefixes of ``re_exclude_fname`` can be checked in kernel, see ``kernel_rules``.
     """
 
     default_config = {
@@ -73,6 +108,19 @@ class PatternFilter(Filter):
     Cache for re pattern
     """
 
+    kernel_path_max = 128
+    """
+    Max length in bytes of a path prefix checked in kernel, longer ones are left to ``filter``
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
+        super().__init__(config, *args, **kwargs)
+        self._plan: RulePlan | None = None
+        self._plan_config: dict[str, Any] | None = None
+        self._plan_version = -1
+        self._kernel_rules: tuple[RulePlan, KernelRules] | None = None
+        self.reload_rules()
+
     @property
     def enable_customize_exclude(self) -> bool:
         """
@@ -84,6 +132,137 @@ class PatternFilter(Filter):
     def ignore_current_pid(self) -> bool:
         return bool(self.config.ignore_current_pid)
 
+    @property
+    def required_fields(self) -> set[str]:
+        """
+        Fields used by ``exclude_*``, ``re_exclude_*`` and ``ignore_current_pid``
+        """
+        return self.rule_plan.fields
+
+    @property
+    def rule_plan(self) -> RulePlan:
+        """
+        Compiled rules of current config
+        """
+        if (
+            self._plan_config is not self.config._config_dict
+            or self._plan_version != AgentPids.version
+        ):
+            self.reload_rules()
+        return self._plan
+
+    def reload_rules(self) -> RulePlan:
+        """
+        Compile current config into a ``RulePlan``.
+        """
+        self._plan_config = self.config._config_dict
+        self._plan_version = AgentPids.version
+        self._plan = self.compile_rules(
+            self._plan_config,
+            ignore_current_pid=self.ignore_current_pid,
+            enable_customize_exclude=self.enable_customize_exclude,
+        )
+        return self._plan
+
+    @classmethod
+    def compile_rules(
+        cls,
+        config: dict[str, Any],
+        ignore_current_pid: bool = True,
+        enable_customize_exclude: bool = False,
+    ) -> RulePlan:
+        """
+        Compile ``exclude_*`` into frozen sets and ``re_exclude_*`` into combined patterns.
+
+        Empty rules are skipped.
+        """
+        exclude = []
+        re_exclude = []
+        for k, v in config.items():
+            if not enable_customize_exclude and k not in cls.default_config:
+                continue
+            if k.startswith("exclude_"):
+                values = frozenset(cls._wrap_exclude_list(v))
+                if values:
+                    exclude.append((k.replace("exclude_", ""), cls._int_values(values), values))
+            if k.startswith("re_exclude_"):
+                patterns = cls._compile_patterns(sorted(cls._wrap_exclude_list(v)))
+                if patterns:
+                    re_exclude.append((k.replace("re_exclude_", ""), patterns))
+        return RulePlan(
+            ignore_pids=AgentPids.get() if ignore_current_pid else frozenset(),
+            exclude=tuple(exclude),
+            re_exclude=tuple(re_exclude),
+        )
+
+    def kernel_rules(self) -> KernelRules:
+        """
+        Rules of current config that bpf programs can check.
+
+        A ``re_exclude_fname`` pattern is used as a path prefix if it's a literal absolute path,
+        optionally anchored by ``^``, ``.`` is kept as is,
+        every path starting with it matches the pattern too.
+        ``ignore_current_pid`` drops all threads of the agent's processes in kernel.
+
+        The same ``KernelRules`` is returned until rules are recompiled.
+        """
+        plan = self.rule_plan
+        if self._kernel_rules and self._kernel_rules[0] is plan:
+            return self._kernel_rules[1]
+
+        ints = {field: values for field, values, _ in plan.exclude}
+        prefixes = set()
+        re_exclude_fname = self._plan_config.get("re_exclude_fname", [])
+        for pattern in self._wrap_exclude_list(re_exclude_fname):
+            prefix = pattern[1:] if pattern.startswith("^") else pattern
+            if (
+                prefix.startswith("/")
+                and not any(c in prefix for c in "^$*+?{}[]\\|()")
+                and len(prefix.encode("utf-8")) <= self.kernel_path_max
+            ):
+                prefixes.add(prefix)
+        rules = KernelRules(
+            pids=ints.get("pid", frozenset()),
+            tgids=plan.ignore_pids,
+            uids=ints.get("uid", frozenset()),
+            gids=ints.get("gid", frozenset()),
+            path_prefixes=frozenset(prefixes),
+        )
+        self._kernel_rules = (plan, rules)
+        return rules
+
+    @staticmethod
+    def _int_values(values: frozenset[str]) -> frozenset[int]:
+        """
+        Values which are canonical ``str`` of an int, so int fields can skip ``str`` conversion.
+        """
+        ints = set()
+        for v in values:
+            try:
+                i = int(v)
+            except ValueError:
+                continue
+            if str(i) == v:
+                ints.add(i)
+        return frozenset(ints)
+
+    @classmethod
+    def _compile_patterns(cls, patterns: list[str]) -> tuple[re.Pattern, ...]:
+        """
+        Combine patterns into one alternation,
+        fallback to separated patterns if they can't be combined,
+        e.g. global flags not at the start or backreferences.
+        """
+        if not patterns:
+            return ()
+        compiled = tuple(re.compile(p) for p in patterns)
+        if len(compiled) == 1 or any(re.search(r"\\\d|\(\?P=", p) for p in patterns):
+            return compiled
+        try:
+            return (re.compile("|".join(f"(?:{p})" for p in patterns)),)
+        except re.error:
+            return compiled
+
     @staticmethod
     def _wrap_exclude_list(value: str | list[str]) -> set[str]:
         """
@@ -110,6 +289,8 @@ class PatternFilter(Filter):
     def is_exclude(self, data: namedtuple, enable_customize_exclude=False) -> bool:
         """
         Customize exclude function, return ``True`` to drop data, return ``False`` to keep data.
+
+        This reads config on every call, ``filter`` uses the compiled ``rule_plan`` instead.
         """
         for k in self.config._config_dict:
             if not enable_customize_exclude and k not in self.default_config:
@@ -157,11 +338,39 @@ class PatternFilter(Filter):
         Filter data, return ``None`` to drop data, return data to keep data.
         """
 
-        if self.ignore_current_pid and getattr(data, "pid", None) == os.getpid():
-            return
+        plan = self._plan
+        if (
+            self._plan_config is not self.config._config_dict
+            or self._plan_version != AgentPids.version
+        ):
+            plan = self.reload_rules()
+
+        for field, ints, values in plan.exclude:
+            value = getattr(data, field, None)
+            if value is None:
+                continue
+            if type(value) is int:
+                if value in ints:
+                    return
+            elif str(value).strip() in values:
+                return
+
+        for field, patterns in plan.re_exclude:
+            value = getattr(data, field, None)
+            if value is None:
+                continue
+            value = str(value).strip()
+            if not value:
+                continue
+            for pattern in patterns:
+                if pattern.search(value):
+                    return
 
-        if self.is_exclude(data, enable_customize_exclude=self.enable_customize_exclude):
-            return
+        # Last, it may stat ``/proc`` for a thread not seen before
+        if plan.ignore_pids:
+            pid = getattr(data, "pid", None)
+            if pid is not None and AgentPids.is_thread_of(pid, plan.ignore_pids):
+                return
 
         return data
 
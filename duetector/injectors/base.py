@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import copy
-from collections import namedtuple
-from typing import Any
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import Any, Callable
 
 from duetector.config import Configuable
-from duetector.injectors.inspector import CgroupInspector, NamespaceInspector
+from duetector.injectors.inspector import (
+    CgroupInspector,
+    Inspector,
+    NamespaceInspector,
+    ProcWatcher,
+)
 
 
 class Injector(Configuable):
@@ -26,6 +32,13 @@ class Injector(Configuable):
     Default config for ``Injector``.
     """
 
+    batch_capable: bool = False
+    """
+    If ``get_patch_kwargs_batch`` is a bulk implementation, set by subclasses overriding it.
+
+    ``InjectorManager`` may override it by ``batch_capable`` hook of plugins.
+    """
+
     def __init__(self, config: dict[str, Any] = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
 
@@ -43,11 +56,32 @@ class Injector(Configuable):
         """
         return self.config.disabled
 
+    def may_provide(self, field: str) -> bool:
+        """
+        If ``field`` may be injected by this Injector, used to decide which filters can run before injection.
+
+        Be conservative by default, any field may be injected.
+        """
+        return True
+
     def get_patch_kwargs(
         self, data: namedtuple, extra: dict[str, Any] | None = None
     ) -> dict[str, Any]:
         raise NotImplementedError
 
+    def get_patch_kwargs_batch(
+        self, batch: list[namedtuple], extras: list[dict[str, Any]] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Patch kwargs of a batch of data, ``extras[i]`` is the extra of ``batch[i]``.
+
+        Fallback to ``get_patch_kwargs`` for each data,
+        override it for a cheaper bulk implementation and set ``batch_capable``.
+        """
+        if extras is None:
+            extras = [None] * len(batch)
+        return [self.get_patch_kwargs(data, extra) for data, extra in zip(batch, extras)]
+
     def as_dict(self, data: namedtuple, extra: dict[str, Any] | None = None) -> dict[str, Any]:
         if not extra:
             extra = {}
@@ -56,18 +90,51 @@ class Injector(Configuable):
             param.setdefault(k, v)
         return param
 
+    _patched_types: dict[tuple[type, tuple[str, ...]], type] = {}
+    """
+    Registry of patched data types, keyed by (base type, extra fields)
+    """
+
+    @staticmethod
+    def get_patched_type(data_t: type, extra_fields: tuple[str, ...]) -> type:
+        """
+        Get a namedtuple type with ``data_t``'s fields followed by ``extra_fields``,
+        the type is created once and cached.
+        """
+        key = (data_t, extra_fields)
+        patched_t = Injector._patched_types.get(key)
+        if patched_t is None:
+            patched_t = namedtuple(data_t.__name__, data_t._fields + extra_fields)
+            patched_t = Injector._patched_types.setdefault(key, patched_t)
+        return patched_t
+
     @staticmethod
     def patch(data: namedtuple, patch_kwargs: dict[str, Any]) -> namedtuple:
-        fields = set(data._fields + tuple(patch_kwargs.keys()))
-        new_data_t = namedtuple(data.__class__.__name__, fields)
-        param: dict = data._asdict()
-        for k, v in patch_kwargs.items():
-            param.setdefault(k, v)
-        return new_data_t(**param)
+        """
+        Patch ``data`` with ``patch_kwargs``, existing fields of ``data`` will not be overwritten.
+
+        Extra fields are sorted, so the patched type is deterministic.
+        """
+        extra_fields = tuple(sorted(k for k in patch_kwargs if k not in data._fields))
+        if not extra_fields:
+            return data
+        patched_t = Injector.get_patched_type(data.__class__, extra_fields)
+        return patched_t(*data, *(patch_kwargs[k] for k in extra_fields))
 
     def inject(self, data: namedtuple) -> namedtuple:
         return self.patch(data, self.get_patch_kwargs(data))
 
+    def inject_batch(self, batch: list[namedtuple]) -> list[namedtuple]:
+        """
+        Inject a batch of data, see ``get_patch_kwargs_batch``.
+        """
+        if self.disabled:
+            return batch
+        return [
+            self.patch(data, patch_kwargs)
+            for data, patch_kwargs in zip(batch, self.get_patch_kwargs_batch(batch))
+        ]
+
     def __call__(self, data: namedtuple) -> namedtuple | None:
         if self.disabled:
             return data
@@ -78,10 +145,85 @@ class Injector(Configuable):
 
 
 class ProcInjector(Injector):
+    """
+    Inject cgroups and namespaces of processes, see ``CgroupInspector`` and ``NamespaceInspector``.
+
+    Special config:
+        - proc_watcher: Config of ``ProcWatcher``
+            - lazy: Only read ``/proc`` for pids of events, rather than watching all processes.
+              Without watching or ``ProcessTracer``'s exit events, an exited process stays cached
+              until ``ttl_s`` or eviction, a new process reusing its pid meanwhile gets its
+              cgroups and namespaces. Enable it with ``ProcessTracer`` or a short ``ttl_s``.
+            - maxsize: Max processes in cache
+            - ttl_s: Read a process again after this long, ``0`` to never expire
+
+    Subclasses resolving containers or pods from cgroups can use ``cached_by_cgroup``,
+    so they are resolved once per cgroup when data has a kernel ``cgroup_id``.
+    """
+
+    default_config = {
+        **Injector.default_config,
+        "proc_watcher": {
+            "lazy": False,
+            "maxsize": 16384,
+            "ttl_s": 300,
+        },
+    }
+    """
+    Default config for ``ProcInjector``.
+    """
+
+    cgroup_cache_size = 4096
+
     def __init__(self, config: dict[str, Any] = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
-        self.cgroup_inspector = CgroupInspector()
-        self.namespace_inspector = NamespaceInspector()
+        # Shared by all injectors, the first one creating it decides the config
+        proc_watcher = ProcWatcher(**self.config.proc_watcher._config_dict)
+        self.cgroup_inspector = CgroupInspector(proc_watcher)
+        self.namespace_inspector = NamespaceInspector(proc_watcher)
+        self._cgroup_cache: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self._cgroup_cache_lock = Lock()
+
+    def cached_by_cgroup(
+        self,
+        model: dict[str, Any],
+        fn: Callable[[], dict[str, Any]],
+        complete: Callable[[dict[str, Any]], bool] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Result of ``fn`` cached by ``cgroup_id`` of ``model``, not cached without it.
+
+        Not cached either if the cgroup id is not verified by ``CgroupResolver``,
+        e.g. the root cgroup shared by all processes on cgroup v1 hosts,
+        ``fn`` should look up by pid then.
+        Results not ``complete`` (e.g. the container is not known yet) are not cached.
+        """
+        cgroup_id = model.get("cgroup_id")
+        if (
+            not cgroup_id
+            or self.cgroup_inspector.cgroup_resolver.get(cgroup_id, model.get("pid")) is None
+        ):
+            return fn()
+
+        with self._cgroup_cache_lock:
+            if cgroup_id in self._cgroup_cache:
+                self._cgroup_cache.move_to_end(cgroup_id)
+                return self._cgroup_cache[cgroup_id]
+
+        result = fn()
+        if complete and not complete(result):
+            return result
+        with self._cgroup_cache_lock:
+            self._cgroup_cache[cgroup_id] = result
+            if len(self._cgroup_cache) > self.cgroup_cache_size:
+                self._cgroup_cache.popitem(last=False)
+        return result
+
+    def may_provide(self, field: str) -> bool:
+        """
+        All fields injected by inspectors are prefixed with ``Inspector.prefix``
+        """
+        return field.startswith(Inspector.prefix + Inspector.sep)
 
     def get_patch_kwargs(
         self, data: namedtuple, extra: dict[str, Any] | None = None
@@ -49,6 +49,9 @@ class DockerInjector(ProcInjector, Inspector):
         cgroups: list[str] | None = self.cgroup_inspector.get(model, "cgroups")
         if not cgroups:
             return {}
+        return self.cached_by_cgroup(model, lambda: self._inspect_cgroups(cgroups))
+
+    def _inspect_cgroups(self, cgroups: list[str]) -> dict[str, Any]:
         maybe_container_id = None
         try:
             for cg in cgroups:
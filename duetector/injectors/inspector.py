@@ -4,11 +4,12 @@ import glob
 import itertools
 import os
 import signal
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
 from functools import cached_property
 from pathlib import Path
-from threading import Event, Thread
-from typing import Any, Dict, List, Optional
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
 
 import pydantic
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -21,6 +22,7 @@ except ImportError:
     from functools import lru_cache as cache
 
 from duetector.log import logger
+from duetector.tools.timer_wheel import TimerWheel
 from duetector.utils import Singleton
 
 
@@ -80,17 +82,69 @@ class PidFilter(DefaultFilter):
 
 
 class ProcWatcher(metaclass=Singleton):
+    """
+    A pid-keyed cache of ``ProcInfo``, kept up to date by watching ``/proc``.
+
+    In lazy mode, ``/proc`` is not watched nor scanned,
+    ``ProcInfo`` is only read for pids asked by ``get``, e.g. pids producing events.
+
+    The cache is a LRU of at most ``maxsize`` pids, entries older than ``ttl_s`` are read again,
+    ``0`` to never expire. Without watching, the TTL bounds staleness of reused pids.
+    Delayed removals of exited processes run on one ``TimerWheel``, see ``remove_cache``.
+    Hits, misses and evictions are counted, see ``stats``.
+
+    When process events from kernel are available (see ``ProcessTracer``),
+    ``use_events`` stops watching, events ``update`` and ``remove_cache`` directly,
+    and ``/proc`` is only synced every ``reconcile_interval_s`` to catch up missed events.
+    """
+
+    exit_listeners: list[Callable[[int], None]] = []
+    """
+    Callbacks called with pid when a process's cache is removed, evicted or expired,
+    register by ``add_exit_listener`` without starting the watcher.
+    They are called out of the lock of the cache.
+    """
+
+    @classmethod
+    def add_exit_listener(cls, listener: Callable[[int], None]) -> None:
+        if listener not in cls.exit_listeners:
+            cls.exit_listeners.append(listener)
+
+    @classmethod
+    def tracks_exits(cls) -> bool:
+        """
+        If a running watcher calls ``exit_listeners`` when processes exit,
+        by watching ``/proc`` or by process events, not only on eviction or expiry in lazy mode.
+        """
+        watcher = cls.get_instance()
+        return bool(
+            watcher
+            and not watcher.stop_event.is_set()
+            and (not watcher.lazy or watcher.event_driven)
+        )
+
     def __init__(
         self,
         proc_dir: str = "/proc",
         ignore_permission_denied: bool = True,
+        lazy: bool = False,
+        maxsize: int = 65536,
+        ttl_s: float = 0,
     ) -> None:
         self.proc_dir = proc_dir
         self.ignore_permission_denied = ignore_permission_denied
-
-        self._cache: dict[int, ProcInfo] = {}
+        self.lazy = lazy
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+
+        self._cache: OrderedDict[int, ProcInfo] = OrderedDict()
+        self._expires_at: dict[int, float] = {}
+        self._lock = Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._wheel = TimerWheel(tick_s=0.5, name="ProcWatcher-removal")
         self.thread: Thread | None = None
         self._scheduler = BackgroundScheduler()
+        self.event_driven = False
 
         self.stop_event = Event()
         self.stop_event.clear()
@@ -101,14 +155,16 @@ class ProcWatcher(metaclass=Singleton):
 
     def _sync(self):
         logger.debug("Force sync proc cache.")
-        pids = [
+        pids = {
             int(PidFilter.get_pid(path))
             for path in glob.glob(f"{self.proc_dir.rstrip('/')}/[0-9]*")
-        ]
-        for pid in pids:
-            if pid not in self._cache:
-                self.add_cache(pid)
-        for cached_pid in self._cache.keys():
+        }
+        if not self.lazy:
+            for pid in pids:
+                if pid not in self._cache:
+                    self.add_cache(pid)
+        # Cache may be updated by events meanwhile
+        for cached_pid in list(self._cache):
             if cached_pid not in pids:
                 self.remove_cache(cached_pid)
 
@@ -120,6 +176,13 @@ class ProcWatcher(metaclass=Singleton):
                 self.stop()
 
         self.stop_event.clear()
+        if self.lazy:
+            logger.info("Proc watcher started in lazy mode.")
+            return
+        if self._scheduler.state != STATE_RUNNING:
+            self._scheduler.start()
+        if self.event_driven:
+            return
 
         def _():
             logger.debug("Starting watch proc dir.")
@@ -137,8 +200,6 @@ class ProcWatcher(metaclass=Singleton):
             target=_,
         )
         self.thread.start()
-        if self._scheduler.state != STATE_RUNNING:
-            self._scheduler.start()
         self._sync()
         logger.info("Proc watcher started.")
 
@@ -162,41 +223,141 @@ class ProcWatcher(metaclass=Singleton):
                 elif change == Change.deleted:
                     self.remove_cache(pid)
 
-    def get(self, pid: int) -> ProcInfo | None:
-        proc_info = self._cache.get(pid)
-        if not proc_info:
-            # Try adding it
-            proc_info = self.add_cache(pid)
+    @classmethod
+    def get_instance(cls) -> ProcWatcher | None:
+        """
+        The watcher if it's created, without creating and starting one.
+        """
+        return Singleton._instances.get(cls)
+
+    def use_events(self, reconcile_interval_s: float = 60) -> None:
+        """
+        Stop watching ``/proc``, the cache is kept by process events from now on,
+        sync ``/proc`` every ``reconcile_interval_s`` to reconcile missed events.
+        """
+        if self.event_driven:
+            return
+        logger.info(
+            f"Proc cache is driven by process events, reconcile every {reconcile_interval_s}s."
+        )
+        self.event_driven = True
+        if self.thread:
+            self.stop_event.set()
+            self.thread.join(1)
+            self.thread = None
+            self.stop_event.clear()
+        if self._scheduler.state != STATE_RUNNING:
+            self._scheduler.start()
+        self._scheduler.add_job(
+            self._sync,
+            "interval",
+            seconds=reconcile_interval_s,
+            id="reconcile",
+            replace_existing=True,
+        )
 
+    def _notify_exit(self, pid: int) -> None:
+        for listener in self.exit_listeners:
+            try:
+                listener(pid)
+            except Exception as e:
+                logger.exception(e)
+
+    def _put(self, proc_info: ProcInfo) -> ProcInfo:
+        pid = proc_info.pid
+        evicted = []
+        with self._lock:
+            self._cache[pid] = proc_info
+            self._cache.move_to_end(pid)
+            if self.ttl_s > 0:
+                self._expires_at[pid] = time.monotonic() + self.ttl_s
+            while len(self._cache) > self.maxsize:
+                evicted_pid, _ = self._cache.popitem(last=False)
+                self._expires_at.pop(evicted_pid, None)
+                self._counters["evictions"] += 1
+                evicted.append(evicted_pid)
+        for evicted_pid in evicted:
+            self._notify_exit(evicted_pid)
+        return proc_info
+
+    def update(self, proc_info: ProcInfo) -> None:
+        """
+        Replace the cache of ``proc_info.pid``, e.g. on ``exec`` of the process.
+        """
+        logger.debug(f"Update proc cache for `{proc_info.pid}`")
+        # A new process reusing the pid
+        self._wheel.cancel(proc_info.pid)
+        self._put(proc_info)
+
+    def _lookup(self, pid: int, count: bool = False) -> ProcInfo | None:
+        with self._lock:
+            proc_info = self._cache.get(pid)
+            expires_at = self._expires_at.get(pid)
+            expired = (
+                proc_info is not None and expires_at is not None and expires_at <= time.monotonic()
+            )
+            if expired:
+                del self._cache[pid]
+                del self._expires_at[pid]
+                self._counters["expirations"] += 1
+                proc_info = None
+            elif proc_info is not None:
+                self._cache.move_to_end(pid)
+            if count:
+                self._counters["hits" if proc_info else "misses"] += 1
+        if expired:
+            self._notify_exit(pid)
         return proc_info
 
+    def get(self, pid: int) -> ProcInfo | None:
+        proc_info = self._lookup(pid, count=True)
+        if proc_info:
+            return proc_info
+
+        # Try adding it
+        return self.add_cache(pid)
+
     def add_cache(self, pid: int) -> ProcInfo:
-        if pid in self._cache:
-            return self._cache[pid]
+        proc_info = self._lookup(pid)
+        if proc_info:
+            return proc_info
         logger.debug(f"Add proc cache for `{pid}`")
-        self._cache[pid] = ProcInfo.from_pid(pid, self.proc_dir)
-        return self._cache[pid]
+        return self._put(ProcInfo.from_pid(pid, self.proc_dir))
 
     def remove_cache(self, pid: int, delay=5) -> None:
         if not delay:
+            self._wheel.cancel(pid)
             self._remove_cache(pid)
         else:
             logger.debug(f"Schedule remove proc cache for `{pid}` after {delay} seconds")
-            self._scheduler.add_job(
-                self._remove_cache,
-                "date",
-                run_date=datetime.now() + timedelta(seconds=delay),
-                args=[pid],
-            )
+            self._wheel.schedule(delay, pid, lambda: self._remove_cache(pid))
 
     def _remove_cache(self, pid: int) -> ProcInfo | None:
         logger.debug(f"Remove proc cache for `{pid}`")
-        return self._cache.pop(pid, None)
+        self._notify_exit(pid)
+        with self._lock:
+            self._expires_at.pop(pid, None)
+            return self._cache.pop(pid, None)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Size of the cache, pending removals, and counters of hits, misses,
+        evictions (by ``maxsize``) and expirations (by ``ttl_s``).
+        """
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "pending_removals": len(self._wheel),
+                **self._counters,
+            }
 
     def stop(self, sig=None, frame=None):
         self.stop_event.set()
-        self._cache.clear()
-        if self._scheduler.state == STATE_STOPPED:
+        self._wheel.stop()
+        with self._lock:
+            self._cache.clear()
+            self._expires_at.clear()
+        if self._scheduler.state != STATE_STOPPED:
             self._scheduler.shutdown(wait=False)
         if self.thread:
             logger.info("Waiting proc watcher to stop.")
@@ -207,6 +368,210 @@ class ProcWatcher(metaclass=Singleton):
         signal.pause()
 
 
+class CwdCache(metaclass=Singleton):
+    """
+    A pid-keyed cache for cwd of processes, resolved by ``readlink /proc/{pid}/cwd``.
+
+    Each process is resolved once in its lifetime, failures are not cached,
+    later ``chdir`` of the process is not seen.
+    Entries are dropped by ``ProcWatcher``'s exit listeners when the process exits.
+    Only if no watcher tracks exits (see ``ProcWatcher.tracks_exits``),
+    entries expire after ``unwatched_ttl_s``, bounding how long a reused pid gets a stale cwd.
+    The least recently used ones are evicted when the cache exceeds ``maxsize``.
+    """
+
+    maxsize = 65536
+    unwatched_ttl_s = 300
+
+    def __init__(self, proc_dir: str = "/proc") -> None:
+        self.proc_dir = proc_dir
+        # pid -> (cwd, cached at, if exits were tracked then)
+        self._cache: OrderedDict[int, tuple[str, float, bool]] = OrderedDict()
+        self._lock = Lock()
+        ProcWatcher.add_exit_listener(self.invalidate)
+
+    def get(self, pid: int) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(pid)
+            if cached:
+                cwd, cached_at, tracked = cached
+                if (tracked and ProcWatcher.tracks_exits()) or (
+                    now - cached_at < self.unwatched_ttl_s
+                ):
+                    self._cache.move_to_end(pid)
+                    return cwd
+                del self._cache[pid]
+
+        try:
+            cwd = os.readlink(f"{self.proc_dir}/{pid}/cwd")
+        except OSError:
+            # Process may already exit, or permission denied
+            return None
+
+        tracked = ProcWatcher.tracks_exits()
+        with self._lock:
+            self._cache[pid] = (cwd, now, tracked)
+            self._cache.move_to_end(pid)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return cwd
+
+    def invalidate(self, pid: int) -> None:
+        with self._lock:
+            self._cache.pop(pid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+class CgroupResolver(metaclass=Singleton):
+    """
+    A cache for cgroups of processes keyed by cgroup id, which is from ``bpf_get_current_cgroup_id``.
+
+    Each cgroup is resolved once for all processes in it, rather than once per pid.
+    It's resolved by ``/proc/{pid}/cgroup`` of the first process seen in it,
+    or by the inode of its directory in the cgroup v2 hierarchy if the process already exited.
+    The hierarchy is scanned out of the lock, at most once per ``rescan_interval_s``,
+    and an unknown cgroup id asks for a rescan at most once per ``unknown_retry_s``.
+
+    Cgroups are in the format of ``/proc/{pid}/cgroup``, e.g. ``0::/system.slice/docker-{id}.scope``.
+    Cgroup ids are not reused, the least recently used ones are evicted when exceeding ``maxsize``.
+
+    A cgroup id is only trusted if the inode of its directory matches,
+    it's never resolved for the root cgroup, which all processes share on cgroup v1 hosts.
+    Use ``/proc/{pid}/cgroup`` of each process if ``get`` returns ``None``.
+    """
+
+    maxsize = 4096
+    rescan_interval_s = 5
+    unknown_retry_s = 60
+
+    def __init__(self, proc_dir: str = "/proc", cgroup_root: str = "/sys/fs/cgroup") -> None:
+        self.proc_dir = proc_dir
+        self.cgroup_root = cgroup_root
+        self._cache: OrderedDict[int, list[str]] = OrderedDict()
+        self._index: dict[int, str] = {}
+        self._scanned_at: float | None = None
+        self._scanning = False
+        # Unknown cgroup ids and when they asked for a rescan
+        self._unknown: OrderedDict[int, float] = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def root_id(self) -> int:
+        """
+        Cgroup id of the root cgroup, the inode of ``cgroup_root``, typically ``1``.
+        """
+        try:
+            return os.stat(self.cgroup_root).st_ino
+        except OSError:
+            return 1
+
+    def get(self, cgroup_id: int, pid: int | None = None) -> list[str] | None:
+        with self._lock:
+            if cgroup_id in self._cache:
+                self._cache.move_to_end(cgroup_id)
+                return self._cache[cgroup_id]
+
+        if cgroup_id == self.root_id:
+            return None
+        cgroups = self._from_proc(cgroup_id, pid) if pid else None
+        if not cgroups:
+            cgroups = self._from_hierarchy(cgroup_id)
+        if not cgroups:
+            # Not cached, may be resolved by later processes or scans
+            return None
+
+        with self._lock:
+            self._cache[cgroup_id] = cgroups
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return cgroups
+
+    def _from_proc(self, cgroup_id: int, pid: int) -> list[str] | None:
+        try:
+            cgroups = Path(f"{self.proc_dir}/{pid}/cgroup").read_text().strip().split("\n")
+        except OSError:
+            # Process may already exit, or permission denied
+            return None
+        for cg in cgroups:
+            if not cg.startswith("0::"):
+                continue
+            try:
+                if os.stat(f"{self.cgroup_root}{cg[3:]}").st_ino == cgroup_id:
+                    return cgroups
+            except OSError:
+                # Hierarchy not visible, e.g. in a cgroup namespace or on cgroup v1
+                pass
+            # Process moved to another cgroup after the event
+            return None
+        # No cgroup v2 entry, the id is not of the process's cgroup
+        return None
+
+    def _from_hierarchy(self, cgroup_id: int) -> list[str] | None:
+        with self._lock:
+            path = self._index.get(cgroup_id)
+            if path is not None or not self._should_scan(cgroup_id):
+                return [f"0::{path}"] if path is not None else None
+            self._scanning = True
+            now = time.monotonic()
+            self._scanned_at = now
+            self._unknown[cgroup_id] = now
+            self._unknown.move_to_end(cgroup_id)
+            if len(self._unknown) > self.maxsize:
+                self._unknown.popitem(last=False)
+
+        try:
+            index = self._scan()
+        finally:
+            with self._lock:
+                self._scanning = False
+        with self._lock:
+            self._index = index
+            path = index.get(cgroup_id)
+            if path is not None:
+                self._unknown.pop(cgroup_id, None)
+        return [f"0::{path}"] if path is not None else None
+
+    def _should_scan(self, cgroup_id: int) -> bool:
+        """
+        If ``cgroup_id`` not in the index should rescan the hierarchy now.
+
+        Should be called with ``self._lock`` held.
+        """
+        if self._scanning:
+            return False
+        now = time.monotonic()
+        if self._scanned_at is not None and now - self._scanned_at < self.rescan_interval_s:
+            return False
+        asked_at = self._unknown.get(cgroup_id)
+        return asked_at is None or now - asked_at >= self.unknown_retry_s
+
+    def _scan(self) -> dict[int, str]:
+        """
+        Index of the hierarchy by inode, called without the lock.
+        """
+        logger.debug(f"Scan cgroup hierarchy {self.cgroup_root}")
+        index = {}
+        for dirpath, _, _ in os.walk(self.cgroup_root):
+            try:
+                ino = os.stat(dirpath).st_ino
+            except OSError:
+                continue
+            rel = os.path.relpath(dirpath, self.cgroup_root)
+            index[ino] = "/" if rel == "." else f"/{rel}"
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._index = {}
+            self._unknown.clear()
+            self._scanned_at = None
+
+
 def with_prefix(sep: str, prefix, key: str | list[str]) -> str:
     if isinstance(key, str):
         return sep.join([prefix, key.lower()])
@@ -266,19 +631,21 @@ class NamespaceInspector(Inspector):
     def name(self) -> str:
         return self.sep.join(["proc", "namespace"])
 
-    def __init__(self) -> None:
-        self.proc_watcher = ProcWatcher()
+    def __init__(self, proc_watcher: ProcWatcher | None = None) -> None:
+        self.proc_watcher = proc_watcher or ProcWatcher()
 
     def _inspect(self, model: dict[str, Any]) -> dict[str, Any]:
-        pid = model.get("pid")
-        if not pid:
-            return {}
+        # From kernel, see ``BccTracer.task_ids_prog``, other namespaces are from /proc
+        kernel_ns = {
+            k: v for k, v in (("pid", model.get("pid_ns")), ("mnt", model.get("mnt_ns"))) if v
+        }
 
-        proc_info = self.proc_watcher.get(pid)
+        pid = model.get("pid")
+        proc_info = self.proc_watcher.get(pid) if pid else None
         if not proc_info or not proc_info.ns:
-            return {}
+            return kernel_ns
 
-        return {k: self.get_ns_id(v) for k, v in proc_info.ns.items()}
+        return {**{k: self.get_ns_id(v) for k, v in proc_info.ns.items()}, **kernel_ns}
 
     def get_ns_id(self, ns: str) -> int:
         # pid:[4026531836] -> [4026531836] -> 4026531836
@@ -293,11 +660,19 @@ class CgroupInspector(Inspector):
     def name(self) -> str:
         return self.sep.join(["proc", "cgroup"])
 
-    def __init__(self) -> None:
-        self.proc_watcher = ProcWatcher()
+    def __init__(self, proc_watcher: ProcWatcher | None = None) -> None:
+        self.proc_watcher = proc_watcher or ProcWatcher()
+        self.cgroup_resolver = CgroupResolver()
 
     def _inspect(self, model: dict[str, Any]) -> dict[str, Any]:
         pid = model.get("pid")
+        cgroup_id = model.get("cgroup_id")
+        if cgroup_id:
+            # From kernel, see ``BccTracer.task_ids_prog``
+            cgroups = self.cgroup_resolver.get(cgroup_id, pid)
+            if cgroups:
+                return {"cgroups": cgroups}
+
         if not pid:
             return {}
 
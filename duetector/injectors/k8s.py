@@ -1,15 +1,15 @@
 from __future__ import annotations
 
+import os
+import socket
 from collections import namedtuple
-from typing import Any
-
-try:
-    from functools import cache
-except ImportError:
-    from functools import lru_cache as cache
+from threading import Event, Lock, Thread
+from typing import Any, Callable
 
 from kubernetes import client
 from kubernetes import config as k8s_config
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
 
 from duetector.extension.injector import hookimpl
 from duetector.injectors.base import ProcInjector
@@ -17,9 +17,224 @@ from duetector.injectors.inspector import Inspector
 from duetector.log import logger
 
 
+class PodInformer:
+    """
+    A cache of pods on a node, listed once then kept up to date by watching,
+    indexed by pod uid and container id.
+
+    Only pods with ``spec.nodeName`` of ``node_name`` are listed and watched, all pods if empty.
+    Watching resumes from the last ``resourceVersion``,
+    pods are listed again when it's too old (``410 Gone``) or watching fails.
+
+    ``api`` is a ``CoreV1Api``, or a fake with ``list_pod_for_all_namespaces``,
+    ``watch_factory`` makes a ``kubernetes.watch.Watch``, or a fake with ``stream`` and ``stop``.
+    """
+
+    def __init__(
+        self,
+        api,
+        node_name: str = "",
+        watch_timeout_s: int = 300,
+        retry_s: float = 5,
+        watch_factory: Callable[[], Any] = watch.Watch,
+    ):
+        self.api = api
+        self.node_name = node_name
+        self.watch_timeout_s = watch_timeout_s
+        self.retry_s = retry_s
+        self.watch_factory = watch_factory
+
+        self.resource_version: str | None = None
+        self.synced = Event()
+        self._pods: dict[str, Any] = {}
+        self._containers: dict[str, tuple[str, Any]] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._watch = None
+        self._thread: Thread | None = None
+
+    @property
+    def selector(self) -> dict[str, str]:
+        """
+        Field selector of pods on ``node_name``, as kwargs of list and watch.
+        """
+        return {"field_selector": f"spec.nodeName={self.node_name}"} if self.node_name else {}
+
+    def __len__(self) -> int:
+        return len(self._pods)
+
+    @staticmethod
+    def _container_id(container_id: str) -> str:
+        # containerd://{id} -> {id}
+        return container_id.split("://", 1)[-1]
+
+    @staticmethod
+    def _container_statuses(pod) -> list[Any]:
+        status = pod.status
+        if not status:
+            return []
+        return [
+            *(status.init_container_statuses or []),
+            *(status.container_statuses or []),
+            *(status.ephemeral_container_statuses or []),
+        ]
+
+    def _index(self, pod) -> None:
+        uid = pod.metadata.uid
+        self._unindex(uid)
+        self._pods[uid] = pod
+        for cs in self._container_statuses(pod):
+            if cs.container_id:
+                self._containers[self._container_id(cs.container_id)] = (uid, cs)
+
+    def _unindex(self, uid: str) -> None:
+        pod = self._pods.pop(uid, None)
+        if not pod:
+            return
+        for cs in self._container_statuses(pod):
+            if not cs.container_id:
+                continue
+            container_id = self._container_id(cs.container_id)
+            if self._containers.get(container_id, (None,))[0] == uid:
+                del self._containers[container_id]
+
+    def list(self) -> None:
+        """
+        List pods and replace the cache.
+        """
+        pods = self.api.list_pod_for_all_namespaces(**self.selector)
+        with self._lock:
+            self._pods.clear()
+            self._containers.clear()
+            for pod in pods.items:
+                self._index(pod)
+            self.resource_version = pods.metadata.resource_version
+        if not pods.items and self.node_name:
+            logger.warning(f"No pod found on node {self.node_name}, check ``node_name`` config")
+        self.synced.set()
+
+    def apply(self, event: dict[str, Any]) -> bool:
+        """
+        Apply a watch event to the cache, ``False`` if pods should be listed again.
+        """
+        event_type, pod = event["type"], event["object"]
+        if event_type == "ERROR":
+            logger.info(f"Pod watch error: {pod}")
+            return False
+        with self._lock:
+            if event_type == "DELETED":
+                self._unindex(pod.metadata.uid)
+            elif event_type in ("ADDED", "MODIFIED"):
+                self._index(pod)
+            # BOOKMARK only moves resource version
+            self.resource_version = pod.metadata.resource_version
+        return True
+
+    def _run(self) -> None:
+        relist = True
+        while not self._stop.is_set():
+            try:
+                if relist:
+                    self.list()
+                    relist = False
+                self._watch = self.watch_factory()
+                for event in self._watch.stream(
+                    self.api.list_pod_for_all_namespaces,
+                    resource_version=self.resource_version,
+                    timeout_seconds=self.watch_timeout_s,
+                    **self.selector,
+                ):
+                    if not self.apply(event):
+                        relist = True
+                        break
+                    if self._stop.is_set():
+                        break
+            except ApiException as e:
+                relist = True
+                if e.status == 410:
+                    # Resource version too old, list again now
+                    continue
+                logger.error(f"Failed to list or watch pods: {e.status} {e.reason}")
+                self._stop.wait(self.retry_s)
+            except Exception as e:
+                relist = True
+                logger.exception(e)
+                self._stop.wait(self.retry_s)
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="PodInformer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watch:
+            self._watch.stop()
+        if self._thread:
+            self._thread.join(1)
+            self._thread = None
+
+    def get(self, pod_id: str, container_id: str) -> dict[str, Any]:
+        """
+        Info of a container, as much as found:
+        ``pod_name``, ``namespace``, ``container_name`` and ``container_runtime``.
+        """
+        with self._lock:
+            pod, cs = None, None
+            found = self._containers.get(container_id)
+            if found:
+                uid, cs = found
+                pod = self._pods.get(uid)
+            else:
+                pod = self._pods.get(pod_id)
+                for status in self._container_statuses(pod) if pod else []:
+                    # Container id parsed from cgroups may be truncated
+                    if status.container_id and container_id in status.container_id:
+                        cs = status
+                        break
+
+        container_info = {}
+        if pod:
+            container_info["pod_name"] = pod.metadata.name
+            container_info["namespace"] = pod.metadata.namespace
+        if cs:
+            container_info["container_name"] = cs.name
+            container_info["container_runtime"] = cs.container_id.split(":")[0]
+        return container_info
+
+
 class K8SInjector(ProcInjector, Inspector):
+    """
+    Inject pod and container info of processes in k8s pods.
+
+    Pod and container ids are parsed from cgroups,
+    then looked up in a ``PodInformer`` of pods on this node.
+
+    Special config:
+        - informer: Config of ``PodInformer``
+            - node_name: Name of this node, ``NODE_NAME`` env or hostname by default
+            - watch_timeout_s: Max duration of one watch request
+            - retry_s: Wait before listing again after an error
+            - sync_timeout_s: Max wait for the first list on the first lookup
+    """
+
     name = "k8s"
 
+    default_config = {
+        **ProcInjector.default_config,
+        "informer": {
+            "node_name": "",
+            "watch_timeout_s": 300,
+            "retry_s": 5,
+            "sync_timeout_s": 5,
+        },
+    }
+    """
+    Default config for ``K8SInjector``.
+    """
+
     def __init__(self, config: dict[str, Any] = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
         try:
@@ -33,6 +248,25 @@ class K8SInjector(ProcInjector, Inspector):
         else:
             self.client = client
 
+        self.informer: PodInformer | None = None
+        self._sync_waited = Event()
+        self._sync_wait_lock = Lock()
+        if self.client and not self.disabled:
+            self.informer = PodInformer(
+                self.client.CoreV1Api(),
+                node_name=self.node_name,
+                watch_timeout_s=int(self.config.informer.watch_timeout_s),
+                retry_s=float(self.config.informer.retry_s),
+            )
+            self.informer.start()
+
+    @property
+    def node_name(self) -> str:
+        """
+        Name of this node, pods on it are cached.
+        """
+        return self.config.informer.node_name or os.getenv("NODE_NAME") or socket.gethostname()
+
     def get_patch_kwargs(
         self, data: namedtuple, extra: dict[str, Any] | None = None
     ) -> dict[str, Any]:
@@ -53,6 +287,13 @@ class K8SInjector(ProcInjector, Inspector):
 
         if not cgroups:
             return {}
+        return self.cached_by_cgroup(
+            model,
+            lambda: self._inspect_cgroups(cgroups),
+            complete=lambda info: "container_name" in info,
+        )
+
+    def _inspect_cgroups(self, cgroups: list[str]) -> dict[str, Any]:
         maybe_pod_id = None
         maybe_container_id = None
         try:
@@ -82,40 +323,29 @@ class K8SInjector(ProcInjector, Inspector):
             **container_info,
         }
 
-    @cache
-    def _query_container_info(self, pod_id: str, maybe_container_id: str):
-        if not self.client:
+    def _query_container_info(self, pod_id: str, maybe_container_id: str) -> dict[str, Any]:
+        if not self.informer:
             return {}
-        pod = None
-        container_status = None
-        container_info = {}
-        try:
-            for p in self.client.CoreV1Api().list_pod_for_all_namespaces().items:
-                if p.metadata.uid == pod_id:
-                    pod = p
-                    container_info["pod_name"] = p.metadata.name
-                    container_info["namespace"] = p.metadata.namespace
-                    break
-            if not pod:
-                logger.info(f"Pod not found: {pod_id}")
-                return container_info
-            for cs in pod.status.container_statuses:
-                if maybe_container_id in cs.container_id:
-                    container_status = cs
-                    container_info["container_name"] = cs.name
-                    container_info["container_runtime"] = cs.container_id.split(":")[0]
-                    break
-            if not container_status:
-                logger.info(f"Container not found: {maybe_container_id}")
-                return container_info
-
-        except Exception as e:
-            logger.error("Exception when query container info from k8s api.")
-            logger.exception(e)
-            return container_info
+        if not self._sync_waited.is_set():
+            # Only the first lookup waits for the first list, concurrent ones wait for it
+            with self._sync_wait_lock:
+                if not self._sync_waited.is_set():
+                    if not self.informer.synced.wait(float(self.config.informer.sync_timeout_s)):
+                        logger.warning("Pods are not listed yet, container info may be missing")
+                    self._sync_waited.set()
 
+        container_info = self.informer.get(pod_id, maybe_container_id)
+        if "pod_name" not in container_info:
+            logger.info(f"Pod not found: {pod_id}")
+        elif "container_name" not in container_info:
+            logger.info(f"Container not found: {maybe_container_id}")
         return container_info
 
+    def shutdown(self):
+        if self.informer:
+            self.informer.stop()
+        super().shutdown()
+
 
 @hookimpl
 def init_injector(config=None):
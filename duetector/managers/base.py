@@ -45,6 +45,19 @@ class Manager(Configuable):
             return self._include_extension
         return self.config.include_extension
 
+    def is_batch_capable(self, obj: Any) -> bool:
+        """
+        If ``obj`` handles batches in bulk.
+
+        Declared by the first plugin's ``batch_capable`` hook returning not ``None``,
+        or ``obj.batch_capable``.
+        """
+        hook = getattr(self.pm.hook, "batch_capable", None)
+        declared = hook(obj=obj) if hook else None
+        if declared is not None:
+            return bool(declared)
+        return bool(getattr(obj, "batch_capable", False))
+
     def register(self, subpackage):
         """
         Register subpackage to plugin manager
@@ -26,6 +26,15 @@ def init_collector(config) -> Collector | None:
     """
 
 
+@hookspec(firstresult=True)
+def batch_capable(obj) -> bool | None:
+    """
+    Declare if a collector initialized by ``init_collector`` handles batches in bulk.
+
+    None means unknown, ``Collector.batch_capable`` will be used.
+    """
+
+
 class CollectorManager(Manager):
     """
     Manager for all collectors.
@@ -66,6 +75,9 @@ class CollectorManager(Manager):
                 logger.info(f"Collector {f.__class__.__name__} is disabled")
                 continue
 
+            f.batch_capable = self.is_batch_capable(f)
+            if f.batch_capable:
+                logger.info(f"Collector {f.__class__.__name__} is batch capable")
             objs.append(f)
 
         return objs
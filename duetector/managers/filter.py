@@ -24,6 +24,15 @@ def init_filter(config) -> Filter | None:
     """
 
 
+@hookspec(firstresult=True)
+def batch_capable(obj) -> bool | None:
+    """
+    Declare if a filter initialized by ``init_filter`` handles batches in bulk.
+
+    None means unknown, ``Filter.batch_capable`` will be used.
+    """
+
+
 class FilterManager(Manager):
     """
     Manager for all filters.
@@ -63,6 +72,9 @@ class FilterManager(Manager):
                 logger.info(f"Filter {f.__class__.__name__} is disabled")
                 continue
 
+            f.batch_capable = self.is_batch_capable(f)
+            if f.batch_capable:
+                logger.info(f"Filter {f.__class__.__name__} is batch capable")
             objs.append(f)
 
         return objs
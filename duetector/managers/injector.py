@@ -24,6 +24,15 @@ def init_injector(config) -> Injector | None:
     """
 
 
+@hookspec(firstresult=True)
+def batch_capable(obj) -> bool | None:
+    """
+    Declare if a injector initialized by ``init_injector`` handles batches in bulk.
+
+    None means unknown, ``Injector.batch_capable`` will be used.
+    """
+
+
 class InjectorManager(Manager):
     """
     Manager for all Injectors.
@@ -63,6 +72,9 @@ class InjectorManager(Manager):
                 logger.info(f"Injector {f.__class__.__name__} is disabled")
                 continue
 
+            f.batch_capable = self.is_batch_capable(f)
+            if f.batch_capable:
+                logger.info(f"Injector {f.__class__.__name__} is batch capable")
             objs.append(f)
 
         return objs
@@ -1,25 +1,27 @@
 from __future__ import annotations
 
-from collections import namedtuple
+from collections import Counter, deque, namedtuple
+from itertools import groupby
+from threading import Lock
 
 from duetector.injectors.base import Injector
-from duetector.managers.collector import CollectorManager
-from duetector.managers.filter import FilterManager
-from duetector.managers.injector import InjectorManager
+from duetector.monitors.pipeline import PipelineRuntime
 
 try:
     from functools import cache
 except ImportError:
     from functools import lru_cache as cache
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from typing import Any, Callable
 
 from duetector.collectors.base import Collector
+from duetector.collectors.models import TrackingRecord
 from duetector.config import Configuable
 from duetector.filters.base import Filter
 from duetector.log import logger
 from duetector.tools.poller import Poller
+from duetector.tools.scheduler import Scheduler
 from duetector.tracers.base import Tracer
 
 
@@ -29,6 +31,9 @@ class Monitor(Configuable):
 
     A monitor is a collection of tracers, filters and collectors,
     record host and tracer, provide a way to poll data
+
+    Filters, injectors, collectors and tracers come from ``runtime``,
+    pass the same ``PipelineRuntime`` to monitors to share them.
     """
 
     tracers: list[Tracer]
@@ -47,6 +52,10 @@ class Monitor(Configuable):
     """
     A list of collectors, should be initialized by ``InjectorManager``
     """
+    runtime: PipelineRuntime | None
+    """
+    Runtime providing filters, injectors, collectors and tracers, ``None`` if disabled.
+    """
 
     config_scope = "monitor"
     """
@@ -55,30 +64,94 @@ class Monitor(Configuable):
 
     default_config = {
         "disabled": False,
+        "executor": "pooled",
         "backend_args": {
             "max_workers": 10,
         },
         "poller": {
             **Poller.default_config,
         },
+        "batch": {
+            "enabled": False,
+            "max_size": 4096,
+        },
+        "workers": {
+            "processes": 0,
+            "start_method": "spawn",
+            "max_pending": 64,
+        },
     }
     """
     Default config for monitor.
 
-    Two sub-configs are available:
-        - backend_args: config for ``self._backend_imp``
+    Config:
+        - executor: Executor mode to poll tracers, one of ``Scheduler.executor_modes``,
+          ``pooled`` uses ``Scheduler``'s shared pool of ``poll_lane``
+        - backend_args: config for ``self._backend_imp``, only for ``dedicated`` executor
         - poller: config for ``Poller``
+        - batch: Process events of one poll as a batch
+            - enabled: Enable batch mode, ``auto`` to enable it
+              only if any filter, injector or collector is ``batch_capable``
+            - max_size: Process the batch early when it reaches this size
+        - workers: Run the pipeline in worker processes, see ``ProcessPipeline``
+            - processes: Number of worker processes, ``0`` to run the pipeline in monitor's process
+            - start_method: ``multiprocessing`` start method of workers
+            - max_pending: Max batches waiting for a worker, monitor blocks when reached
+
+    In batch mode, tracer callback only buffers events,
+    all events drained by one poll of a tracer go through the pipeline after the poll, see ``flush_batch``.
+    Batch capable plugins are called once per batch (``Filter.filter_batch``,
+    ``Injector.get_patch_kwargs_batch``, ``Collector.emit_batch``),
+    consecutive per-event filters and injectors run in one pass over the batch,
+    so plugins of both kinds can be mixed in one pipeline.
+
+    With worker processes, batch mode is always enabled, the monitor only drains tracers
+    and ships batches to workers. Collectors' summaries of workers are available after ``shutdown``.
     """
 
     _backend_imp = ThreadPoolExecutor
     """
-    A backend implementation.
+    Backend implementation for ``dedicated`` executor.
+    """
+
+    poll_lane = "poll"
+    """
+    ``Scheduler`` lane for ``pooled`` executor, ``blocking`` for monitors whose polls block.
+    """
+
+    filter_phases = ("pre_injection", "post_injection")
+    """
+    Filters run in two phases, see ``_split_filters``.
     """
 
-    def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
+    def __init__(
+        self,
+        config: dict[str, Any] | None = None,
+        runtime: PipelineRuntime | None = None,
+        *args,
+        **kwargs,
+    ):
         super().__init__(config=config)
-        self._backend = self._backend_imp(**self.backend_args._config_dict)
+        self.runtime = None
+        if not self.disabled:
+            # Runtime configures ``Scheduler``, create it first
+            self.runtime = (runtime or PipelineRuntime(config)).acquire()
+
+        self._backend = Scheduler().get_executor(
+            self.config.executor,
+            lane=self.poll_lane,
+            dedicated_factory=lambda: self._backend_imp(**self.backend_args._config_dict),
+            dedicated_workers=int(self.backend_args.max_workers or 1),
+        )
         self.poller = Poller(self.config._config_dict)
+        self._filter_drops: Counter = Counter({phase: 0 for phase in self.filter_phases})
+        self._filter_drops_lock = Lock()
+        self._lost_events: dict[str, int] = {}
+        self._startup_ms: dict[str, dict[str, float]] = {}
+        self._batches: dict[Tracer, deque] = {}
+        self._workers = None
+        self._polls: set[Future] = set()
+        self._polls_lock = Lock()
 
         if self.disabled:
             self.tracers = []
@@ -86,9 +159,25 @@ class Monitor(Configuable):
             self.collectors = []
             self.injectors = []
             return
-        self.filters: list[Filter] = FilterManager(config).init()
-        self.collectors: list[Collector] = CollectorManager(config).init()
-        self.injectors: list[Injector] = InjectorManager(config).init()
+        self.filters: list[Filter] = self.runtime.filters
+        self.collectors: list[Collector] = []
+        self.injectors: list[Injector] = []
+        if not self.processes:
+            self.collectors = self.runtime.collectors
+            self.injectors = self.runtime.injectors
+        else:
+            # Workers build their own collectors and injectors,
+            # filters are kept for ``kernel_rules``
+            from duetector.monitors.workers import ProcessPipeline
+
+            self._workers = ProcessPipeline(
+                self.runtime.config,
+                self.config_scope,
+                self.default_config,
+                processes=self.processes,
+                start_method=self.config.workers.start_method,
+                max_pending=int(self.config.workers.max_pending),
+            )
 
     @property
     def disabled(self):
@@ -104,11 +193,89 @@ class Monitor(Configuable):
         """
         return self.config.backend_args
 
+    @property
+    def processes(self) -> int:
+        """
+        Number of worker processes running the pipeline.
+        """
+        return int(self.config.workers.processes or 0)
+
+    @property
+    def batch_enabled(self) -> bool:
+        """
+        If process events of one poll as a batch.
+        """
+        if self.processes:
+            return True
+        enabled = self.config.batch.enabled
+        if enabled == "auto":
+            # Own components, a released runtime is not rebuilt by late callbacks
+            return any(p.batch_capable for p in (*self.filters, *self.injectors, *self.collectors))
+        return bool(enabled)
+
+    @property
+    def batch_max_size(self) -> int:
+        """
+        Process the batch early when it reaches this size.
+        """
+        return max(int(self.config.batch.max_size), 1)
+
     def poll_all(self):
         """
         Poll all tracers. Depends on ``self.poll``.
         """
-        return self._backend.map(self.poll, self.tracers)
+        return self._map_polls(self.poll, self.tracers)
+
+    def _map_polls(self, poll_fn: Callable[[Tracer], Any], tracers: list[Tracer]):
+        """
+        Submit ``poll_fn`` of each tracer to the backend, like ``Executor.map``.
+
+        The backend may be shared by other monitors,
+        so polls in flight are tracked and waited for on ``shutdown``.
+        """
+        fn = self._batched_poll(poll_fn)
+        futures = [self._backend.submit(fn, tracer) for tracer in tracers]
+        with self._polls_lock:
+            self._polls.update(futures)
+        for f in futures:
+            f.add_done_callback(self._discard_poll)
+        return (f.result() for f in futures)
+
+    def _discard_poll(self, future: Future):
+        # Called by executor threads
+        with self._polls_lock:
+            self._polls.discard(future)
+
+    def _batched_poll(self, poll_fn: Callable[[Tracer], Any]) -> Callable[[Tracer], Any]:
+        """
+        Wrap ``poll_fn(tracer)``, in batch mode events buffered during the poll are flushed after it.
+        """
+        if not self.batch_enabled:
+            return poll_fn
+
+        def _(tracer):
+            try:
+                return poll_fn(tracer)
+            finally:
+                self.flush_batch(tracer)
+
+        return _
+
+    def flush_batch(self, tracer: Tracer | None = None):
+        """
+        Process buffered events of ``tracer`` as a batch, all tracers if ``None``.
+        """
+        tracers = [tracer] if tracer is not None else list(self._batches)
+        for tracer in tracers:
+            buffer = self._batches.get(tracer)
+            if not buffer:
+                continue
+            # Other threads may append while draining, only take what we see
+            batch = [buffer.popleft() for _ in range(len(buffer))]
+            if self._workers:
+                self._workers.submit(tracer, batch)
+            else:
+                self._get_batch_fn(tracer)(batch)
 
     def poll(self, tracer: Tracer):
         """
@@ -118,14 +285,48 @@ class Monitor(Configuable):
 
     def summary(self) -> dict:
         """
-        Get a summary of all collectors.
+        Get a summary of all collectors, counters of their queues collected in ``collector_queues``,
+        events dropped by filters in each phase,
+        events lost by each tracer before reaching monitor, and startup time of each tracer.
+
+        With worker processes, collectors are summarized by each worker in ``workers``.
         """
+        if self._workers:
+            return {
+                self.__class__.__name__: {
+                    **self._workers.summary(),
+                    "lost_events": dict(self._lost_events),
+                    "startup_ms": dict(self._startup_ms),
+                }
+            }
         return {
             self.__class__.__name__: {
-                collector.__class__.__name__: collector.summary() for collector in self.collectors
+                **{
+                    collector.__class__.__name__: collector.summary()
+                    for collector in self.collectors
+                },
+                "collector_queues": {
+                    collector.__class__.__name__: collector.queue_stats()
+                    for collector in self.collectors
+                },
+                "filter_drops": dict(self._filter_drops),
+                "lost_events": dict(self._lost_events),
+                "startup_ms": dict(self._startup_ms),
             }
         }
 
+    def record_lost_events(self, tracer: Tracer, total: int):
+        """
+        Record total lost events of a tracer, e.g. ring buffer is full.
+        """
+        self._lost_events[tracer.__class__.__name__] = total
+
+    def record_startup(self, tracer: Tracer, **timings_ms: float):
+        """
+        Record time of each step to get a tracer ready, e.g. ``compile`` and ``attach`` a bpf program.
+        """
+        self._startup_ms[tracer.__class__.__name__] = timings_ms
+
     def start_polling(self):
         """
         Start polling. Poller will call ``self.poll_all`` periodically.
@@ -139,31 +340,175 @@ class Monitor(Configuable):
         """
         self.poller.shutdown()
         self.poller.wait()
-        self._backend.shutdown()
-        for c in self.collectors:
-            c.shutdown()
-        for i in self.injectors:
-            i.shutdown()
+        with self._polls_lock:
+            polls = list(self._polls)
+        wait(polls)
+        self.flush_batch()
+        if self._workers:
+            self._workers.shutdown()
+        Scheduler().release(self._backend)
+        if self.runtime:
+            runtime, self.runtime = self.runtime, None
+            runtime.release()
 
     def _inject_extra_info(self, data: namedtuple) -> namedtuple:
+        """
+        Merge patch kwargs of all injectors, then patch ``data`` once.
+        """
+        if not self.injectors:
+            return data
         patch_kwargs = {}
         for injector in self.injectors:
             patch_kwargs.update(injector.get_patch_kwargs(data, patch_kwargs))
-        data = Injector.patch(data, patch_kwargs)
+        return Injector.patch(data, patch_kwargs)
+
+    def _split_filters(self, tracer) -> tuple[list[Filter], list[Filter]]:
+        """
+        Split filters into two phases, ``pre_injection`` and ``post_injection``.
+
+        A filter runs before injectors if it declares ``required_fields``,
+        and each of them is either tracer's raw field or can't be provided by any injector.
+        """
+        raw_fields = set(getattr(getattr(tracer, "data_t", None), "_fields", ()))
+
+        def _is_raw(field):
+            return field in raw_fields or not any(i.may_provide(field) for i in self.injectors)
+
+        pre, post = [], []
+        for f in self.filters:
+            fields = f.required_fields
+            if fields is not None and all(_is_raw(field) for field in fields):
+                pre.append(f)
+            else:
+                post.append(f)
+        return pre, post
+
+    def _inject_extra_info_batch(self, batch: list[namedtuple]) -> list[namedtuple]:
+        """
+        Batch version of ``_inject_extra_info``.
+        """
+        if not self.injectors:
+            return batch
+        patch_kwargs = [{} for _ in batch]
+        for capable, group in groupby(self.injectors, key=lambda i: i.batch_capable):
+            if capable:
+                for injector in group:
+                    for kwargs, injected in zip(
+                        patch_kwargs, injector.get_patch_kwargs_batch(batch, patch_kwargs)
+                    ):
+                        kwargs.update(injected)
+                continue
+            # Per-event injectors in one pass
+            injectors = list(group)
+            for data, kwargs in zip(batch, patch_kwargs):
+                for injector in injectors:
+                    kwargs.update(injector.get_patch_kwargs(data, kwargs))
+        return [Injector.patch(data, kwargs) for data, kwargs in zip(batch, patch_kwargs)]
+
+    def _run_filters_batch(
+        self, filters: list[Filter], batch: list[namedtuple], phase: str
+    ) -> list[namedtuple]:
+        """
+        Batch version of ``_run_filters``,
+        batch capable filters get the whole batch, consecutive per-event filters run in one pass.
+        """
+        size = len(batch)
+        for capable, group in groupby(filters, key=lambda f: f.batch_capable):
+            if capable:
+                for filter in group:
+                    batch = filter.filter_batch(batch)
+                    if not batch:
+                        break
+            else:
+                batch = [data for data in map(self._per_event_filters(list(group)), batch) if data]
+            if not batch:
+                break
+        if len(batch) < size:
+            with self._filter_drops_lock:
+                self._filter_drops[phase] += size - len(batch)
+        return batch
+
+    @staticmethod
+    def _per_event_filters(filters: list[Filter]) -> Callable[[namedtuple], namedtuple | None]:
+        def _(data):
+            for filter in filters:
+                data = filter(data)
+                if not data:
+                    return None
+            return data
+
+        return _
+
+    def _run_filters(self, filters: list[Filter], data: namedtuple, phase: str) -> namedtuple:
+        for filter in filters:
+            data = filter(data)
+            if not data:
+                with self._filter_drops_lock:
+                    self._filter_drops[phase] += 1
+                return None
         return data
 
+    @cache
+    def _get_batch_fn(self, tracer) -> Callable[[list[namedtuple]], None]:
+        pre_filters, post_filters = self._split_filters(tracer)
+
+        def _(batch):
+            try:
+                batch = self._run_filters_batch(pre_filters, batch, "pre_injection")
+                if not batch:
+                    return
+                batch = self._inject_extra_info_batch(batch)
+                batch = self._run_filters_batch(post_filters, batch, "post_injection")
+                if not batch or not self.collectors:
+                    return
+                # Build records once, share them with all collectors
+                records = [TrackingRecord.from_namedtuple(tracer, data) for data in batch]
+                for collector in self.collectors:
+                    collector.emit_batch(tracer, records)
+            except Exception as e:
+                logger.exception(e)
+
+        return _
+
+    def _get_buffer_fn(self, tracer) -> Callable[[namedtuple], None]:
+        """
+        Callback for batch mode, buffer events until ``flush_batch``.
+        """
+        buffer = self._batches.setdefault(tracer, deque())
+        max_size = self.batch_max_size
+
+        def _(data):
+            buffer.append(data)
+            if len(buffer) >= max_size:
+                self.flush_batch(tracer)
+
+        return _
+
     @cache
     def _get_callback_fn(self, tracer) -> Callable[[namedtuple], None]:
+        if self.batch_enabled:
+            return self._get_buffer_fn(tracer)
+
+        pre_filters, post_filters = self._split_filters(tracer)
+        logger.debug(
+            f"Filters for {tracer}: pre_injection {pre_filters}, post_injection {post_filters}"
+        )
+
         def _(data):
             try:
+                data = self._run_filters(pre_filters, data, "pre_injection")
+                if not data:
+                    return
                 data = self._inject_extra_info(data)
-
-                for filter in self.filters:
-                    data = filter(data)
-                    if not data:
-                        return
+                data = self._run_filters(post_filters, data, "post_injection")
+                if not data:
+                    return
+                if not self.collectors:
+                    return
+                # Build record once, share it with all collectors
+                r = TrackingRecord.from_namedtuple(tracer, data)
                 for collector in self.collectors:
-                    collector.emit(tracer, data)
+                    collector.emit(tracer, r)
             except Exception as e:
                 logger.exception(e)
 
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Callable
 
 from duetector.collectors.base import Collector
-from duetector.filters.base import Filter
+from duetector.exceptions import TracerCompileError
+from duetector.filters.base import Filter, KernelRules
 from duetector.injectors.base import Injector
 from duetector.log import logger
 from duetector.managers.collector import CollectorManager
 from duetector.managers.filter import FilterManager
 from duetector.managers.injector import InjectorManager
-from duetector.managers.tracer import TracerManager
 from duetector.monitors.base import Monitor
+from duetector.tools.compile_failure_cache import CompileFailureCache
+from duetector.tools.scheduler import InlineExecutor
 from duetector.tracers import BccTracer
 
 
@@ -21,6 +26,33 @@ class BccMonitor(Monitor):
     Special config:
         - auto_init: Auto init tracers when init monitor.
         - continue_on_exception: Continue on exception when init tracers.
+        - compile_workers: Threads compiling tracers in parallel on init, ``1`` to compile one by one.
+        - event_driven: Consume ring buffers as soon as events arrive.
+            - enabled: Use one consumer thread per tracer instead of ``Poller``.
+            - wakeup_ms: Max time a consumer blocks in ``poll_fn``, only to check for shutdown.
+        - compile_failure_cache: Config for ``CompileFailureCache``, programs known to fail
+          to compile are not compiled again, the slowest ones are compiled first.
+        - kernel_filter: Check simple rules of filters in bpf programs, see ``Filter.kernel_rules``.
+            - enabled: Compile tracers with ``kernel_filter`` with ``KERNEL_FILTER``
+            - max_entries: Max entries of each kernel filter map
+
+    In event driven mode, each consumer thread blocks in the tracer's ``poll_fn``
+    (e.g. ``ring_buffer_poll``, which waits on the ring buffer's epoll fd),
+    so events are handled when they arrive and idle consumers cost nearly no CPU.
+
+    Lost events of each tracer are read after every poll, see ``BccTracer.get_lost_events``.
+
+    On init, programs are compiled in parallel threads, bcc calls clang through ``ctypes``
+    which releases the GIL, then tracers are attached one by one in order.
+    Compile and attach time of each tracer is logged and reported in ``summary``.
+
+    With kernel filter, events excluded by rules of filters (e.g. ``PatternFilter``'s
+    ``exclude_uid``) are dropped before output, instead of being copied to user space then dropped.
+    Rules are pushed into bpf maps after attaching, and again on poll whenever they change.
+
+    Tracers in aggregation mode (see ``BccTracer.aggregating``) count events in kernel,
+    each poll reads and resets the counts, emitting one tracking per key.
+    In event driven mode, their consumers poll every ``wakeup_ms``.
     """
 
     config_scope = "monitor.bcc"
@@ -28,6 +60,18 @@ class BccMonitor(Monitor):
         **Monitor.default_config,
         "auto_init": True,
         "continue_on_exception": True,
+        "compile_workers": 4,
+        "event_driven": {
+            "enabled": False,
+            "wakeup_ms": 100,
+        },
+        "compile_failure_cache": {
+            **CompileFailureCache.default_config,
+        },
+        "kernel_filter": {
+            "enabled": False,
+            "max_entries": 1024,
+        },
     }
 
     @property
@@ -37,6 +81,20 @@ class BccMonitor(Monitor):
         """
         return self.config.continue_on_exception
 
+    @property
+    def compile_workers(self) -> int:
+        """
+        Threads compiling tracers in parallel on init.
+        """
+        return max(int(self.config.compile_workers), 1)
+
+    @property
+    def kernel_filter(self) -> bool:
+        """
+        If check simple rules of filters in bpf programs.
+        """
+        return bool(self.config.kernel_filter.enabled)
+
     @property
     def auto_init(self):
         """
@@ -44,56 +102,282 @@ class BccMonitor(Monitor):
         """
         return self.config.auto_init
 
+    @property
+    def event_driven(self) -> bool:
+        """
+        Consume ring buffers in consumer threads instead of ``Poller``.
+        """
+        return bool(self.config.event_driven.enabled)
+
+    @property
+    def wakeup_ms(self) -> int:
+        """
+        Max time a consumer thread blocks before checking for shutdown.
+        """
+        return int(self.config.event_driven.wakeup_ms)
+
     def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
-        super().__init__(config=config)
+        super().__init__(config=config, *args, **kwargs)
+        self._consumers: list[threading.Thread] = []
+        self._consumer_stop = threading.Event()
+        self.compile_failure_cache = CompileFailureCache(self.config._config_dict)
+        self._kernel_rules: KernelRules | None = None
+        self._filter_kernel_rules: list[KernelRules | None] = []
+        self._kernel_rules_lock = threading.Lock()
         if self.disabled:
             logger.info("BccMonitor disabled")
             return
 
-        self.tracers: list[BccTracer] = TracerManager(config).init(tracer_type=BccTracer)  # type: ignore
+        self.tracers: list[BccTracer] = self.runtime.get_tracers(BccTracer)  # type: ignore
 
         self.bpf_tracers: dict[Any, BccTracer] = {}
         if self.auto_init:
             self.init()
 
-    def init(self):
+    def init(self, bpf_cls: type | None = None):
         """
-        Init all tracers
+        Init all tracers, compile them in parallel and attach them in order.
+
+        Args:
+            bpf_cls: Class to compile programs, ``bcc.BPF`` by default
         """
 
-        # Prevrent ImportError for CI testing without bcc
-        from bcc import BPF  # noqa
+        if bpf_cls is None:
+            # Prevrent ImportError for CI testing without bcc
+            from bcc import BPF  # noqa
 
-        err_tracers = []
+            bpf_cls = BPF
 
-        for tracer in self.tracers:
-            try:
-                bpf = BPF(text=tracer.prog)
-            except Exception as e:
-                logger.error(f"Failed to compile {tracer.__class__.__name__}")
-                logger.exception(e)
-                if self.continue_on_exception:
-                    logger.info(
-                        f"Continuing on exception. {tracer.__class__.__name__} will be disabled."
-                    )
-                    err_tracers.append(tracer)
-                    continue
-                else:
-                    raise e
-            tracer.attach(bpf)
-            self._set_callback(bpf, tracer)
-            self.bpf_tracers[tracer] = bpf
-            logger.info(f"Tracer {tracer.__class__.__name__} attached")
+        def _timed_compile(tracer):
+            start = time.perf_counter()
+            bpf = self._compile(tracer, bpf_cls)
+            return bpf, (time.perf_counter() - start) * 1000
+
+        workers = min(self.compile_workers, len(self.tracers))
+        pool = None
+        if workers > 1:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duetector-compile")
+            # Slowest first by last compile time, so they don't start last and delay the others
+            submitted = {
+                tracer: pool.submit(_timed_compile, tracer)
+                for tracer in sorted(self.tracers, key=self._last_compile_ms, reverse=True)
+            }
+            futures = [submitted[tracer] for tracer in self.tracers]
+        else:
+            # Compile lazily, stop at the first failure without continue_on_exception
+            inline = InlineExecutor()
+            futures = (inline.submit(_timed_compile, tracer) for tracer in self.tracers)
+
+        err_tracers = []
+        try:
+            for tracer, future in zip(list(self.tracers), futures):
+                try:
+                    bpf, compile_ms = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to compile {tracer.__class__.__name__}")
+                    logger.exception(e)
+                    if self.continue_on_exception:
+                        logger.info(
+                            f"Continuing on exception. {tracer.__class__.__name__} will be disabled."
+                        )
+                        err_tracers.append(tracer)
+                        continue
+                    else:
+                        raise e
+                start = time.perf_counter()
+                tracer.attach(bpf)
+                self._set_callback(bpf, tracer)
+                self.bpf_tracers[tracer] = bpf
+                attach_ms = (time.perf_counter() - start) * 1000
+                self.record_startup(tracer, compile=compile_ms, attach=attach_ms)
+                logger.info(
+                    f"Tracer {tracer.__class__.__name__} attached, "
+                    f"compile {compile_ms:.0f}ms, attach {attach_ms:.0f}ms"
+                )
+        finally:
+            if pool:
+                for f in futures:
+                    f.cancel()
+                pool.shutdown(wait=True)
 
         # Remove tracers that failed to compile
         for tracer in err_tracers:
             self.tracers.remove(tracer)
 
+        self.sync_kernel_filter(force=True)
+
+    def get_cflags(self, tracer: BccTracer) -> list[str]:
+        """
+        ``tracer.cflags`` with kernel filter macros if enabled.
+        """
+        cflags = tracer.cflags
+        if self.kernel_filter and tracer.kernel_filter:
+            cflags = [
+                *cflags,
+                "-DKERNEL_FILTER",
+                f"-DKF_MAX_ENTRIES={int(self.config.kernel_filter.max_entries)}",
+            ]
+        return cflags
+
+    def get_kernel_rules(self) -> KernelRules:
+        """
+        Merged ``kernel_rules`` of all enabled filters.
+        """
+        rules = KernelRules()
+        for f in self.filters:
+            if f.disabled:
+                continue
+            r = f.kernel_rules()
+            if r:
+                rules = rules.merge(r)
+        return rules
+
+    def sync_kernel_filter(self, force: bool = False):
+        """
+        Push kernel rules into bpf maps of tracers if they changed since last sync.
+
+        Filters return the same ``KernelRules`` until their rules change,
+        rules are only merged and compared when any of them is a new one.
+        """
+        if not self.kernel_filter:
+            return
+        filter_rules = [None if f.disabled else f.kernel_rules() for f in self.filters]
+        if (
+            not force
+            and len(filter_rules) == len(self._filter_kernel_rules)
+            and all(a is b for a, b in zip(filter_rules, self._filter_kernel_rules))
+        ):
+            return
+        self._filter_kernel_rules = filter_rules
+        rules = self.get_kernel_rules()
+        if not force and rules == self._kernel_rules:
+            return
+        with self._kernel_rules_lock:
+            for tracer, host in self.bpf_tracers.items():
+                try:
+                    tracer.set_kernel_filter(
+                        host, rules, max_entries=int(self.config.kernel_filter.max_entries)
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to update kernel filter of {tracer.__class__.__name__}")
+                    logger.exception(e)
+            self._kernel_rules = rules
+        logger.info(f"Kernel filter updated: {rules}")
+
+    def _last_compile_ms(self, tracer: BccTracer) -> float:
+        """
+        Time of the last successful compile of ``tracer`` on this host, ``0`` if unknown.
+        """
+        key = self.compile_failure_cache.key(tracer.prog, self.get_cflags(tracer))
+        return self.compile_failure_cache.compile_ms(key) or 0
+
+    def _compile(self, tracer: BccTracer, bpf_cls: type) -> Any:
+        """
+        Compile ``tracer.prog`` with ``bpf_cls`` (``bcc.BPF``), unless it's known to fail.
+
+        Exceptions:
+            - TracerCompileError: If the program failed to compile within ``failure_ttl_s``.
+        """
+        name = tracer.__class__.__name__
+        cflags = self.get_cflags(tracer)
+        key = self.compile_failure_cache.key(tracer.prog, cflags)
+        failure = self.compile_failure_cache.known_failure(key)
+        if failure:
+            raise TracerCompileError(
+                f"{name} failed to compile on this host, skipped by compile failure cache: "
+                f"{failure.get('error')}"
+            )
+
+        start = time.perf_counter()
+        try:
+            bpf = bpf_cls(text=tracer.prog, cflags=cflags)
+        except Exception as e:
+            if self.compile_failure_cache.is_deterministic(str(e)):
+                self.compile_failure_cache.put(
+                    key,
+                    name,
+                    ok=False,
+                    compile_ms=(time.perf_counter() - start) * 1000,
+                    error=str(e),
+                )
+            raise
+        compile_ms = (time.perf_counter() - start) * 1000
+        self.compile_failure_cache.put(key, name, ok=True, compile_ms=compile_ms)
+        logger.debug(f"Compiled {name} in {compile_ms:.0f}ms")
+        return bpf
+
     def poll(self, tracer: BccTracer):  # type: ignore
         """
         Implement poll method for bcc tracers.
         """
-        tracer.get_poller(self.bpf_tracers[tracer])(**tracer.poll_args)
+        host = self.bpf_tracers[tracer]
+        tracer.get_poller(host)(**tracer.poll_args)
+        self.record_lost_events(tracer, tracer.get_lost_events(host))
+        self.sync_kernel_filter()
+
+    def start_polling(self):
+        """
+        Start consumer threads in event driven mode, otherwise start ``Poller``.
+        """
+        if not self.event_driven:
+            return super().start_polling()
+
+        if self._consumers:
+            raise RuntimeError("Consumers are already started, try shutdown first.")
+        logger.info(f"Start consuming {self.__class__.__name__}")
+        self._consumer_stop.clear()
+        for tracer in self.tracers:
+            if not tracer.poll_fn:
+                # Nothing to wait on
+                continue
+            t = threading.Thread(
+                target=self._consume,
+                args=(tracer,),
+                name=f"{self.__class__.__name__}-{tracer.__class__.__name__}",
+                daemon=True,
+            )
+            t.start()
+            self._consumers.append(t)
+
+    def _consume(self, tracer: BccTracer):
+        """
+        Consumer thread, block in ``poll_fn`` until events arrive or ``wakeup_ms`` passes.
+        """
+        host = self.bpf_tracers[tracer]
+        poller = tracer.get_poller(host)
+        poll_args = {**tracer.poll_args, "timeout": self.wakeup_ms}
+        while not self._consumer_stop.is_set():
+            if tracer.aggregating and self._consumer_stop.wait(self.wakeup_ms / 1000):
+                # Aggregated polls never block, read the map every ``wakeup_ms``
+                break
+            try:
+                poller(**poll_args)
+                self.flush_batch(tracer)
+                self.record_lost_events(tracer, tracer.get_lost_events(host))
+                self.sync_kernel_filter()
+            except Exception as e:
+                logger.exception(e)
+                # Prevent busy loop on persistent error
+                self._consumer_stop.wait(self.wakeup_ms / 1000)
+
+        if self.poller.call_when_shutdown:
+            # Drain events left in buffer
+            try:
+                poller(**{**poll_args, "timeout": 0})
+                self.flush_batch(tracer)
+                self.record_lost_events(tracer, tracer.get_lost_events(host))
+            except Exception as e:
+                logger.exception(e)
+
+    def shutdown(self):
+        """
+        Stop consumer threads if started, then shutdown the monitor.
+        """
+        self._consumer_stop.set()
+        for t in self._consumers:
+            t.join()
+        self._consumers = []
+        super().shutdown()
 
 
 if __name__ == "__main__":
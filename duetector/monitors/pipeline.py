@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any
+
+from duetector.collectors.base import Collector
+from duetector.filters.base import Filter
+from duetector.injectors.base import Injector
+from duetector.log import logger
+from duetector.managers.collector import CollectorManager
+from duetector.managers.filter import FilterManager
+from duetector.managers.injector import InjectorManager
+from duetector.managers.tracer import TracerManager
+from duetector.tools.scheduler import Scheduler
+from duetector.tracers.base import Tracer
+
+
+class PipelineRuntime:
+    """
+    Filters, injectors, collectors and tracers shared by monitors in a process.
+
+    Create one runtime and pass it to every monitor,
+    so there is only one set of collectors (and their executors, db engines)
+    and one injector chain, no matter how many monitors are enabled.
+    A monitor creates its own runtime if not given one.
+
+    Tracers are initialized once, each monitor takes those of its type by ``get_tracers``.
+
+    ``Scheduler`` is configured by the runtime, before any monitor or collector uses it.
+
+    Filters, collectors and injectors are created on first use, usually by the first monitor,
+    so a runtime no monitor uses starts no collector, writer thread or ``ProcWatcher``.
+    Monitors ``acquire`` the runtime on init and ``release`` it on shutdown,
+    collectors and injectors are shutdown when the last monitor releases it.
+
+    Example:
+
+    .. code-block:: python
+
+        runtime = PipelineRuntime(config)
+        monitors = [BccMonitor(config, runtime=runtime), ShMonitor(config, runtime=runtime)]
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
+        self.config = config
+        self.scheduler = Scheduler(config)
+
+        self._filters: list[Filter] | None = None
+        self._collectors: list[Collector] | None = None
+        self._injectors: list[Injector] | None = None
+        self._tracers: list[Tracer] | None = None
+        self._lock = Lock()
+        self._refs = 0
+
+    @property
+    def filters(self) -> list[Filter]:
+        with self._lock:
+            if self._filters is None:
+                self._filters = FilterManager(self.config).init()
+        return self._filters
+
+    @property
+    def collectors(self) -> list[Collector]:
+        with self._lock:
+            if self._collectors is None:
+                self._collectors = CollectorManager(self.config).init()
+        return self._collectors
+
+    @property
+    def injectors(self) -> list[Injector]:
+        with self._lock:
+            if self._injectors is None:
+                self._injectors = InjectorManager(self.config).init()
+        return self._injectors
+
+    @property
+    def batch_capable(self) -> bool:
+        """
+        If any filter, injector or collector handles batches in bulk.
+        """
+        return any(p.batch_capable for p in (*self.filters, *self.injectors, *self.collectors))
+
+    def get_tracers(self, tracer_type: type = Tracer) -> list[Tracer]:
+        """
+        Get tracers of ``tracer_type``, all tracers are initialized on first call.
+        """
+        with self._lock:
+            if self._tracers is None:
+                self._tracers = TracerManager(self.config).init()
+        return [t for t in self._tracers if isinstance(t, tracer_type)]
+
+    @property
+    def refs(self) -> int:
+        """
+        Number of monitors using this runtime.
+        """
+        return self._refs
+
+    def acquire(self) -> PipelineRuntime:
+        """
+        Called by monitor on init.
+        """
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        """
+        Called by monitor on shutdown, shutdown the runtime when no monitor is using it.
+        """
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        self.shutdown()
+
+    def shutdown(self):
+        """
+        Shutdown all collectors and injectors, if they are created.
+
+        Filters, collectors and injectors are dropped,
+        monitors acquiring the runtime later create new ones on first use.
+        """
+        logger.info("Shutting down pipeline runtime")
+        with self._lock:
+            collectors, self._collectors = self._collectors, None
+            injectors, self._injectors = self._injectors, None
+            self._filters = None
+        for c in collectors or []:
+            c.shutdown()
+        for i in injectors or []:
+            i.shutdown()
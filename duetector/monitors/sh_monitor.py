@@ -18,7 +18,6 @@ from duetector.collectors.base import Collector
 from duetector.log import logger
 from duetector.managers.collector import CollectorManager
 from duetector.managers.filter import FilterManager
-from duetector.managers.tracer import TracerManager
 from duetector.monitors.base import Monitor
 from duetector.tracers.base import ShellTracer
 
@@ -97,6 +96,9 @@ class ShMonitor(Monitor):
     Config scope for this monitor.
     """
 
+    # Shell commands may take up to ``timeout``, keep them off bcc tracers' lane
+    poll_lane = "blocking"
+
     default_config = {
         **Monitor.default_config,
         "auto_init": True,
@@ -130,7 +132,7 @@ class ShMonitor(Monitor):
             logger.info("ShMonitor disabled")
             return
 
-        self.tracers: list[ShellTracer] = TracerManager(config).init(tracer_type=ShellTracer)  # type: ignore
+        self.tracers: list[ShellTracer] = self.runtime.get_tracers(ShellTracer)  # type: ignore
 
         self.host = ShTracerHost(self._backend, self.timeout)
         if self.auto_init:
@@ -143,7 +145,7 @@ class ShMonitor(Monitor):
             logger.info(f"Tracer {tracer.__class__.__name__} attached")
 
     def poll_all(self):
-        return self.host.poll_all()
+        return self._map_polls(self.host.poll, list(self.host.tracers))
 
     def poll(self, tracer: ShellTracer):  # type: ignore
         return self.host.poll(tracer)
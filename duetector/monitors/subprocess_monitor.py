@@ -15,7 +15,6 @@ from duetector.log import logger
 from duetector.managers.collector import CollectorManager
 from duetector.managers.filter import FilterManager
 from duetector.managers.injector import InjectorManager
-from duetector.managers.tracer import TracerManager
 from duetector.monitors.base import Monitor
 from duetector.proto.subprocess import (
     EventMessage,
@@ -196,6 +195,9 @@ class SubprocessHost:
 class SubprocessMonitor(Monitor):
     config_scope = "monitor.subprocess"
 
+    # Polls wait on subprocesses' output, keep them off bcc tracers' lane
+    poll_lane = "blocking"
+
     default_config = {
         **Monitor.default_config,
         "auto_init": True,
@@ -247,7 +249,7 @@ class SubprocessMonitor(Monitor):
             logger.info("SubprocessMonitor disabled")
             return
 
-        self.tracers: list[SubprocessTracer] = TracerManager(config).init(tracer_type=SubprocessTracer)  # type: ignore
+        self.tracers: list[SubprocessTracer] = self.runtime.get_tracers(SubprocessTracer)  # type: ignore
 
         self.host = SubprocessHost(
             timeout=self.timeout,
@@ -270,7 +272,7 @@ class SubprocessMonitor(Monitor):
         super().shutdown()
 
     def poll_all(self):
-        return self.host.poll_all()
+        return self._map_polls(self.host.poll, list(self.host.tracers))
 
     def poll(self, tracer: SubprocessTracer):  # type: ignore
         return self.host.poll(tracer)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import signal
+from collections import Counter, namedtuple
+from typing import Any, NamedTuple
+
+try:
+    from functools import cache
+except ImportError:
+    from functools import lru_cache as cache
+
+from duetector.collectors.models import get_tracer_name
+from duetector.log import logger
+from duetector.monitors.base import Monitor
+from duetector.utils import AgentPids
+
+
+@cache
+def _get_data_type(type_name: str, fields: tuple[str, ...]) -> type:
+    return namedtuple(type_name, fields)
+
+
+class TracerInfo(NamedTuple):
+    """
+    What workers need to know about a tracer, shipped with each batch instead of the tracer.
+    """
+
+    name: str
+    type_name: str
+    fields: tuple[str, ...]
+    resolve_cwd: bool = True
+
+    @staticmethod
+    def from_data(tracer, data: namedtuple) -> TracerInfo:
+        return TracerInfo(
+            name=get_tracer_name(tracer),
+            type_name=data.__class__.__name__,
+            fields=tuple(data._fields),
+            resolve_cwd=getattr(tracer, "resolve_cwd", True),
+        )
+
+    @property
+    def data_t(self) -> type:
+        """
+        Data type of the tracer, rebuilt in workers.
+        """
+        return _get_data_type(self.type_name, self.fields)
+
+
+class PipelineWorker(Monitor):
+    """
+    Runs injectors, filters and collectors of a monitor in a worker process, see ``ProcessPipeline``.
+
+    It's a monitor without tracers, using the config scope of the monitor it works for.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any] | None,
+        config_scope: str,
+        default_config: dict[str, Any],
+    ):
+        self.config_scope = config_scope
+        self.default_config = default_config
+        super().__init__(config=config)
+        self.tracers = []
+
+    @property
+    def processes(self) -> int:
+        return 0
+
+    def process(self, info: TracerInfo, rows: list[tuple]):
+        """
+        Run the pipeline for a batch of ``rows`` of a tracer.
+        """
+        data_t = info.data_t
+        self._get_batch_fn(info)([data_t._make(row) for row in rows])
+
+
+def _run_worker(
+    config: dict[str, Any] | None,
+    config_scope: str,
+    default_config: dict[str, Any],
+    inbox,
+    outbox,
+    monitor_pid: int,
+):
+    """
+    Entry of worker processes, process batches until ``None``, then send back the summary.
+
+    A ``frozenset`` message is the pids of the agent, the monitor and all workers.
+    """
+    # Shutdown is driven by the monitor process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Filters ignore the monitor's events rather than this worker's only
+    AgentPids.add([monitor_pid])
+    worker = PipelineWorker(config, config_scope, default_config)
+    try:
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            if isinstance(message, frozenset):
+                AgentPids.add(message)
+                continue
+            for info, rows in message:
+                worker.process(info, rows)
+    finally:
+        worker.shutdown()
+        try:
+            summary = worker.summary()[worker.__class__.__name__]
+        except Exception as e:
+            logger.exception(e)
+            summary = {}
+        outbox.put(summary)
+
+
+class ProcessPipeline:
+    """
+    Ship batches of a monitor to worker processes, each of them runs the injectors, filters
+    and collectors of its own ``PipelineWorker``, so the pipeline is not limited by one GIL.
+
+    Events are sharded by ``pid``, all events of a process go to the same worker,
+    so per-pid caches of injectors stay local. Events without ``pid`` go to the first worker.
+
+    A batch is shipped as plain tuples grouped by tracer, one message per worker through a pipe,
+    ``max_pending`` messages per worker at most, the monitor blocks when workers fall behind.
+
+    Collectors are created in every worker, they should tolerate multiple processes,
+    e.g. ``DBCollector`` with a database server rather than a sqlite file.
+
+    Workers are added to ``AgentPids``, so events of the monitor and workers themselves
+    (e.g. writing to the database) are ignored by filters, in kernel and in workers.
+
+    If a worker dies, its batches are dropped and counted in ``worker_drops`` instead of
+    blocking the monitor.
+    """
+
+    _monitor_keys = ("collector_queues", "filter_drops", "lost_events", "startup_ms")
+    """
+    Keys of a worker's summary which are not from collectors.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any] | None,
+        config_scope: str,
+        default_config: dict[str, Any],
+        processes: int,
+        start_method: str = "spawn",
+        max_pending: int = 64,
+    ):
+        ctx = multiprocessing.get_context(start_method)
+        self.processes = processes
+        self._inboxes = [ctx.Queue(maxsize=max_pending) for _ in range(processes)]
+        self._outbox = ctx.Queue()
+        self._infos: dict[tuple[Any, type], TracerInfo] = {}
+        self._procs = [
+            ctx.Process(
+                target=_run_worker,
+                args=(config, config_scope, default_config, inbox, self._outbox, os.getpid()),
+                name=f"duetector-worker-{i}",
+                daemon=True,
+            )
+            for i, inbox in enumerate(self._inboxes)
+        ]
+        for p in self._procs:
+            p.start()
+        self.summaries: list[dict[str, Any]] = []
+        self._dropped: Counter = Counter()
+
+        self.pids = frozenset(p.pid for p in self._procs)
+        AgentPids.add(self.pids)
+        for i in range(processes):
+            self._put(i, AgentPids.get())
+
+    def _put(self, i: int, message, timeout: float = 1) -> bool:
+        """
+        Put ``message`` into inbox of worker ``i``, blocking while it's full and the worker is alive.
+
+        Return ``False`` if the worker is dead.
+        """
+        proc = self._procs[i]
+        while proc.is_alive():
+            try:
+                self._inboxes[i].put(message, timeout=timeout)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def shard(self, data: namedtuple) -> int:
+        """
+        Index of the worker for ``data``.
+        """
+        pid = getattr(data, "pid", None)
+        return pid % self.processes if isinstance(pid, int) else 0
+
+    def _get_info(self, tracer, data: namedtuple) -> TracerInfo:
+        key = (tracer, data.__class__)
+        info = self._infos.get(key)
+        if info is None:
+            info = self._infos.setdefault(key, TracerInfo.from_data(tracer, data))
+        return info
+
+    def submit(self, tracer, batch: list[namedtuple]):
+        """
+        Shard ``batch`` of ``tracer`` and ship it to workers.
+        """
+        shards: list[dict[TracerInfo, list[tuple]]] = [{} for _ in range(self.processes)]
+        for data in batch:
+            rows = shards[self.shard(data)].setdefault(self._get_info(tracer, data), [])
+            rows.append(tuple(data))
+        for i, shard in enumerate(shards):
+            if shard and not self._put(i, list(shard.items())):
+                name = self._procs[i].name
+                if not self._dropped[name]:
+                    logger.error(f"Pipeline worker {name} exited, dropping its batches")
+                self._dropped[name] += sum(len(rows) for rows in shard.values())
+
+    def shutdown(self, timeout: float = 30):
+        """
+        Stop workers after they finish pending batches, and collect their summaries.
+        """
+        alive = [i for i in range(self.processes) if self._put(i, None)]
+        for _ in alive:
+            try:
+                self.summaries.append(self._outbox.get(timeout=timeout))
+            except queue.Empty:
+                logger.warning("Timeout waiting for pipeline worker's summary")
+                break
+        for p in self._procs:
+            p.join(timeout)
+            if p.is_alive():
+                logger.warning(f"Terminating pipeline worker {p.name}")
+                p.terminate()
+        AgentPids.remove(self.pids)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Filter drops summed over workers, each worker's collectors summary and queue counters,
+        and events dropped because their worker exited.
+        """
+        filter_drops: Counter = Counter()
+        for s in self.summaries:
+            filter_drops.update(s.get("filter_drops", {}))
+        return {
+            "filter_drops": dict(filter_drops),
+            "collector_queues": [s.get("collector_queues", {}) for s in self.summaries],
+            "workers": [
+                {k: v for k, v in s.items() if k not in self._monitor_keys} for s in self.summaries
+            ],
+            "worker_drops": dict(self._dropped),
+        }
@@ -3,6 +3,7 @@ from fastapi.security import APIKeyQuery
 from starlette.status import HTTP_403_FORBIDDEN
 
 from duetector.__init__ import __version__
+from duetector.service.base import lifespan
 from duetector.service.config import Config, get_server_config
 from duetector.service.control.routes import r as cr
 from duetector.service.query.routes import r as qr
@@ -21,6 +22,7 @@ app = FastAPI(
     description="Data Usage Extensible Detector for data usage observability",
     version=__version__,
     dependencies=[Depends(verify_token)],
+    lifespan=lifespan,
 )
 app.include_router(qr)
 app.include_router(cr)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import inspect
+import threading
+from contextlib import asynccontextmanager
 from typing import Any
 
 try:
@@ -7,13 +10,21 @@ try:
 except ImportError:
     from functools import lru_cache as cache
 
-from fastapi import Depends
+from fastapi import Depends, FastAPI, Request
 
 from duetector.config import Configuable
+from duetector.log import logger
 from duetector.service.config import get_config
 
 
 class Controller(Configuable):
+    """
+    A base class for all controllers.
+
+    Controllers are long-lived, created and warmed up once by ``lifespan``,
+    then shared by all requests.
+    """
+
     config_scope = None
 
     default_config = {}
@@ -21,10 +32,79 @@ class Controller(Configuable):
     def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
 
+    def warmup(self):
+        """
+        Prepare expensive resources before serving the first request.
+        """
+        pass
+
+    def shutdown(self):
+        """
+        Release resources when app shutdown.
+
+        Could be a coroutine function, awaited by ``lifespan``.
+        """
+        pass
+
+
+_controller_types: list[type] = []
+"""
+Controller types used by routes, registered by ``get_controller``.
+"""
+_controllers_lock = threading.Lock()
+
+
+def _get_controllers(app: FastAPI) -> dict[type, Controller]:
+    if not hasattr(app.state, "controllers"):
+        app.state.controllers = {}
+    return app.state.controllers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create and warm up all registered controllers on startup, shutdown them on exit.
+    """
+    # Respect overrides, e.g. in tests
+    config = app.dependency_overrides.get(get_config, get_config)()
+    controllers = _get_controllers(app)
+    for controller_type in _controller_types:
+        controller = controller_type(config)
+        controller.warmup()
+        controllers[controller_type] = controller
+        logger.info(f"{controller_type.__name__} warmed up")
+    try:
+        yield
+    finally:
+        with _controllers_lock:
+            for controller in controllers.values():
+                try:
+                    result = controller.shutdown()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.exception(e)
+            controllers.clear()
+
 
 @cache
 def get_controller(controller_type: type):
-    def _(config: dict = Depends(get_config)) -> Controller:
-        return controller_type(config)
+    """
+    Dependency of a long-lived ``controller_type``.
+
+    Controller is created by ``lifespan``,
+    or on first request if app is not started with ``lifespan``.
+    """
+    _controller_types.append(controller_type)
+
+    def _(request: Request, config: dict = Depends(get_config)) -> Controller:
+        controllers = _get_controllers(request.app)
+        controller = controllers.get(controller_type)
+        if controller is None:
+            with _controllers_lock:
+                controller = controllers.get(controller_type)
+                if controller is None:
+                    controller = controllers[controller_type] = controller_type(config)
+        return controller
 
     return _
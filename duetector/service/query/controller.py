@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import inspect
 from typing import Any
 
 from duetector.analyzer.base import Analyzer
@@ -20,6 +21,16 @@ class AnalyzerController(Controller):
             analyzer.config_scope: analyzer for analyzer in self._avaliable_analyzers
         }
 
+    def warmup(self):
+        for analyzer in self._avaliable_analyzers:
+            analyzer.warmup()
+
+    async def shutdown(self):
+        for analyzer in self._avaliable_analyzers:
+            result = analyzer.shutdown()
+            if inspect.isawaitable(result):
+                await result
+
     def _init_analyzer(self, analyzer: type):
         analyzer_config = getattr(self.config, analyzer.config_scope)._config_dict
         return analyzer(analyzer_config)
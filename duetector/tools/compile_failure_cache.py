@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from duetector.config import Configuable
+from duetector.log import logger
+
+
+class CompileFailureCache(Configuable):
+    """
+    Persistent cache of BPF compile failures,
+    keyed by program text and cflags, kernel release, kernel headers and bcc version.
+
+    A program failing to compile on this host (e.g. missing tracepoint, kernel headers)
+    is skipped for ``failure_ttl_s`` without running clang again.
+    Only errors in ``deterministic_errors`` are cached, other failures like
+    ``EPERM``, memlock or ``ENOMEM`` on loading depend on the environment and are retried.
+    Installing kernel headers, upgrading kernel or bcc, or changing the program, changes the key.
+
+    It does not make successful compiles faster: bcc can only load a program by compiling its text,
+    so every program loading fine is still compiled by clang on each start.
+    Loading precompiled objects is the job of CO-RE programs, see ``SubprocessMonitor``.
+    Time of successful compiles is recorded too, only to compile the slowest programs first,
+    see ``compile_ms`` and ``BccMonitor.init``.
+
+    Each entry is a small json file in ``path``, written atomically.
+
+    Special config:
+        - enabled: Enable the cache
+        - path: Directory of cache entries
+        - failure_ttl_s: Skip compiling a failed program for this long, ``0`` to always retry
+    """
+
+    config_scope = "compile_failure_cache"
+    """
+    Config scope for ``CompileFailureCache``.
+    """
+
+    default_config = {
+        "enabled": True,
+        "path": "/var/cache/duetector/bcc-failures",
+        "failure_ttl_s": 3600,
+    }
+    """
+    Default config for ``CompileFailureCache``.
+    """
+
+    deterministic_errors = ("Failed to compile BPF module", "Unable to find kernel headers")
+    """
+    Messages of bcc errors which fail the same way on every try on this host,
+    only these failures are cached.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        """
+        If the cache is enabled.
+        """
+        return bool(self.config.enabled)
+
+    @property
+    def path(self) -> Path:
+        """
+        Directory of cache entries.
+        """
+        return Path(os.path.expanduser(self.config.path))
+
+    @property
+    def failure_ttl_s(self) -> float:
+        """
+        Skip compiling a failed program for this long.
+        """
+        return float(self.config.failure_ttl_s)
+
+    @staticmethod
+    def kernel_release() -> str:
+        return platform.release()
+
+    @staticmethod
+    def kernel_headers() -> str:
+        """
+        Fingerprint of kernel headers, changes when headers are installed or updated.
+        """
+        build = Path("/lib/modules") / platform.release() / "build"
+        try:
+            return str(build.resolve().stat().st_mtime_ns)
+        except OSError:
+            return "none"
+
+    @staticmethod
+    def bcc_version() -> str:
+        try:
+            import bcc
+        except ImportError:
+            return "none"
+        return getattr(bcc, "__version__", "unknown")
+
+    def key(self, prog: str, cflags: list[str] | None = None) -> str:
+        """
+        Cache key of a program on this host.
+        """
+        h = hashlib.sha256()
+        for part in (
+            prog,
+            " ".join(cflags or []),
+            self.kernel_release(),
+            self.kernel_headers(),
+            self.bcc_version(),
+        ):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Get the entry of ``key``, ``None`` if not cached or unreadable.
+        """
+        if not self.enabled:
+            return None
+        try:
+            return json.loads(self._entry_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, tracer: str, ok: bool, compile_ms: float, error: str = ""):
+        """
+        Record a compile result, errors are logged and ignored, the cache is only an optimization.
+        """
+        if not self.enabled:
+            return
+        entry = {
+            "tracer": tracer,
+            "ok": ok,
+            "error": error,
+            "compile_ms": compile_ms,
+            "created_at": time.time(),
+        }
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._entry_path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write compile failure cache {self.path}: {e}")
+
+    @classmethod
+    def is_deterministic(cls, error: str) -> bool:
+        """
+        If ``error`` will happen again for the same key, see ``deterministic_errors``.
+        """
+        return any(e in error for e in cls.deterministic_errors)
+
+    def compile_ms(self, key: str) -> float | None:
+        """
+        Time of the last successful compile of ``key``, ``None`` if unknown.
+        """
+        entry = self.get(key)
+        if not entry or not entry.get("ok"):
+            return None
+        return entry.get("compile_ms")
+
+    def known_failure(self, key: str) -> dict[str, Any] | None:
+        """
+        The failed entry of ``key`` if it's within ``failure_ttl_s``.
+        """
+        entry = self.get(key)
+        if not entry or entry.get("ok") or self.failure_ttl_s <= 0:
+            return None
+        if time.time() - entry.get("created_at", 0) > self.failure_ttl_s:
+            return None
+        return entry
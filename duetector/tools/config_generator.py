@@ -14,6 +14,7 @@ from duetector.managers.injector import InjectorManager
 from duetector.managers.tracer import TracerManager
 from duetector.monitors import BccMonitor, ShMonitor, SubprocessMonitor
 from duetector.service.config import ServerConfig
+from duetector.tools.scheduler import Scheduler
 
 
 def _recursive_load(config_scope: str, config_dict: dict, default_config: dict):
@@ -62,7 +63,7 @@ class ConfigGenerator:
     All monitors to inspect.
     """
 
-    others = [ServerConfig]
+    others = [ServerConfig, Scheduler]
 
     def __init__(
         self,
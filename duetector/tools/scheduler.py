@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from duetector.config import Configuable
+from duetector.exceptions import ConfigError
+from duetector.log import logger
+from duetector.utils import Singleton
+
+
+class InlineExecutor(Executor):
+    """
+    An executor runs callables synchronously in caller's thread.
+    """
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        f: Future = Future()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            f.set_exception(e)
+        else:
+            f.set_result(result)
+        return f
+
+
+class Scheduler(Configuable, metaclass=Singleton):
+    """
+    Process-wide executors for monitors and collectors, within a total worker budget.
+
+    Executor modes:
+        - ``inline``: Run in caller's thread, no thread, no ``Future`` overhead for cheap work
+        - ``pooled``: Run in a shared ``ThreadPoolExecutor`` of a lane
+        - ``dedicated``: Run in the owner's own executor, its workers are reserved from the budget
+
+    There are three lanes of pooled workers, so polling never waits for workers busy on emitting,
+    nor for slow shell commands:
+        - ``poll``: For monitors, ``poll_workers`` workers
+        - ``blocking``: For monitors whose polls block on other processes (shell, subprocess),
+          ``blocking_workers`` workers, not counted in the budget as they mostly wait
+        - ``emit``: For collectors, the rest of ``max_workers`` after ``poll`` and dedicated executors
+
+    Pools are created on first use, so dedicated executors created on init are excluded from them.
+
+    As a singleton, config is taken from the first instantiation, usually by ``PipelineRuntime``.
+
+    Special config:
+        - max_workers: Total worker budget
+        - poll_workers: Workers of ``poll`` lane
+        - blocking_workers: Workers of ``blocking`` lane
+    """
+
+    config_scope = "scheduler"
+    """
+    Config scope for ``Scheduler``.
+    """
+
+    default_config = {
+        "max_workers": 16,
+        "poll_workers": 4,
+        "blocking_workers": 4,
+    }
+    """
+    Default config for ``Scheduler``.
+    """
+
+    executor_modes = ("inline", "pooled", "dedicated")
+    """
+    Available executor modes.
+    """
+
+    lanes = ("poll", "blocking", "emit")
+    """
+    Lanes of pooled workers.
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None, *args, **kwargs):
+        super().__init__(config, *args, **kwargs)
+        self._lock = threading.Lock()
+        self._inline = InlineExecutor()
+        self._pools: dict[str, ThreadPoolExecutor] = {}
+        self._dedicated: dict[Executor, int] = {}
+
+    @property
+    def max_workers(self) -> int:
+        """
+        Total worker budget.
+        """
+        return int(self.config.max_workers)
+
+    @property
+    def poll_workers(self) -> int:
+        """
+        Workers of ``poll`` lane.
+        """
+        return max(int(self.config.poll_workers), 1)
+
+    @property
+    def blocking_workers(self) -> int:
+        """
+        Workers of ``blocking`` lane, out of the budget.
+        """
+        return max(int(self.config.blocking_workers), 1)
+
+    @property
+    def reserved_workers(self) -> int:
+        """
+        Workers reserved by dedicated executors.
+        """
+        with self._lock:
+            return sum(self._dedicated.values())
+
+    def _lane_workers(self, lane: str) -> int:
+        if lane == "poll":
+            return self.poll_workers
+        if lane == "blocking":
+            return self.blocking_workers
+        return max(self.max_workers - self.poll_workers - sum(self._dedicated.values()), 1)
+
+    def _get_pool(self, lane: str) -> ThreadPoolExecutor:
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown lane {lane}, should be one of {self.lanes}")
+        with self._lock:
+            if lane not in self._pools:
+                workers = self._lane_workers(lane)
+                logger.debug(f"Creating {lane} pool with {workers} workers")
+                self._pools[lane] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f"duetector-{lane}"
+                )
+            return self._pools[lane]
+
+    def get_executor(
+        self,
+        mode: str,
+        lane: str = "emit",
+        dedicated_factory: Callable[[], Executor] | None = None,
+        dedicated_workers: int = 1,
+    ) -> Executor:
+        """
+        Get an executor of ``mode``.
+
+        Args:
+            mode: One of ``executor_modes``
+            lane: Lane of pooled workers, one of ``lanes``
+            dedicated_factory: Create the dedicated executor, ``ThreadPoolExecutor`` by default
+            dedicated_workers: Workers of the dedicated executor, reserved from the budget
+
+        Exceptions:
+            - ConfigError: If ``mode`` is unknown.
+        """
+        if mode == "inline":
+            return self._inline
+        if mode == "pooled":
+            return self._get_pool(lane)
+        if mode == "dedicated":
+            executor = (
+                dedicated_factory()
+                if dedicated_factory
+                else ThreadPoolExecutor(max_workers=dedicated_workers)
+            )
+            with self._lock:
+                self._dedicated[executor] = dedicated_workers
+                created_after_pools = bool(self._pools)
+            if created_after_pools:
+                logger.warning(
+                    f"Dedicated executor created after pools, "
+                    f"{self.stats()['workers']} workers may exceed budget {self.max_workers}"
+                )
+            return executor
+        raise ConfigError(f"Unknown executor mode {mode}, should be one of {self.executor_modes}")
+
+    def release(self, executor: Executor, wait: bool = True):
+        """
+        Release an executor got from ``get_executor``.
+
+        Dedicated executors are shutdown, shared ones are kept for others.
+        """
+        with self._lock:
+            dedicated = self._dedicated.pop(executor, None) is not None
+        if dedicated:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Budget and workers of pools and dedicated executors,
+        ``workers`` counts those in the budget, excluding ``blocking`` lane.
+        """
+        pools = {lane: pool._max_workers for lane, pool in self._pools.items()}
+        dedicated = sum(self._dedicated.values())
+        return {
+            "max_workers": self.max_workers,
+            "workers": sum(n for lane, n in pools.items() if lane != "blocking") + dedicated,
+            "pools": pools,
+            "dedicated": dedicated,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shutdown all pools and dedicated executors.
+        """
+        with self._lock:
+            executors = [*self._pools.values(), *self._dedicated]
+            self._pools.clear()
+            self._dedicated.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
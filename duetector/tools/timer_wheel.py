@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from duetector.log import logger
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel, runs delayed callbacks of many keys in one thread.
+
+    Time is divided into ticks of ``tick_s``, a task is put in the slot of the tick it's due,
+    with the rounds of the wheel left. On each tick, due tasks of the current slot are run.
+    Scheduling and cancelling are ``O(1)``, callbacks run at most one tick late.
+
+    Each key has at most one task, scheduling a key again replaces its task.
+    The thread is started on the first ``schedule``, and is a daemon.
+    """
+
+    def __init__(self, tick_s: float = 0.1, slots: int = 512, name: str = "TimerWheel"):
+        self.tick_s = tick_s
+        self.slots = slots
+        self.name = name
+        self._slots: list[dict[Hashable, tuple[int, Callable[[], Any]]]] = [
+            {} for _ in range(slots)
+        ]
+        self._where: dict[Hashable, int] = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, delay_s: float, key: Hashable, fn: Callable[[], Any]) -> None:
+        """
+        Run ``fn`` after ``delay_s``, replacing the pending task of ``key``.
+        """
+        ticks = max(1, math.ceil(delay_s / self.tick_s))
+        with self._lock:
+            self._cancel(key)
+            slot = (self._tick + ticks) % self.slots
+            self._slots[slot][key] = ((ticks - 1) // self.slots, fn)
+            self._where[key] = slot
+            if not self._thread:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Cancel the pending task of ``key``, ``False`` if there is none.
+        """
+        with self._lock:
+            return self._cancel(key)
+
+    def _cancel(self, key: Hashable) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def _advance(self) -> list[Callable[[], Any]]:
+        """
+        Move to the next tick, pop due tasks of its slot.
+        """
+        due = []
+        with self._lock:
+            self._tick += 1
+            slot = self._slots[self._tick % self.slots]
+            for key, (rounds, fn) in list(slot.items()):
+                if rounds:
+                    slot[key] = (rounds - 1, fn)
+                    continue
+                del slot[key]
+                del self._where[key]
+                due.append(fn)
+        return due
+
+    def _run(self):
+        next_tick = time.monotonic() + self.tick_s
+        while not self._stop.wait(max(next_tick - time.monotonic(), 0)):
+            next_tick += self.tick_s
+            for fn in self._advance():
+                try:
+                    fn()
+                except Exception as e:
+                    logger.exception(e)
+
+    def stop(self) -> None:
+        """
+        Stop the thread and drop pending tasks.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(1)
+            self._thread = None
+        with self._lock:
+            for slot in self._slots:
+                slot.clear()
+            self._where.clear()
@@ -1,3 +1,3 @@
-from .base import BccTracer, ShellTracer, SubprocessTracer, Tracer
+from .base import BccTracer, ShellTracer, SubprocessTracer, Tracer, VarlenRecord
 
-__all__ = ["Tracer", "BccTracer", "ShellTracer", "SubprocessTracer"]
+__all__ = ["Tracer", "BccTracer", "ShellTracer", "SubprocessTracer", "VarlenRecord"]
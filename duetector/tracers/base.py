@@ -1,11 +1,48 @@
 from __future__ import annotations
 
+import ctypes
+import functools
+import struct
 from collections import namedtuple
 from threading import Lock
 from typing import Any, Callable
 
 from duetector.config import Config, Configuable
-from duetector.exceptions import TracerError, TreacerDisabledError
+from duetector.exceptions import ConfigError, TracerError, TreacerDisabledError
+from duetector.filters.base import KernelRules
+from duetector.log import logger
+
+
+@functools.lru_cache(maxsize=None)
+def _get_aggregate_t(type_name: str, dimensions: tuple[str, ...]) -> type:
+    return namedtuple(type_name, [*dimensions, "count", "first_timestamp", "timestamp"])
+
+
+class VarlenRecord:
+    """
+    Decoder of variable-length ring buffer records,
+    a fixed header followed by a string which is only output up to its length,
+    e.g. ``ringbuf_output(data, offsetof(struct data_t, fname) + fname_len, 0)``.
+
+    ``header`` is a ``struct`` format of the header, without padding,
+    fields of it are named by ``fields``, the trailing string is named by ``tail``.
+    Strings are cut at the first NUL, decoding is left to ``BccTracer._convert_data``.
+    """
+
+    def __init__(self, type_name: str, header: str, fields: list[str], tail: str):
+        self.header = struct.Struct(header)
+        self.record_t = namedtuple(type_name, [*fields, tail])  # type: ignore
+
+    def decode(self, data: int | ctypes.c_void_p, size: int) -> namedtuple:
+        """
+        Decode a record of ``size`` bytes at address ``data``.
+        """
+        raw = ctypes.string_at(data, size)
+        values = [
+            v.split(b"\0", 1)[0] if isinstance(v, bytes) else v
+            for v in self.header.unpack_from(raw)
+        ]
+        return self.record_t(*values, raw[self.header.size :].split(b"\0", 1)[0])
 
 
 class Tracer(Configuable):
@@ -19,6 +56,9 @@ class Tracer(Configuable):
     ``data_t`` is a NamedTuple, which is used to convert raw data to a ``NamedTuple``.
 
     Default scope for config is ``Tracer.__class__.__name__``.
+
+    Special config:
+        - resolve_cwd: Resolve ``cwd`` of process by ``/proc/{pid}/cwd`` if data has no ``cwd``.
     """
 
     name: str | None
@@ -33,6 +73,7 @@ class Tracer(Configuable):
 
     default_config = {
         "disabled": False,
+        "resolve_cwd": True,
     }
     """
     Default config for this tracer.
@@ -52,6 +93,13 @@ class Tracer(Configuable):
         """
         return self.config.disabled
 
+    @property
+    def resolve_cwd(self) -> bool:
+        """
+        If resolve ``cwd`` of process for data without ``cwd``.
+        """
+        return bool(self.config.resolve_cwd)
+
     def attach(self, host):
         """
         Attach this tracer to host.
@@ -88,17 +136,162 @@ class BccTracer(Tracer):
 
     ``set_callback`` should attatch ``callback`` to ``bpf``, translate raw data to ``data_t`` then call the ``callback``
 
+    Special config:
+        - ringbuf_pages: Pages of ring buffer, must be a power of 2.
+          Passed to ``prog`` as ``RINGBUF_PAGES`` macro, see ``cflags``.
+
+    Tracers can count events failed to output in a per-cpu array named ``lost_events_map``,
+    ``get_lost_events`` reads its total.
+
+    Tracers with ``kernel_filter`` include ``kernel_filter_prog`` in ``prog``,
+    and call ``kf_skip_task`` (and ``kf_skip_path`` for paths) before output.
+    With ``KERNEL_FILTER`` defined, they check ``KernelRules`` kept in bpf maps,
+    which are updated at runtime by ``set_kernel_filter``, without recompiling.
+
+    Tracers include ``task_ids_prog`` to add the cgroup id and namespace inums of the task
+    to records, so injectors don't need to read ``/proc`` for them, see ``CgroupInspector``.
+
+    Tracers with a ``record`` output variable-length records, e.g. paths only up to their length,
+    instead of whole structs with fixed-size buffers, see ``VarlenRecord``.
+
+    Tracers with ``aggregate_map`` can count events in kernel instead of outputting each of them,
+    see ``aggregating``.
+
     FIXME:
         - Maybe it's hard for using? Maybe we should use a more simple way to implement this?
     """
 
     default_config = {
         **Tracer.default_config,
+        "ringbuf_pages": 16,
     }
     """
     Default config for this tracer.
     """
 
+    lost_events_map: str | None = None
+    """
+    Name of a ``BPF_PERCPU_ARRAY(name, u64, 1)`` counting lost events, ``None`` if not supported.
+    """
+
+    kernel_filter: bool = False
+    """
+    If ``prog`` checks ``KernelRules`` by ``kernel_filter_prog``.
+    """
+
+    kernel_filter_path_max: int = 128
+    """
+    Max length in bytes of a path prefix in ``kf_path``, ``KF_PATH_MAX`` of ``kernel_filter_prog``.
+    """
+
+    kernel_filter_prog = """
+    #ifdef KERNEL_FILTER
+    #ifndef KF_MAX_ENTRIES
+    #define KF_MAX_ENTRIES 1024
+    #endif
+    #define KF_PATH_MAX 128
+
+    struct kf_path_key {
+        u32 prefixlen;
+        char path[KF_PATH_MAX];
+    };
+
+    BPF_HASH(kf_pid, u32, u8, KF_MAX_ENTRIES);
+    BPF_HASH(kf_tgid, u32, u8, KF_MAX_ENTRIES);
+    BPF_HASH(kf_uid, u32, u8, KF_MAX_ENTRIES);
+    BPF_HASH(kf_gid, u32, u8, KF_MAX_ENTRIES);
+    BPF_LPM_TRIE(kf_path, struct kf_path_key, u8, KF_MAX_ENTRIES);
+
+    static inline int kf_skip_task(u64 pid_tgid, u64 uid_gid) {
+        u32 pid = pid_tgid;
+        u32 tgid = pid_tgid >> 32;
+        u32 uid = uid_gid;
+        u32 gid = uid_gid >> 32;
+        return kf_pid.lookup(&pid) || kf_tgid.lookup(&tgid) || kf_uid.lookup(&uid)
+            || kf_gid.lookup(&gid);
+    }
+
+    // path should be at least KF_PATH_MAX bytes and NUL terminated
+    static inline int kf_skip_path(const char *path) {
+        struct kf_path_key key = {.prefixlen = KF_PATH_MAX * 8};
+        __builtin_memcpy(key.path, path, KF_PATH_MAX);
+        return kf_path.lookup(&key) != 0;
+    }
+    #else
+    #define kf_skip_task(pid_tgid, uid_gid) 0
+    #define kf_skip_path(path) 0
+    #endif
+    """
+    """
+    Maps and helpers of kernel filter, include it in ``prog`` of tracers with ``kernel_filter``.
+    """
+
+    record: VarlenRecord | None = None
+    """
+    Decoder of variable-length records, ``None`` if ``prog`` outputs whole structs,
+    see ``decode_event``.
+    """
+
+    aggregate_map: str | None = None
+    """
+    Name of a ``BPF_HASH`` counting events by ``aggregate_dimensions`` in aggregation mode,
+    ``None`` if not supported.
+
+    Keys are structs with all ``aggregate_dimensions`` as fields,
+    those not configured are left zero, see ``aggregate_cflags``.
+    Values are structs of ``count``, ``first`` and ``last`` (ns timestamps).
+    """
+
+    aggregate_dimensions: tuple[str, ...] = ()
+    """
+    Fields of ``data_t`` which ``prog`` can aggregate by.
+    """
+
+    task_ids_prog = """
+    #include <linux/sched.h>
+    #include <linux/nsproxy.h>
+    #include <linux/ns_common.h>
+    #include <linux/pid_namespace.h>
+    #include <linux/version.h>
+
+    // Private in fs/mount.h, only ns is needed
+    struct mnt_namespace {
+    #if LINUX_VERSION_CODE < KERNEL_VERSION(5, 11, 0)
+        atomic_t count;
+    #endif
+        struct ns_common ns;
+    };
+
+    // cgroup v2 id of current task, inums of its pid and mount namespaces
+    // The pid namespace is the active one, as /proc/{pid}/ns/pid,
+    // ``nsproxy->pid_ns_for_children`` differs after unshare(CLONE_NEWPID)
+    static inline void get_task_ids(u64 *cgroup_id, u32 *pid_ns, u32 *mnt_ns) {
+        struct task_struct *task = (struct task_struct *)bpf_get_current_task();
+    #if LINUX_VERSION_CODE < KERNEL_VERSION(4, 19, 0)
+        struct pid *pid = task->pids[PIDTYPE_PID].pid;
+    #else
+        struct pid *pid = task->thread_pid;
+    #endif
+        unsigned int level = pid->level;
+        *cgroup_id = bpf_get_current_cgroup_id();
+        *pid_ns = pid->numbers[level].ns->ns.inum;
+        *mnt_ns = task->nsproxy->mnt_ns->ns.inum;
+    }
+    """
+    """
+    Helper to fill ``cgroup_id``, ``pid_ns`` and ``mnt_ns`` of records, include it in ``prog``.
+    """
+
+    kernel_filter_maps = {
+        "pids": "kf_pid",
+        "tgids": "kf_tgid",
+        "uids": "kf_uid",
+        "gids": "kf_gid",
+    }
+    """
+    Hash maps of ``KernelRules`` fields.
+    """
+
     attach_type: str | None = None
     """
     Attatch type for ``bcc.BPF``, called as ``BPF.attatch_{attach_type}``,
@@ -131,12 +324,196 @@ class BccTracer(Tracer):
     bpf program
     """
 
-    def _convert_data(self, data) -> namedtuple:
+    @property
+    def ringbuf_pages(self) -> int:
         """
-        Convert raw data to ``data_t``.
+        Pages of ring buffer.
+
+        Exceptions:
+            - ConfigError: If not a power of 2.
+        """
+        pages = int(self.config.ringbuf_pages)
+        if pages <= 0 or pages & (pages - 1):
+            raise ConfigError(f"ringbuf_pages should be a power of 2, got {pages}")
+        return pages
+
+    @property
+    def cflags(self) -> list[str]:
+        """
+        Compile flags for ``prog``, used as ``bcc.BPF(text=prog, cflags=cflags)``.
+        """
+        return [f"-DRINGBUF_PAGES={self.ringbuf_pages}", *self.aggregate_cflags]
+
+    @property
+    def aggregating(self) -> bool:
+        """
+        If events are counted in ``aggregate_map`` by configured dimensions,
+        rather than output one by one.
+
+        In aggregation mode, ``poll_aggregate`` reads and resets the map on each poll,
+        and calls back once per key, with ``count``, ``first_timestamp``
+        and ``timestamp`` of the last event.
+        Both are nanoseconds since boot in ``aggregate_t`` and ``TrackingRecord``,
+        ``Tracking`` has ``dt`` and ``first_timestamp`` in epoch seconds like serialized ``dt``. See ``aggregate_t``.
+
+        Tracers supporting it have an ``aggregate`` config:
+            - enabled: Enable aggregation mode
+            - dimensions: Fields to aggregate by, a subset of ``aggregate_dimensions``
+            - max_entries: Max keys of ``aggregate_map`` in one poll interval,
+              events of new keys are counted as lost when it's full
+        """
+        return self.aggregate_map is not None and bool(self.config.aggregate.enabled)
+
+    @property
+    def aggregate_by(self) -> tuple[str, ...]:
+        """
+        Configured dimensions of aggregation mode, in the order of ``aggregate_dimensions``.
+
+        Exceptions:
+            - ConfigError: If a dimension is not supported.
         """
+        dimensions = self.config.aggregate.dimensions
+        if dimensions is None:
+            return self.aggregate_dimensions
+        unknown = set(dimensions) - set(self.aggregate_dimensions)
+        if unknown:
+            raise ConfigError(
+                f"{self.__class__.__name__} can not aggregate by {sorted(unknown)}, "
+                f"supported: {list(self.aggregate_dimensions)}"
+            )
+        return tuple(d for d in self.aggregate_dimensions if d in dimensions)
+
+    @property
+    def aggregate_cflags(self) -> list[str]:
+        """
+        ``AGGREGATE``, ``AGG_MAX_ENTRIES`` and ``AGG_<DIMENSION>`` for each configured dimension,
+        empty if not ``aggregating``.
+        """
+        if not self.aggregating:
+            return []
+        return [
+            "-DAGGREGATE",
+            f"-DAGG_MAX_ENTRIES={int(self.config.aggregate.max_entries)}",
+            *(f"-DAGG_{d.upper()}" for d in self.aggregate_by),
+        ]
+
+    @property
+    def aggregate_t(self) -> type:
+        """
+        Data type of aggregation mode, configured dimensions,
+        ``count``, ``first_timestamp`` and ``timestamp`` of the last event.
+        """
+        return _get_aggregate_t(
+            f"{self.data_t.__name__}Aggregation",  # type: ignore
+            self.aggregate_by,
+        )
+
+    def poll_aggregate(self, host, timeout: int = 0):
+        """
+        Read and reset ``aggregate_map``, call back with one ``aggregate_t`` per key.
+
+        Keys are looked up and deleted in batch if the kernel supports it (5.6+),
+        otherwise deleted one by one after reading,
+        counts of a key between its reading and deleting are lost.
+
+        ``timeout`` is accepted for compatibility with ``ring_buffer_poll``, it never blocks.
+        """
+        table = host[self.aggregate_map]
+        try:
+            items = list(table.items_lookup_and_delete_batch())
+        except Exception:
+            items = list(table.items())
+            for k, _ in items:
+                try:
+                    del table[k]
+                except KeyError:
+                    pass
+
+        aggregate_t = self.aggregate_t
+        dimensions = self.aggregate_by
+        for k, v in items:
+            data = aggregate_t(
+                *(getattr(k, d) for d in dimensions),
+                count=v.count,
+                first_timestamp=v.first,
+                timestamp=v.last,
+            )
+            self._aggregate_callback(self._convert_data(data, aggregate_t))
+
+    def set_kernel_filter(self, host, rules: KernelRules, max_entries: int = 1024):
+        """
+        Replace rules in kernel filter maps, at most ``max_entries`` for each map.
+
+        Events may pass the kernel filter while maps are being updated,
+        they are still dropped by filters in user space.
+        """
+        if not self.kernel_filter:
+            return
+
+        def _keys(name, keys, make_key):
+            table = host[name]
+            keys = sorted(keys)
+            if len(keys) > max_entries:
+                logger.warning(
+                    f"{len(keys)} rules for {name} of {self.__class__.__name__}, "
+                    f"only {max_entries} are checked in kernel"
+                )
+                keys = keys[:max_entries]
+            return table, [make_key(table, k) for k in keys]
+
+        def _path_key(table, path):
+            key = table.Key()
+            key.prefixlen = len(path) * 8
+            key.path = path
+            return key
+
+        paths = []
+        for prefix in rules.path_prefixes:
+            path = prefix.encode("utf-8")
+            if len(path) > self.kernel_filter_path_max:
+                logger.warning(
+                    f"Path prefix {prefix} is longer than {self.kernel_filter_path_max} bytes, "
+                    f"only checked in user space"
+                )
+                continue
+            paths.append(path)
+
+        # Build all keys before changing any map, a bad key leaves the previous filter in place
+        filled = [
+            _keys(name, getattr(rules, field), lambda table, k: table.Key(k))
+            for field, name in self.kernel_filter_maps.items()
+        ]
+        filled.append(_keys("kf_path", paths, _path_key))
+        for table, keys in filled:
+            table.clear()
+            for key in keys:
+                table[key] = table.Leaf(1)
+
+    def get_lost_events(self, host) -> int:
+        """
+        Total lost events of all cpus, read from ``lost_events_map``.
+        """
+        if not self.lost_events_map:
+            return 0
+        table = host[self.lost_events_map]
+        return int(sum(table[table.Key(0)]))
+
+    def decode_event(self, host, data, size: int) -> Any:
+        """
+        Decode a ring buffer record by ``record`` if it's variable-length,
+        otherwise by bcc as a whole struct.
+        """
+        if self.record:
+            return self.record.decode(data, size)
+        return host["buffer"].event(data)
+
+    def _convert_data(self, data, data_t: type | None = None) -> namedtuple:
+        """
+        Convert raw data to ``data_t``, or another ``data_t`` like ``aggregate_t``.
+        """
+        data_t = data_t or self.data_t
         args = {}
-        for k in self.data_t._fields:  # type: ignore
+        for k in data_t._fields:  # type: ignore
             v = getattr(data, k)
             if isinstance(v, bytes):
                 try:
@@ -146,7 +523,7 @@ class BccTracer(Tracer):
 
             args[k] = v
 
-        return self.data_t(**args)  # type: ignore
+        return data_t(**args)  # type: ignore
 
     def _attatch(self, host, attatch_type, attatch_args):
         """
@@ -208,6 +585,9 @@ class BccTracer(Tracer):
         if self.disabled:
             raise TreacerDisabledError("Tracer is disabled")
 
+        if self.aggregating:
+            return functools.partial(self.poll_aggregate, host)
+
         if not self.poll_fn:
             # Not support poll, prevent AttributeError, fake one
 
@@ -221,11 +601,18 @@ class BccTracer(Tracer):
             raise TracerError(f"{self.poll_fn} function not found in BPF")
         return poller
 
+    def set_aggregate_callback(self, host, callback: Callable[[namedtuple], None]):
+        """
+        Set callback function for ``poll_aggregate``.
+        """
+        self._aggregate_callback = callback
+
     def set_callback(self, host, callback: Callable[[namedtuple], None]):
         """
         Set callback function to host.
 
-        Should implemented by subclass.
+        Should implemented by subclass,
+        those with ``aggregate_map`` should also call ``set_aggregate_callback``.
         """
         raise NotImplementedError("set_callback not implemented")
 
@@ -24,39 +24,68 @@ class CloneTracer(BccTracer):
         return {"fn_name": "do_trace", "event": self.config.attach_event}
 
     poll_fn = "ring_buffer_poll"
+    lost_events_map = "lost_events"
 
     @property
     def poll_args(self):
         return {"timeout": int(self.config.poll_timeout)}
 
-    data_t = namedtuple("CloneTracking", ["pid", "uid", "gid", "timestamp", "comm"])
-    prog = """
-    #include <linux/sched.h>
+    data_t = namedtuple(
+        "CloneTracking",
+        ["pid", "uid", "gid", "timestamp", "comm", "cgroup_id", "pid_ns", "mnt_ns"],
+    )
+    kernel_filter = True
 
+    prog = (
+        """
+    #include <linux/sched.h>
+    """
+        + BccTracer.task_ids_prog
+        + BccTracer.kernel_filter_prog
+        + """
     // define output data structure in C
     struct data_t {
         u32 pid;
         u32 uid;
         u32 gid;
         u64 timestamp;
+        u64 cgroup_id;
+        u32 pid_ns;
+        u32 mnt_ns;
         char comm[TASK_COMM_LEN];
     };
-    BPF_RINGBUF_OUTPUT(buffer, 1 << 4);
+    #ifndef RINGBUF_PAGES
+    #define RINGBUF_PAGES 16
+    #endif
+
+    BPF_RINGBUF_OUTPUT(buffer, RINGBUF_PAGES);
+    BPF_PERCPU_ARRAY(lost_events, u64, 1);
 
     int do_trace(struct pt_regs *ctx) {
+        u64 pid_tgid = bpf_get_current_pid_tgid();
+        u64 uid_gid = bpf_get_current_uid_gid();
+        if (kf_skip_task(pid_tgid, uid_gid)) {
+            return 0;
+        }
+
         struct data_t data = {};
 
-        data.pid = bpf_get_current_pid_tgid();
-        data.uid = bpf_get_current_uid_gid();
-        data.gid = bpf_get_current_uid_gid() >> 32;
+        data.pid = pid_tgid;
+        data.uid = uid_gid;
+        data.gid = uid_gid >> 32;
         data.timestamp = bpf_ktime_get_ns();
+        get_task_ids(&data.cgroup_id, &data.pid_ns, &data.mnt_ns);
         bpf_get_current_comm(&data.comm, sizeof(data.comm));
 
-        buffer.ringbuf_output(&data, sizeof(data), 0);
+        if (buffer.ringbuf_output(&data, sizeof(data), 0) != 0) {
+            int zero = 0;
+            lost_events.increment(zero);
+        }
 
         return 0;
     }
     """
+    )
 
     def set_callback(self, host, callback: Callable[[namedtuple], None]):
         def _(ctx, data, size):
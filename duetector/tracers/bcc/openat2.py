@@ -1,8 +1,10 @@
+from __future__ import annotations
+
 from collections import namedtuple
 from typing import Callable
 
 from duetector.extension.tracer import hookimpl
-from duetector.tracers.base import BccTracer
+from duetector.tracers.base import BccTracer, VarlenRecord
 
 
 class OpenTracer(BccTracer):
@@ -16,6 +18,11 @@ class OpenTracer(BccTracer):
         **BccTracer.default_config,
         "attach_event": "do_sys_openat2",
         "poll_timeout": 10,
+        "aggregate": {
+            "enabled": False,
+            "dimensions": ["pid", "comm", "fname"],
+            "max_entries": 10240,
+        },
     }
 
     attach_type = "kprobe"
@@ -26,48 +33,172 @@ class OpenTracer(BccTracer):
 
     attatch_args = {"fn_name": "trace_entry", "event": "do_sys_openat2"}
     poll_fn = "ring_buffer_poll"
+    lost_events_map = "lost_events"
 
     @property
     def poll_args(self):
         return {"timeout": int(self.config.poll_timeout)}
 
-    data_t = namedtuple("OpenTracking", ["pid", "uid", "gid", "comm", "fname", "timestamp"])
+    data_t = namedtuple(
+        "OpenTracking",
+        ["pid", "uid", "gid", "comm", "fname", "timestamp", "cgroup_id", "pid_ns", "mnt_ns"],
+    )
+
+    record = VarlenRecord(
+        "OpenRecord",
+        "=QQIIIIII16s",
+        ["timestamp", "cgroup_id", "pid", "uid", "gid", "pid_ns", "mnt_ns", "fname_len", "comm"],
+        "fname",
+    )
+
+    kernel_filter = True
 
-    prog = """
+    aggregate_map = "agg"
+    aggregate_dimensions = ("pid", "uid", "gid", "comm", "fname")
+
+    prog = (
+        """
     #include <linux/sched.h>
     #include <linux/fs_struct.h>
-
+    """
+        + BccTracer.task_ids_prog
+        + BccTracer.kernel_filter_prog
+        + """
+    // Keep in sync with ``record``, only ``fname_len`` bytes of ``fname`` are output
     struct data_t {
+        u64 timestamp;
+        u64 cgroup_id;
         u32 pid;
         u32 uid;
         u32 gid;
+        u32 pid_ns;
+        u32 mnt_ns;
+        u32 fname_len;
         char comm[TASK_COMM_LEN];
         char fname[NAME_MAX];
+    };
 
-        u64 timestamp;
+    #ifndef RINGBUF_PAGES
+    #define RINGBUF_PAGES 16
+    #endif
+
+    BPF_RINGBUF_OUTPUT(buffer, RINGBUF_PAGES);
+    BPF_PERCPU_ARRAY(lost_events, u64, 1);
+    // data_t is too large for the stack
+    BPF_PERCPU_ARRAY(scratch, struct data_t, 1);
+
+    #ifdef AGGREGATE
+    #ifndef AGG_MAX_ENTRIES
+    #define AGG_MAX_ENTRIES 10240
+    #endif
+
+    struct agg_key_t {
+        u32 pid;
+        u32 uid;
+        u32 gid;
+        char comm[TASK_COMM_LEN];
+        char fname[NAME_MAX];
+    };
+
+    struct agg_value_t {
+        u64 count;
+        u64 first;
+        u64 last;
     };
 
-    BPF_RINGBUF_OUTPUT(buffer, 1 << 4);
+    BPF_HASH(agg, struct agg_key_t, struct agg_value_t, AGG_MAX_ENTRIES);
+    // key is too large for the stack with data_t
+    BPF_PERCPU_ARRAY(agg_scratch, struct agg_key_t, 1);
+
+    static inline int aggregate(u64 pid_tgid, u64 uid_gid, const char __user *filename) {
+        int zero = 0;
+        struct agg_key_t *key = agg_scratch.lookup(&zero);
+        if (!key) {
+            return 0;
+        }
+        __builtin_memset(key, 0, sizeof(*key));
+        bpf_probe_read_user_str(&key->fname, sizeof(key->fname), filename);
+        if (kf_skip_path(key->fname)) {
+            return 0;
+        }
+    #ifndef AGG_FNAME
+        __builtin_memset(key->fname, 0, sizeof(key->fname));
+    #endif
+    #ifdef AGG_PID
+        key->pid = pid_tgid;
+    #endif
+    #ifdef AGG_UID
+        key->uid = uid_gid;
+    #endif
+    #ifdef AGG_GID
+        key->gid = uid_gid >> 32;
+    #endif
+    #ifdef AGG_COMM
+        bpf_get_current_comm(&key->comm, sizeof(key->comm));
+    #endif
+
+        u64 now = bpf_ktime_get_ns();
+        struct agg_value_t init = {.count = 0, .first = now, .last = now};
+        struct agg_value_t *value = agg.lookup_or_try_init(key, &init);
+        if (!value) {
+            // map is full
+            lost_events.increment(zero);
+            return 0;
+        }
+        __sync_fetch_and_add(&value->count, 1);
+        value->last = now;
+        return 0;
+    }
+    #endif
 
     int trace_entry(struct pt_regs *ctx, int dfd, const char __user *filename, struct open_how *how) {
-        struct data_t data = {};
-        data.pid = bpf_get_current_pid_tgid();
-        data.uid = bpf_get_current_uid_gid();
-        data.gid = bpf_get_current_uid_gid() >> 32;
-        data.timestamp = bpf_ktime_get_ns();
-        bpf_get_current_comm(&data.comm, sizeof(data.comm));
-        bpf_probe_read_user_str(&data.fname, sizeof(data.fname), filename);
-        buffer.ringbuf_output(&data, sizeof(data), 0);
+        u64 pid_tgid = bpf_get_current_pid_tgid();
+        u64 uid_gid = bpf_get_current_uid_gid();
+        if (kf_skip_task(pid_tgid, uid_gid)) {
+            return 0;
+        }
+    #ifdef AGGREGATE
+        return aggregate(pid_tgid, uid_gid, filename);
+    #endif
+
+        int zero = 0;
+        struct data_t *data = scratch.lookup(&zero);
+        if (!data) {
+            return 0;
+        }
+        data->pid = pid_tgid;
+        data->uid = uid_gid;
+        data->gid = uid_gid >> 32;
+        data->timestamp = bpf_ktime_get_ns();
+        get_task_ids(&data->cgroup_id, &data->pid_ns, &data->mnt_ns);
+        bpf_get_current_comm(&data->comm, sizeof(data->comm));
+        int len = bpf_probe_read_user_str(&data->fname, sizeof(data->fname), filename);
+        if (len <= 0) {
+            data->fname[0] = 0;
+            len = 1;
+        }
+        // Bytes after NUL are left from previous events, never match a prefix
+        if (kf_skip_path(data->fname)) {
+            return 0;
+        }
+        // Mask to bound the size for verifier, len <= NAME_MAX
+        data->fname_len = len & NAME_MAX;
+        u32 size = offsetof(struct data_t, fname) + data->fname_len;
+        if (buffer.ringbuf_output(data, size, 0) != 0) {
+            lost_events.increment(zero);
+        }
         return 0;
     }
     """
+    )
 
     def set_callback(self, host, callback: Callable[[namedtuple], None]):
         def _(ctx, data, size):
-            event = host["buffer"].event(data)
+            event = self.decode_event(host, data, size)
             return callback(self._convert_data(event))  # type: ignore
 
         host["buffer"].open_ring_buffer(_)
+        self.set_aggregate_callback(host, callback)
 
 
 @hookimpl
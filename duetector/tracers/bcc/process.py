@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import os
+from collections import namedtuple
+from typing import Callable
+
+from duetector.extension.tracer import hookimpl
+from duetector.injectors.inspector import CgroupResolver, ProcInfo, ProcWatcher
+from duetector.log import logger
+from duetector.tracers.base import BccTracer, VarlenRecord
+
+
+class ProcessTracer(BccTracer):
+    """
+    A tracer for exec and exit of processes,
+    on tracepoints ``sched:sched_process_exec`` and ``sched:sched_process_exit``.
+
+    ``event`` is ``exec`` or ``exit``, ``fname`` is the executed file for ``exec``,
+    ``exit_code`` is the exit status for ``exit``. Only exits of whole processes are traced.
+
+    Disabled by default, enable it to trace processes or to keep ``ProcWatcher``'s cache by events.
+
+    Special config:
+        - update_proc_cache: Keep ``ProcWatcher``'s cache by events if it's in use,
+          exe, cwd, cgroups and namespaces are captured on exec, caches are removed on exit,
+          watching ``/proc`` becomes a reconciliation every ``reconcile_interval_s``.
+          Only the cache of the monitor's process is kept,
+          it has no effect on injectors in workers, see ``Monitor`` ``processes``.
+        - reconcile_interval_s: Interval of syncing ``/proc`` when the cache is driven by events.
+        - exit_delay_s: Remove a process's cache this long after its exit,
+          for its events still in the pipeline.
+    """
+
+    name = "sched_process"
+
+    default_config = {
+        **BccTracer.default_config,
+        "disabled": True,
+        "poll_timeout": 10,
+        "update_proc_cache": True,
+        "reconcile_interval_s": 60,
+        "exit_delay_s": 5,
+    }
+
+    # Tracepoints are attached on loading
+    attach_type = None
+    poll_fn = "ring_buffer_poll"
+    lost_events_map = "lost_events"
+
+    @property
+    def poll_args(self):
+        return {"timeout": int(self.config.poll_timeout)}
+
+    data_t = namedtuple(
+        "ProcessTracking",
+        [
+            "pid",
+            "ppid",
+            "uid",
+            "gid",
+            "comm",
+            "fname",
+            "event",
+            "exit_code",
+            "timestamp",
+            "cgroup_id",
+            "pid_ns",
+            "mnt_ns",
+        ],
+    )
+
+    record = VarlenRecord(
+        "ProcessRecord",
+        "=QQIIIIIIIII16s",
+        [
+            "timestamp",
+            "cgroup_id",
+            "pid",
+            "ppid",
+            "uid",
+            "gid",
+            "pid_ns",
+            "mnt_ns",
+            "exit_code",
+            "event",
+            "fname_len",
+            "comm",
+        ],
+        "fname",
+    )
+
+    events = ("exec", "exit")
+    """
+    Names of ``event`` in ``prog``, indexed by ``EVENT_EXEC`` and ``EVENT_EXIT``.
+    """
+
+    prog = (
+        """
+    #include <linux/sched.h>
+    """
+        + BccTracer.task_ids_prog
+        + """
+    #define EVENT_EXEC 0
+    #define EVENT_EXIT 1
+
+    // Keep in sync with ``record``, only ``fname_len`` bytes of ``fname`` are output
+    struct data_t {
+        u64 timestamp;
+        u64 cgroup_id;
+        u32 pid;
+        u32 ppid;
+        u32 uid;
+        u32 gid;
+        u32 pid_ns;
+        u32 mnt_ns;
+        u32 exit_code;
+        u32 event;
+        u32 fname_len;
+        char comm[TASK_COMM_LEN];
+        char fname[NAME_MAX];
+    };
+
+    #ifndef RINGBUF_PAGES
+    #define RINGBUF_PAGES 16
+    #endif
+
+    BPF_RINGBUF_OUTPUT(buffer, RINGBUF_PAGES);
+    BPF_PERCPU_ARRAY(lost_events, u64, 1);
+    // data_t is too large for the stack
+    BPF_PERCPU_ARRAY(scratch, struct data_t, 1);
+
+    static inline struct data_t *init_data(u32 event) {
+        int zero = 0;
+        struct data_t *data = scratch.lookup(&zero);
+        if (!data) {
+            return 0;
+        }
+        struct task_struct *task = (struct task_struct *)bpf_get_current_task();
+        u64 uid_gid = bpf_get_current_uid_gid();
+        data->event = event;
+        data->pid = bpf_get_current_pid_tgid() >> 32;
+        data->ppid = task->real_parent->tgid;
+        data->uid = uid_gid;
+        data->gid = uid_gid >> 32;
+        data->exit_code = 0;
+        data->timestamp = bpf_ktime_get_ns();
+        get_task_ids(&data->cgroup_id, &data->pid_ns, &data->mnt_ns);
+        bpf_get_current_comm(&data->comm, sizeof(data->comm));
+        data->fname[0] = 0;
+        data->fname_len = 1;
+        return data;
+    }
+
+    static inline void output(struct data_t *data) {
+        // Mask to bound the size for verifier, fname_len <= NAME_MAX
+        u32 size = offsetof(struct data_t, fname) + (data->fname_len & NAME_MAX);
+        if (buffer.ringbuf_output(data, size, 0) != 0) {
+            int zero = 0;
+            lost_events.increment(zero);
+        }
+    }
+
+    TRACEPOINT_PROBE(sched, sched_process_exec) {
+        struct data_t *data = init_data(EVENT_EXEC);
+        if (!data) {
+            return 0;
+        }
+        unsigned short loc = args->__data_loc_filename & 0xFFFF;
+        int len = bpf_probe_read_kernel_str(&data->fname, sizeof(data->fname), (void *)args + loc);
+        if (len > 0) {
+            data->fname_len = len;
+        }
+        output(data);
+        return 0;
+    }
+
+    TRACEPOINT_PROBE(sched, sched_process_exit) {
+        u64 pid_tgid = bpf_get_current_pid_tgid();
+        if ((u32)pid_tgid != pid_tgid >> 32) {
+            // A thread, not the process
+            return 0;
+        }
+        struct data_t *data = init_data(EVENT_EXIT);
+        if (!data) {
+            return 0;
+        }
+        struct task_struct *task = (struct task_struct *)bpf_get_current_task();
+        data->exit_code = task->exit_code >> 8;
+        output(data);
+        return 0;
+    }
+    """
+    )
+
+    @property
+    def update_proc_cache(self) -> bool:
+        return bool(self.config.update_proc_cache)
+
+    def _convert_data(self, data, data_t: type | None = None) -> namedtuple:
+        data = super()._convert_data(data, data_t)
+        return data._replace(event=self.events[data.event])  # type: ignore
+
+    def on_event(self, data: namedtuple):
+        """
+        Update ``ProcWatcher``'s cache by ``data``, if the watcher is in use.
+
+        On exec, ``data`` is merged over the cached or ``/proc`` info of the process,
+        root, cgroups and other namespaces are kept as exec does not change them.
+        ``exe`` and ``cwd`` are read from ``/proc`` when the event is handled, not when it happened.
+        ``exe`` is the resolved executable like ``ProcInfo.from_pid``,
+        e.g. the interpreter of a script, rather than ``fname`` of the event.
+        If the process exited already, ``exe`` is unknown and the cached ``cwd`` is kept.
+        """
+        watcher = ProcWatcher.get_instance()
+        if not watcher:
+            return
+        watcher.use_events(float(self.config.reconcile_interval_s))
+
+        if data.event == "exit":
+            watcher.remove_cache(data.pid, delay=float(self.config.exit_delay_s))
+            return
+
+        proc_info = watcher.add_cache(data.pid)
+        try:
+            cwd = os.readlink(f"{watcher.proc_dir}/{data.pid}/cwd")
+        except OSError:
+            # Exited already, or permission denied
+            cwd = proc_info.cwd
+        try:
+            exe = os.readlink(f"{watcher.proc_dir}/{data.pid}/exe")
+        except OSError:
+            # The cached one is the image before exec
+            exe = None
+        cgroups = CgroupResolver().get(data.cgroup_id, data.pid) if data.cgroup_id else None
+        watcher.update(
+            proc_info.model_copy(
+                update={
+                    "cwd": cwd,
+                    "exe": exe,
+                    "cgroups": cgroups or proc_info.cgroups,
+                    "ns": {
+                        **(proc_info.ns or {}),
+                        "pid": f"pid:[{data.pid_ns}]",
+                        "mnt": f"mnt:[{data.mnt_ns}]",
+                    },
+                }
+            )
+        )
+
+    def set_callback(self, host, callback: Callable[[namedtuple], None]):
+        def _(ctx, data, size):
+            event = self._convert_data(self.decode_event(host, data, size))
+            if self.update_proc_cache:
+                try:
+                    self.on_event(event)
+                except Exception as e:
+                    logger.exception(e)
+            return callback(event)  # type: ignore
+
+        host["buffer"].open_ring_buffer(_)
+
+
+@hookimpl
+def init_tracer(config):
+    return ProcessTracer(config)
+
+
+if __name__ == "__main__":
+    from bcc import BPF
+
+    b = BPF(text=ProcessTracer.prog)
+    tracer = ProcessTracer()
+    tracer.attach(b)
+
+    def print_callback(data: namedtuple):
+        print(f"[{data.comm} ({data.pid}) {data.ppid}] {data.event.upper()} {data.fname} {data.exit_code}")  # type: ignore
+
+    tracer.set_callback(b, print_callback)
+    poller = tracer.get_poller(b)
+    while True:
+        try:
+            poller(**tracer.poll_args)
+        except KeyboardInterrupt:
+            exit()
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from collections import namedtuple
 from typing import Callable
 
@@ -16,6 +18,11 @@ class TcpconnectTracer(BccTracer):
     default_config = {
         **BccTracer.default_config,
         "poll_timeout": 10,
+        "aggregate": {
+            "enabled": False,
+            "dimensions": ["pid", "daddr", "dport"],
+            "max_entries": 10240,
+        },
     }
 
     many_attatchs = [
@@ -24,6 +31,7 @@ class TcpconnectTracer(BccTracer):
     ]
 
     poll_fn = "ring_buffer_poll"
+    lost_events_map = "lost_events"
 
     @property
     def poll_args(self):
@@ -31,16 +39,42 @@ class TcpconnectTracer(BccTracer):
 
     data_t = namedtuple(
         "TcpTracking",
-        ["pid", "uid", "gid", "comm", "saddr", "daddr", "dport", "timestamp"],
+        [
+            "pid",
+            "uid",
+            "gid",
+            "comm",
+            "saddr",
+            "daddr",
+            "dport",
+            "timestamp",
+            "cgroup_id",
+            "pid_ns",
+            "mnt_ns",
+        ],
     )
 
-    prog = """
+    kernel_filter = True
+
+    aggregate_map = "agg"
+    aggregate_dimensions = ("pid", "uid", "gid", "comm", "saddr", "daddr", "dport")
+
+    prog = (
+        """
     #include <uapi/linux/ptrace.h>
     #include <net/sock.h>
     #include <bcc/proto.h>
     #define TASK_COMM_LEN 16
-
-    BPF_RINGBUF_OUTPUT(buffer, 1 << 4);
+    """
+        + BccTracer.task_ids_prog
+        + BccTracer.kernel_filter_prog
+        + """
+    #ifndef RINGBUF_PAGES
+    #define RINGBUF_PAGES 16
+    #endif
+
+    BPF_RINGBUF_OUTPUT(buffer, RINGBUF_PAGES);
+    BPF_PERCPU_ARRAY(lost_events, u64, 1);
     BPF_HASH(currsock, u32, struct sock *);
 
     struct event {
@@ -52,11 +86,81 @@ class TcpconnectTracer(BccTracer):
         u32 gid;
 
         u64 timestamp;
+        u64 cgroup_id;
+        u32 pid_ns;
+        u32 mnt_ns;
+        char comm[TASK_COMM_LEN];
+    };
+
+    #ifdef AGGREGATE
+    #ifndef AGG_MAX_ENTRIES
+    #define AGG_MAX_ENTRIES 10240
+    #endif
+
+    struct agg_key_t {
+        u32 pid;
+        u32 uid;
+        u32 gid;
+        u32 saddr;
+        u32 daddr;
+        u32 dport;
         char comm[TASK_COMM_LEN];
     };
+
+    struct agg_value_t {
+        u64 count;
+        u64 first;
+        u64 last;
+    };
+
+    BPF_HASH(agg, struct agg_key_t, struct agg_value_t, AGG_MAX_ENTRIES);
+
+    static inline void aggregate(struct event *event) {
+        struct agg_key_t key = {};
+    #ifdef AGG_PID
+        key.pid = event->pid;
+    #endif
+    #ifdef AGG_UID
+        key.uid = event->uid;
+    #endif
+    #ifdef AGG_GID
+        key.gid = event->gid;
+    #endif
+    #ifdef AGG_SADDR
+        key.saddr = event->saddr;
+    #endif
+    #ifdef AGG_DADDR
+        key.daddr = event->daddr;
+    #endif
+    #ifdef AGG_DPORT
+        key.dport = event->dport;
+    #endif
+    #ifdef AGG_COMM
+        __builtin_memcpy(key.comm, event->comm, sizeof(key.comm));
+    #endif
+
+        u64 now = event->timestamp;
+        struct agg_value_t init = {.count = 0, .first = now, .last = now};
+        struct agg_value_t *value = agg.lookup_or_try_init(&key, &init);
+        if (!value) {
+            // map is full
+            int zero = 0;
+            lost_events.increment(zero);
+            return;
+        }
+        __sync_fetch_and_add(&value->count, 1);
+        value->last = now;
+    }
+    #endif
+
     int do_trace(struct pt_regs *ctx, struct sock *sk)
     {
-	    u32 pid = bpf_get_current_pid_tgid();
+	    u64 pid_tgid = bpf_get_current_pid_tgid();
+	    if (kf_skip_task(pid_tgid, bpf_get_current_uid_gid())) {
+	        // no stashed sock, do_return will skip it
+	        return 0;
+	    }
+	    u32 pid = pid_tgid;
 
 	    // stash the sock ptr for lookup on return
 	    currsock.update(&pid, &sk);
@@ -96,9 +200,18 @@ class TcpconnectTracer(BccTracer):
         event.uid = bpf_get_current_uid_gid();
         event.gid = bpf_get_current_uid_gid() >> 32;
         event.timestamp = bpf_ktime_get_ns();
+        get_task_ids(&event.cgroup_id, &event.pid_ns, &event.mnt_ns);
         bpf_get_current_comm(&event.comm, sizeof(event.comm));
+	#ifdef AGGREGATE
+	    aggregate(&event);
+	    currsock.delete(&pid);
+	    return 0;
+	#endif
 	    // output
-	    buffer.ringbuf_output(&event, sizeof(event), 0);
+	    if (buffer.ringbuf_output(&event, sizeof(event), 0) != 0) {
+	        int zero = 0;
+	        lost_events.increment(zero);
+	    }
 	    //bpf_trace_printk("trace_tcp4connect %x %x %d\\n", saddr, daddr, ntohs(dport));
 
 	    currsock.delete(&pid);
@@ -106,12 +219,17 @@ class TcpconnectTracer(BccTracer):
 	    return 0;
     }
     """
+    )
 
-    def _convert_data(self, data) -> namedtuple:
-        data = super()._convert_data(data)
+    def _convert_data(self, data, data_t: type | None = None) -> namedtuple:
+        data = super()._convert_data(data, data_t)
+        # Aggregated data may not have addresses
         return data._replace(
-            saddr=inet_ntoa(data.saddr).decode("utf-8"),
-            daddr=inet_ntoa(data.daddr).decode("utf-8"),
+            **{
+                k: inet_ntoa(getattr(data, k)).decode("utf-8")
+                for k in ("saddr", "daddr")
+                if k in data._fields
+            }
         )  # type: ignore
 
     def set_callback(self, host, callback: Callable[[namedtuple], None]):
@@ -120,6 +238,7 @@ class TcpconnectTracer(BccTracer):
             return callback(self._convert_data(event))  # type: ignore
 
         host["buffer"].open_ring_buffer(_)
+        self.set_aggregate_callback(host, callback)
 
 
 @hookimpl
@@ -1,5 +1,5 @@
 # Expose for plugin system
-from .bcc import clone, openat2, tcpconnect
+from .bcc import clone, openat2, process, tcpconnect
 from .sh import uname
 
-registers = [openat2, uname, tcpconnect, clone]
+registers = [openat2, uname, tcpconnect, clone, process]
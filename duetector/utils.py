@@ -27,6 +27,64 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class AgentPids:
+    """
+    Processes of this agent, i.e. the monitor process and its pipeline workers,
+    events of them are ignored by filters with ``ignore_current_pid``, see ``ProcessPipeline``.
+
+    The current process is always included, ``version`` changes on ``add`` and ``remove``
+    so that filters know to recompile their rules.
+    """
+
+    pids: frozenset[int] | None = None
+    version = 0
+
+    cache_size = 65536
+    _threads: dict[int, bool] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> frozenset[int]:
+        """
+        Pids (tgids) of processes of this agent.
+        """
+        return cls.pids if cls.pids is not None else frozenset([os.getpid()])
+
+    @classmethod
+    def add(cls, pids) -> None:
+        with cls._lock:
+            cls.pids = cls.get() | frozenset(pids)
+            cls._threads = {}
+            cls.version += 1
+
+    @classmethod
+    def remove(cls, pids) -> None:
+        with cls._lock:
+            cls.pids = (cls.get() - frozenset(pids)) | {os.getpid()}
+            cls._threads = {}
+            cls.version += 1
+
+    @classmethod
+    def is_thread_of(cls, tid: int, tgids: frozenset[int]) -> bool:
+        """
+        If thread ``tid`` belongs to one of processes ``tgids`` (from ``get``),
+        by ``/proc/{tgid}/task/{tid}``.
+
+        Results are cached until the pids change, a tid is only reused by another process
+        after pids wrap around.
+        """
+        if tid in tgids:
+            return True
+        threads = cls._threads
+        found = threads.get(tid)
+        if found is None:
+            found = any(os.path.exists(f"/proc/{tgid}/task/{tid}") for tgid in tgids)
+            if len(threads) >= cls.cache_size:
+                threads.clear()
+            threads[tid] = found
+        return found
+
+
 def inet_ntoa(addr) -> bytes:
     dq = b""
     for i in range(0, 4):
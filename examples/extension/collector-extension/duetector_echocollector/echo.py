@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from duetector.collectors import Collector
 from duetector.collectors.models import Tracking
@@ -14,9 +14,15 @@ class EchoCollector(Collector):
     def __init__(self, config: Optional[Dict[str, Any]] = None, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
 
+    # Bulk implementation of ``_emit_batch``, called once per batch in monitor's batch mode
+    batch_capable = True
+
     def _emit(self, t: Tracking):
         print(t)
 
+    def _emit_batch(self, trackings: List[Tracking]):
+        print("\n".join(str(t) for t in trackings))
+
     def summary(self) -> Dict:
         return {}
 
@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+import pytest
+
+from duetector.injectors.base import Injector, ProcInjector
+
+data_t = namedtuple("T", ("pid", "comm"))
+
+
+def test_patch():
+    data = data_t(pid=1, comm="dummy")
+    patched = Injector.patch(data, {"b": 2, "a": 1, "pid": 9999})
+    # Extra fields are sorted, existing fields are not overwritten
+    assert patched._fields == ("pid", "comm", "a", "b")
+    assert patched == (1, "dummy", 1, 2)
+    assert patched.__class__.__name__ == "T"
+
+    # Patched type is cached
+    assert Injector.patch(data, {"a": 3, "b": 4}).__class__ is patched.__class__
+    assert Injector.patch(data, {"c": 3}).__class__ is not patched.__class__
+
+    # Nothing to patch
+    assert Injector.patch(data, {"pid": 9999}) is data
+
+
+@pytest.fixture
+def proc_injector():
+    injector = ProcInjector()
+    try:
+        yield injector
+    finally:
+        # Stop watching /proc
+        injector.shutdown()
+
+
+def test_cached_by_cgroup(proc_injector: ProcInjector, monkeypatch):
+    injector = proc_injector
+    calls = []
+    # Cgroup 1 is the root cgroup, not resolved by ``CgroupResolver``
+    monkeypatch.setattr(
+        injector.cgroup_inspector.cgroup_resolver,
+        "get",
+        lambda cgroup_id, pid=None: None if cgroup_id == 1 else [f"0::/{cgroup_id}"],
+    )
+
+    def _():
+        calls.append(1)
+        return {"container_id": "abc"}
+
+    # Resolved once per cgroup
+    assert injector.cached_by_cgroup({"pid": 1, "cgroup_id": 42}, _) == {"container_id": "abc"}
+    assert injector.cached_by_cgroup({"pid": 2, "cgroup_id": 42}, _) == {"container_id": "abc"}
+    assert len(calls) == 1
+    # Not cached without kernel cgroup id
+    injector.cached_by_cgroup({"pid": 1}, _)
+    injector.cached_by_cgroup({"pid": 1}, _)
+    assert len(calls) == 3
+    # Nor with an unverified cgroup id, e.g. all processes are in the root cgroup on cgroup v1
+    injector.cached_by_cgroup({"pid": 1, "cgroup_id": 1}, _)
+    injector.cached_by_cgroup({"pid": 2, "cgroup_id": 1}, _)
+    assert len(calls) == 5
+    assert 1 not in injector._cgroup_cache
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
@@ -1,9 +1,12 @@
 import os
+import time
 
 import pytest
 
 from duetector.injectors.inspector import (
     CgroupInspector,
+    CgroupResolver,
+    CwdCache,
     NamespaceInspector,
     ProcInfo,
     ProcWatcher,
@@ -46,5 +49,213 @@ def test_ns_inspector(Inspector, model):
     assert i.is_inspected(extra)
 
 
+def test_cwd_cache(monkeypatch):
+    cache = CwdCache()
+    cache.clear()
+    calls = []
+    readlink = os.readlink
+
+    def _(path):
+        calls.append(path)
+        return readlink(path)
+
+    monkeypatch.setattr(os, "readlink", _)
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert len(calls) == 1
+
+    # Invalidated by ProcWatcher when process exits
+    assert cache.invalidate in ProcWatcher.exit_listeners
+    cache.invalidate(os.getpid())
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert len(calls) == 2
+
+    # Read once per process while exits are tracked
+    monkeypatch.setattr(cache, "unwatched_ttl_s", 0)
+    monkeypatch.setattr(ProcWatcher, "tracks_exits", classmethod(lambda cls: True))
+    cache.invalidate(os.getpid())
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert len(calls) == 3
+
+    # Expired after ``unwatched_ttl_s`` if exits are not tracked, e.g. the pid is reused
+    monkeypatch.setattr(ProcWatcher, "tracks_exits", classmethod(lambda cls: False))
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert cache.get(os.getpid()) == os.getcwd()
+    assert len(calls) == 5
+
+    # Failures are not cached
+    assert cache.get(2**22 + 1) is None
+    assert cache.get(2**22 + 1) is None
+    assert len(calls) == 7
+
+
+@pytest.fixture
+def lazy_proc_watcher(tmp_path):
+    for pid in (1, 2, 3):
+        (tmp_path / str(pid)).mkdir()
+        (tmp_path / str(pid) / "cgroup").write_text(f"0::/pid{pid}\n")
+    # Not the singleton
+    w = type.__call__(ProcWatcher, proc_dir=str(tmp_path), lazy=True, maxsize=2, ttl_s=60)
+    try:
+        yield w
+    finally:
+        w.stop()
+
+
+def test_lazy_proc_watcher(lazy_proc_watcher: ProcWatcher, monkeypatch):
+    w = lazy_proc_watcher
+    monkeypatch.setattr(ProcWatcher, "get_instance", classmethod(lambda cls: w))
+    # Exits are not seen in lazy mode without process events
+    assert not ProcWatcher.tracks_exits()
+    w.event_driven = True
+    assert ProcWatcher.tracks_exits()
+    w.event_driven = False
+    exited = []
+    monkeypatch.setattr(ProcWatcher, "exit_listeners", [exited.append])
+    # Nothing is read until asked
+    assert not w.thread and not w._cache
+    assert w.get(1).cgroups == ["0::/pid1"]
+    assert w.get(1).cgroups == ["0::/pid1"]
+    assert w.get(2) and w.get(3)
+    # LRU bounded, listeners are told as the process may be gone
+    assert list(w._cache) == [2, 3]
+    assert exited == [1]
+    assert w.stats() == {
+        "size": 2,
+        "pending_removals": 0,
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+        "expirations": 0,
+    }
+
+    # Read again after TTL
+    w._expires_at[2] = time.monotonic()
+    assert w.get(2)
+    assert w.stats()["expirations"] == 1 and w.stats()["misses"] == 4
+    assert exited == [1, 2]
+
+    # Delayed removals share one timer wheel
+    w.remove_cache(2, delay=0.1)
+    w.remove_cache(3, delay=0.1)
+    assert w.stats()["pending_removals"] == 2
+    deadline = time.monotonic() + 5
+    while w._cache and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not w._cache
+
+
+@pytest.fixture
+def cgroup_resolver(tmp_path):
+    cgroup_root = tmp_path / "cgroup"
+    (cgroup_root / "system.slice" / "docker-abc.scope").mkdir(parents=True)
+    (cgroup_root / "system.slice" / "cron.service").mkdir()
+    (tmp_path / "proc" / "42").mkdir(parents=True)
+    (tmp_path / "proc" / "42" / "cgroup").write_text("0::/system.slice/docker-abc.scope\n")
+
+    resolver = CgroupResolver()
+    proc_dir, root = resolver.proc_dir, resolver.cgroup_root
+    resolver.proc_dir, resolver.cgroup_root = str(tmp_path / "proc"), str(cgroup_root)
+    resolver.clear()
+    try:
+        yield resolver, cgroup_root
+    finally:
+        resolver.proc_dir, resolver.cgroup_root = proc_dir, root
+        resolver.clear()
+
+
+def test_cgroup_resolver(cgroup_resolver):
+    resolver, cgroup_root = cgroup_resolver
+    docker_id = (cgroup_root / "system.slice" / "docker-abc.scope").stat().st_ino
+    cron_id = (cgroup_root / "system.slice" / "cron.service").stat().st_ino
+
+    assert resolver.get(docker_id, 42) == ["0::/system.slice/docker-abc.scope"]
+    assert resolver._scanned_at is None
+    # Other processes of the cgroup hit the cache, even exited ones
+    assert resolver.get(docker_id, 43) == ["0::/system.slice/docker-abc.scope"]
+
+    # Process exited, or moved to another cgroup after the event
+    assert resolver.get(cron_id) == ["0::/system.slice/cron.service"]
+    resolver.clear()
+    assert resolver.get(cron_id, 42) == ["0::/system.slice/cron.service"]
+    # Never the root cgroup, all processes are in it on cgroup v1 hosts
+    assert resolver.root_id == cgroup_root.stat().st_ino
+    assert resolver.get(resolver.root_id) is None
+    assert resolver.get(resolver.root_id, 42) is None
+    assert resolver.root_id not in resolver._cache
+
+    # Unknown cgroups are not cached, hierarchy is not scanned again immediately
+    (cgroup_root / "new").mkdir()
+    new_id = (cgroup_root / "new").stat().st_ino
+    assert resolver.get(new_id) is None
+    resolver._scanned_at -= resolver.rescan_interval_s
+    assert resolver.get(new_id) == ["0::/new"]
+
+    # Scanned without the lock, an unknown id asks for a rescan once per ``unknown_retry_s``
+    scan = resolver._scan
+    scans = []
+
+    def _():
+        assert not resolver._lock.locked()
+        scans.append(1)
+        return scan()
+
+    resolver._scan = _
+    try:
+        resolver._scanned_at -= resolver.rescan_interval_s
+        assert resolver.get(999999999) is None
+        resolver._scanned_at -= resolver.rescan_interval_s
+        assert resolver.get(999999999) is None
+        assert len(scans) == 1
+        resolver._unknown[999999999] -= resolver.unknown_retry_s
+        assert resolver.get(999999999) is None
+        assert len(scans) == 2
+    finally:
+        del resolver._scan
+
+    # Not trusted without a matching cgroup v2 entry
+    tmp_proc = cgroup_root.parent / "proc" / "43"
+    tmp_proc.mkdir()
+    (tmp_proc / "cgroup").write_text("1:name=systemd:/system.slice/docker-abc.scope\n")
+    assert resolver._from_proc(docker_id, 43) is None
+    (tmp_proc / "cgroup").write_text("0::/not/visible\n")
+    assert resolver._from_proc(docker_id, 43) is None
+
+
+def test_inspector_kernel_ids(cgroup_resolver, monkeypatch):
+    resolver, cgroup_root = cgroup_resolver
+    docker_id = (cgroup_root / "system.slice" / "docker-abc.scope").stat().st_ino
+
+    def _(pid):
+        raise AssertionError("Should not read /proc")
+
+    cgroup_inspector = CgroupInspector()
+    monkeypatch.setattr(cgroup_inspector.proc_watcher, "get", _)
+    model = {"pid": 42, "cgroup_id": docker_id, "pid_ns": 4026531836, "mnt_ns": 4026531841}
+    assert cgroup_inspector.get(cgroup_inspector.inspect(model), "cgroups") == [
+        "0::/system.slice/docker-abc.scope"
+    ]
+
+    # Root cgroup falls back to /proc/{pid}/cgroup
+    proc_info = ProcInfo(
+        pid=42,
+        cgroups=["1:name=systemd:/user.slice"],
+        ns={"pid": "pid:[4026531835]", "mnt": "mnt:[4026531840]", "net": "net:[4026531992]"},
+    )
+    monkeypatch.setattr(cgroup_inspector.proc_watcher, "get", lambda pid: proc_info)
+    model["cgroup_id"] = resolver.root_id
+    assert cgroup_inspector.get(cgroup_inspector.inspect(model), "cgroups") == [
+        "1:name=systemd:/user.slice"
+    ]
+
+    # Kernel pid and mnt namespaces are merged over others from /proc
+    namespace_inspector = NamespaceInspector(cgroup_inspector.proc_watcher)
+    extra = namespace_inspector.inspect(model)
+    assert namespace_inspector.get(extra, "pid") == 4026531836
+    assert namespace_inspector.get(extra, "mnt") == 4026531841
+    assert namespace_inspector.get(extra, "net") == 4026531992
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
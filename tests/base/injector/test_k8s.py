@@ -2,14 +2,16 @@ import glob
 import time
 from collections import namedtuple
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 import yaml
 from kubernetes import client
 from kubernetes import config as k8s_config
+from kubernetes.client.exceptions import ApiException
 
 from duetector.injectors.docker import DockerInjector
-from duetector.injectors.k8s import K8SInjector
+from duetector.injectors.k8s import K8SInjector, PodInformer
 
 
 @pytest.fixture(scope="session")
@@ -114,5 +116,108 @@ def test_k8s_injector(k8s_pod, k8s_injector):
     assert k8s_injector.get(patch_args, "container_runtime")
 
 
+def make_pod(uid, name, rv, *containers):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(uid=uid, name=name, namespace="default", resource_version=rv),
+        status=SimpleNamespace(
+            init_container_statuses=None,
+            ephemeral_container_statuses=None,
+            container_statuses=[
+                SimpleNamespace(name=c, container_id=f"containerd://{cid}") for c, cid in containers
+            ],
+        ),
+    )
+
+
+class FakeCoreV1Api:
+    def __init__(self, *pods, rv="1"):
+        self.pods = list(pods)
+        self.rv = rv
+        self.lists = []
+
+    def list_pod_for_all_namespaces(self, **kwargs):
+        self.lists.append(kwargs)
+        return SimpleNamespace(items=self.pods, metadata=SimpleNamespace(resource_version=self.rv))
+
+
+class FakeWatch:
+    """
+    Replay recorded streams of events, one stream per watch, then stop the informer.
+    """
+
+    def __init__(self, informer_getter, streams):
+        self.informer_getter = informer_getter
+        self.streams = streams
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, fn, **kwargs):
+        self.calls.append(kwargs)
+        if not self.streams:
+            self.informer_getter()._stop.set()
+            return
+        events = self.streams.pop(0)
+        if isinstance(events, Exception):
+            raise events
+        yield from events
+
+    def stop(self):
+        pass
+
+
+def test_pod_informer():
+    api = FakeCoreV1Api(make_pod("uid-a", "pod-a", "1", ("a", "aaaa")))
+    informer = PodInformer(api, node_name="node-1")
+    informer.list()
+    assert api.lists == [{"field_selector": "spec.nodeName=node-1"}]
+    assert informer.synced.is_set()
+    assert informer.get("uid-a", "aaaa") == {
+        "pod_name": "pod-a",
+        "namespace": "default",
+        "container_name": "a",
+        "container_runtime": "containerd",
+    }
+    # Truncated container id in the pod
+    assert informer.get("uid-a", "aa")["container_name"] == "a"
+    assert informer.get("uid-b", "bbbb") == {}
+
+    assert informer.apply({"type": "ADDED", "object": make_pod("uid-b", "pod-b", "2")})
+    assert informer.get("uid-b", "bbbb") == {"pod_name": "pod-b", "namespace": "default"}
+    assert informer.apply(
+        {"type": "MODIFIED", "object": make_pod("uid-b", "pod-b", "3", ("b", "bbbb"))}
+    )
+    assert informer.get("uid-b", "bbbb")["container_name"] == "b"
+    assert informer.apply({"type": "DELETED", "object": make_pod("uid-a", "pod-a", "4")})
+    assert informer.get("uid-a", "aaaa") == {}
+    assert informer.resource_version == "4"
+    assert len(informer) == 1
+
+    assert not informer.apply({"type": "ERROR", "object": {"code": 410}})
+
+
+def test_pod_informer_relist():
+    api = FakeCoreV1Api(make_pod("uid-a", "pod-a", "1", ("a", "aaaa")))
+    watch = FakeWatch(
+        lambda: informer,
+        [
+            [{"type": "ADDED", "object": make_pod("uid-b", "pod-b", "2", ("b", "bbbb"))}],
+            ApiException(status=410, reason="Gone"),
+        ],
+    )
+    informer = PodInformer(api, watch_factory=watch, watch_timeout_s=10)
+    informer._run()
+
+    # Listed again after 410, and watched from the new resource version
+    assert len(api.lists) == 2
+    assert api.lists[0] == {}
+    assert watch.calls[0] == {"resource_version": "1", "timeout_seconds": 10}
+    assert len(watch.calls) == 3
+    # Listing replaced the cache
+    assert informer.get("uid-b", "bbbb") == {}
+    assert informer.get("uid-a", "aaaa")["pod_name"] == "pod-a"
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
@@ -1,10 +1,13 @@
+import grpc
 import pytest
 from fastapi.testclient import TestClient
 
 from duetector.analyzer.db import DBAnalyzer
+from duetector.analyzer.jaeger.analyzer import JaegerAnalyzer
 from duetector.managers.analyzer import AnalyzerManager
 from duetector.service.app import app
 from duetector.service.config import get_config
+from duetector.service.query.controller import AnalyzerController
 
 
 @pytest.fixture
@@ -45,5 +48,45 @@ def test_query_analyzer(client: TestClient, db_analyzer):
     assert response.json()
 
 
+def test_controller_lifespan(configed_app, monkeypatch):
+    inits = []
+    init = AnalyzerManager.init
+
+    def _init(self, *args, **kwargs):
+        inits.append(self)
+        return init(self, *args, **kwargs)
+
+    monkeypatch.setattr(AnalyzerManager, "init", _init)
+    with TestClient(configed_app) as client:
+        controller = configed_app.state.controllers[AnalyzerController]
+        db_analyzer = controller.get_analyzer("dbanalyzer")
+        # Warmed up on startup
+        assert db_analyzer.sm._engine is not None
+        for _ in range(3):
+            assert client.get("/query/").status_code == 200
+        assert configed_app.state.controllers[AnalyzerController] is controller
+    # Created once, shutdown with app
+    assert len(inits) == 1
+    assert not configed_app.state.controllers
+    assert db_analyzer.sm._engine is None
+
+
+async def test_jaeger_analyzer_shutdown():
+    analyzer = JaegerAnalyzer({"jaegeranalyzer": {"disabled": False}})
+    analyzer.warmup()
+    async with analyzer.shared_channel() as channel:
+        pass
+    # Reused by queries, not closed after each of them
+    async with analyzer.shared_channel() as reused:
+        assert reused is channel
+    assert channel.get_state() != grpc.ChannelConnectivity.SHUTDOWN
+
+    await analyzer.shutdown()
+    assert channel.get_state() == grpc.ChannelConnectivity.SHUTDOWN
+    async with analyzer.shared_channel() as reopened:
+        assert reopened is not channel
+    await analyzer.shutdown()
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
@@ -1,13 +1,29 @@
+import copy
+import ctypes
 import os
+import queue
+import struct
+import threading
+import time
 from collections import namedtuple
+from types import SimpleNamespace
 from typing import Any, Callable, Dict, NamedTuple, Optional, Type
 
 import pytest
 
+from duetector.collectors.models import TrackingRecord
+from duetector.exceptions import ConfigError
+from duetector.filters import Filter
+from duetector.filters.base import KernelRules
+from duetector.injectors.inspector import ProcInfo, ProcWatcher
 from duetector.managers.tracer import TracerManager
 from duetector.monitors.bcc_monitor import BccMonitor, Monitor
+from duetector.monitors.pipeline import PipelineRuntime
 from duetector.tracers.base import BccTracer, Tracer
-from duetector.utils import get_boot_time_duration_ns
+from duetector.tracers.bcc.openat2 import OpenTracer
+from duetector.tracers.bcc.process import ProcessTracer
+from duetector.tracers.bcc.tcpconnect import TcpconnectTracer
+from duetector.utils import AgentPids, get_boot_time_duration_ns
 
 timestamp = 13205215231927
 datetime = get_boot_time_duration_ns(timestamp)
@@ -65,11 +81,12 @@ class MockMonitor(Monitor):
         config: Optional[Dict[str, Any]],
         mock_cls: Type[Monitor],
         mock_tracer: Type[Tracer],
+        runtime: Optional[PipelineRuntime] = None,
     ):
         self.default_config = mock_cls.default_config
         self.config_scope = mock_cls.config_scope
         self.mock_cls = mock_cls
-        super().__init__(config=config)
+        super().__init__(config=config, runtime=runtime)
 
         tracer_config = TracerManager(config).config._config_dict
 
@@ -89,14 +106,23 @@ class MockMonitor(Monitor):
             self.bpf_tracers[tracer] = host
 
     def poll_all(self):
-        self.mock_cls.poll_all(self)
+        return self.mock_cls.poll_all(self)
 
     def poll(self, tracer: Tracer):
-        self.mock_cls.poll(self, tracer)
+        return self.mock_cls.poll(self, tracer)
 
     def summary(self) -> Dict:
         return self.mock_cls.summary(self)
 
+    def __getattr__(self, name):
+        # Fallback to methods and properties of the mocked monitor
+        if name == "mock_cls":
+            raise AttributeError(name)
+        attr = getattr(self.mock_cls, name)
+        if hasattr(attr, "__get__"):
+            return attr.__get__(self, type(self))
+        return attr
+
 
 @pytest.fixture
 def bcc_monitor(full_config):
@@ -110,7 +136,626 @@ def test_bcc_monitor(bcc_monitor: MockMonitor):
     bcc_monitor.poll_all()
     bcc_monitor.shutdown()
     assert bcc_monitor.summary()
-    assert bcc_monitor.summary()["MockMonitor"]["DBCollector"]["bccmocktracer"]["last"]
+    summary = bcc_monitor.summary()["MockMonitor"]
+    assert summary["DBCollector"]["bccmocktracer"]["last"]
+    assert summary["DBCollector"]["queue"]["pending"] == 0
+    assert summary["collector_queues"]["DBCollector"] == summary["DBCollector"]["queue"]
+
+
+def test_bcc_monitor_share_tracking(bcc_monitor: MockMonitor, monkeypatch):
+    records = []
+    trackings = []
+    from_namedtuple = TrackingRecord.from_namedtuple
+    build_tracking = TrackingRecord._build_tracking
+
+    def _from_namedtuple(tracer, data):
+        records.append(data)
+        return from_namedtuple(tracer, data)
+
+    def _build_tracking(self):
+        trackings.append(self)
+        return build_tracking(self)
+
+    monkeypatch.setattr(TrackingRecord, "from_namedtuple", staticmethod(_from_namedtuple))
+    monkeypatch.setattr(TrackingRecord, "_build_tracking", _build_tracking)
+    assert len(bcc_monitor.collectors) > 1
+    bcc_monitor.poll_all()
+    bcc_monitor.shutdown()
+    # One record and one tracking for all collectors
+    assert len(records) == 1
+    assert len(trackings) == 1
+
+
+def test_bcc_monitor_filter_phases(bcc_monitor: MockMonitor):
+    tracer = bcc_monitor.tracers[0]
+    pre, post = bcc_monitor._split_filters(tracer)
+    assert [f.__class__.__name__ for f in pre] == ["PatternFilter"]
+    assert not post
+
+    class DropAll(Filter):
+        def filter(self, data):
+            return None
+
+    data = tracer.get_dummy_data()
+    assert bcc_monitor._run_filters(pre, data, "pre_injection") == data
+    assert bcc_monitor._run_filters([DropAll()], data, "post_injection") is None
+    bcc_monitor.shutdown()
+    assert bcc_monitor.summary()["MockMonitor"]["filter_drops"] == {
+        "pre_injection": 0,
+        "post_injection": 1,
+    }
+
+
+def test_bcc_monitor_batch(full_config):
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"]["batch"] = {"enabled": True, "max_size": 2}
+    monitor = MockMonitor(config, BccMonitor, BccMockTracer)
+    tracer = monitor.tracers[0]
+    callback = monitor._get_callback_fn(tracer)
+
+    callback(tracer.get_dummy_data())
+    # Buffered until flushed
+    assert len(monitor._batches[tracer]) == 1
+    list(monitor.poll_all())
+    assert not monitor._batches[tracer]
+    # Reaching max_size flushes early
+    callback(tracer.get_dummy_data())
+    callback(tracer.get_dummy_data())
+    assert not monitor._batches[tracer]
+    callback(tracer.get_dummy_data())
+    monitor.shutdown()
+
+    summary = monitor.summary()["MockMonitor"]
+    assert summary["DBCollector"]["bccmocktracer"]["count"] == 5
+    assert summary["filter_drops"] == {"pre_injection": 0, "post_injection": 0}
+
+
+def test_bcc_monitor_batch_mixed(full_config):
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    class CountFilter(Filter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.calls = 0
+
+        def filter(self, data):
+            self.calls += 1
+            return data
+
+    class BatchCountFilter(CountFilter):
+        batch_capable = True
+
+        def filter_batch(self, batch):
+            self.calls += 1
+            return batch[1:]
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"]["batch"] = {"enabled": "auto", "max_size": 1024}
+    monitor = MockMonitor(config, BccMonitor, BccMockTracer)
+    # DBCollector writes batches in bulk
+    assert monitor.runtime.batch_capable
+    assert monitor.batch_enabled
+
+    per_event, batch = CountFilter(), BatchCountFilter()
+    data = [monitor.tracers[0].get_dummy_data()] * 3
+    assert monitor._run_filters_batch([per_event, batch, per_event], data, "post_injection")
+    assert per_event.calls == 3 + 2
+    assert batch.calls == 1
+    monitor.shutdown()
+    assert monitor.summary()["MockMonitor"]["filter_drops"]["post_injection"] == 1
+
+
+def test_bcc_monitor_workers(full_config):
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"]["workers"] = {"processes": 2}
+    monitor = MockMonitor(config, BccMonitor, BccMockTracer)
+    assert monitor.batch_enabled
+    tracer = monitor.tracers[0]
+    callback = monitor._get_callback_fn(tracer)
+    data = tracer.get_dummy_data()
+    for pid in range(4):
+        callback(data._replace(pid=pid))
+    callback(data._replace(pid=4, fname="/etc/shadow"))
+    list(monitor.poll_all())
+    monitor.shutdown()
+
+    summary = monitor.summary()["MockMonitor"]
+    # Sharded by pid, each worker has its own in-memory database
+    assert [w["DBCollector"]["bccmocktracer"]["count"] for w in summary["workers"]] == [3, 3]
+    assert summary["filter_drops"]["pre_injection"] == 0
+    assert "DBCollector" not in summary
+    assert [q["DBCollector"]["queued"] for q in summary["collector_queues"]] == [3, 3]
+    # Workers run the pipeline, monitor doesn't build its own collectors or injectors
+    assert not monitor.collectors and not monitor.injectors
+
+
+def test_bcc_monitor_workers_agent_pids(full_config):
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"]["workers"] = {"processes": 2}
+    config["filter"]["patternfilter"]["ignore_current_pid"] = True
+    monitor = MockMonitor(config, BccMonitor, BccMockTracer)
+    workers = monitor._workers
+    assert workers.pids < AgentPids.get()
+    tracer = monitor.tracers[0]
+    callback = monitor._get_callback_fn(tracer)
+    data = tracer.get_dummy_data()
+    # Events of the monitor and workers are dropped in workers
+    agent_pids = (os.getpid(), *workers.pids)
+    for pid in agent_pids:
+        callback(data._replace(pid=pid))
+    monitor.flush_batch()
+
+    # A dead worker doesn't block the monitor
+    dead = workers._procs[0]
+    dead.kill()
+    dead.join()
+    for pid in range(4):
+        callback(data._replace(pid=pid))
+    monitor.flush_batch()
+    monitor.shutdown()
+
+    summary = monitor.summary()["MockMonitor"]
+    assert summary["worker_drops"] == {dead.name: 2}
+    # Only the alive worker is summarized, with none of the agent's events
+    assert [w["DBCollector"]["bccmocktracer"]["count"] for w in summary["workers"]] == [2]
+    assert summary["filter_drops"]["pre_injection"] == sum(pid % 2 for pid in agent_pids)
+    assert not workers.pids & AgentPids.get()
+
+
+def test_filter_batch():
+    class DropOdd(Filter):
+        def filter(self, data):
+            return data if data % 2 == 0 else None
+
+    assert DropOdd().filter_batch([1, 2, 3, 4]) == [2, 4]
+
+
+def test_shared_runtime(full_config):
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    runtime = PipelineRuntime(full_config)
+    monitors = [MockMonitor(full_config, BccMonitor, BccMockTracer, runtime) for _ in range(3)]
+    assert runtime.refs == 3
+    for m in monitors:
+        assert m.collectors is runtime.collectors
+        assert m.filters is runtime.filters
+        assert m.injectors is runtime.injectors
+        m.poll_all()
+
+    shutdowns = []
+    collectors = runtime.collectors
+    for c in collectors:
+
+        def _shutdown(c=c, shutdown=c.shutdown):
+            shutdowns.append(c)
+            shutdown()
+
+        c.shutdown = _shutdown
+    monitors[0].shutdown()
+    monitors[0].shutdown()
+    assert runtime.refs == 2 and not shutdowns
+    for m in monitors[1:]:
+        m.shutdown()
+    # Collectors are shutdown once, by the last monitor
+    assert runtime.refs == 0
+    assert shutdowns == collectors
+
+
+def test_runtime_lazy(full_config):
+    runtime = PipelineRuntime(full_config)
+    # Nothing is created until a monitor uses it
+    assert runtime._collectors is None and runtime._injectors is None
+    runtime.shutdown()
+    assert runtime._collectors is None
+
+    class BccMockTracer(MockTracer, BccTracer):
+        pass
+
+    m = MockMonitor(full_config, BccMonitor, BccMockTracer, runtime)
+    assert m.collectors is runtime._collectors
+    collectors = m.collectors
+    m.shutdown()
+    assert runtime.refs == 0
+    # Shutdown components are dropped, a later monitor gets new ones
+    assert runtime._collectors is None and runtime._injectors is None
+    m = MockMonitor(full_config, BccMonitor, BccMockTracer, runtime)
+    assert m.collectors and not set(map(id, m.collectors)) & set(map(id, collectors))
+    m.shutdown()
+
+
+def test_runtime_get_tracers(full_config):
+    runtime = PipelineRuntime(full_config)
+    tracers = runtime.get_tracers()
+    bcc_tracers = runtime.get_tracers(BccTracer)
+    assert bcc_tracers and set(bcc_tracers) < set(tracers)
+    # Initialized once
+    assert runtime.get_tracers(BccTracer) == bcc_tracers
+    assert all(a is b for a, b in zip(runtime.get_tracers(BccTracer), bcc_tracers))
+
+
+class PerCpuArray:
+    """
+    Mock of ``bcc.table.PerCpuArray``
+    """
+
+    Key = int
+
+    def __init__(self, ncpus=4):
+        self.values = [0] * ncpus
+
+    def __getitem__(self, key):
+        assert key == 0
+        return list(self.values)
+
+
+def test_bcc_monitor_lost_events(bcc_monitor: MockMonitor):
+    tracer = bcc_monitor.tracers[0]
+    host = bcc_monitor.bpf_tracers[tracer]
+    bcc_monitor.poll(tracer)
+    # Not supported by tracer
+    assert bcc_monitor._lost_events == {"BccMockTracer": 0}
+
+    host["lost_events"] = PerCpuArray()
+    tracer.lost_events_map = "lost_events"
+    host["lost_events"].values[0] = 3
+    host["lost_events"].values[2] = 4
+    bcc_monitor.poll(tracer)
+    bcc_monitor.shutdown()
+    assert bcc_monitor.summary()["MockMonitor"]["lost_events"] == {"BccMockTracer": 7}
+
+
+def test_ringbuf_pages():
+    class PagesTracer(MockTracer, BccTracer):
+        pass
+
+    assert PagesTracer().cflags == ["-DRINGBUF_PAGES=16"]
+    assert PagesTracer({"pagestracer": {"ringbuf_pages": 256}}).cflags == ["-DRINGBUF_PAGES=256"]
+    with pytest.raises(ConfigError):
+        PagesTracer({"pagestracer": {"ringbuf_pages": 100}}).cflags
+
+
+def test_bcc_monitor_parallel_compile(full_config, tmpdir):
+    attached = []
+
+    class SlowBPF:
+        def __init__(self, text, cflags):
+            time.sleep(0.2)
+            if "fail" in text:
+                raise Exception("failed to compile")
+            self.text = text
+
+    class CompileTracer(MockTracer, BccTracer):
+        def attach(self, host):
+            attached.append((self.prog, host.text))
+
+        def set_callback(self, host, callback):
+            pass
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"].update(
+        {"auto_init": False, "compile_workers": 4, "compile_failure_cache": {"path": str(tmpdir)}}
+    )
+    monitor = BccMonitor(config)
+    monitor.tracers = [CompileTracer() for _ in range(4)]
+    for i, tracer in enumerate(monitor.tracers):
+        tracer.prog = f"fail{i}" if i == 1 else f"prog{i}"
+
+    start = time.perf_counter()
+    monitor.init(SlowBPF)
+    assert time.perf_counter() - start < 0.6
+    # Attached in order, failed one is removed
+    assert attached == [("prog0", "prog0"), ("prog2", "prog2"), ("prog3", "prog3")]
+    assert len(monitor.tracers) == 3
+    assert set(monitor.summary()["BccMonitor"]["startup_ms"]["CompileTracer"]) == {
+        "compile",
+        "attach",
+    }
+    # Compile time is cached, the slowest is compiled first next time
+    slowest = monitor.tracers[-1]
+    key = monitor.compile_failure_cache.key(slowest.prog, monitor.get_cflags(slowest))
+    monitor.compile_failure_cache.put(key, "CompileTracer", ok=True, compile_ms=1000)
+    assert monitor._last_compile_ms(slowest) == 1000
+    assert sorted(monitor.tracers, key=monitor._last_compile_ms, reverse=True)[0] is slowest
+    monitor.shutdown()
+
+
+class BPFTable:
+    def __init__(self):
+        self.entries = {}
+
+    def Key(self, *args):
+        return args[0] if args else SimpleNamespace()
+
+    def Leaf(self, v):
+        return v
+
+    def clear(self):
+        self.entries.clear()
+
+    def __setitem__(self, k, v):
+        if isinstance(k, SimpleNamespace):
+            assert k.prefixlen == len(k.path) * 8
+            k = k.path.decode()
+        self.entries[k] = v
+
+
+class KernelFilterBPF(dict):
+    def __init__(self, text, cflags):
+        super().__init__({name: BPFTable() for name in ("kf_pid", "kf_tgid", "kf_uid", "kf_gid")})
+        self["kf_path"] = BPFTable()
+        self.cflags = cflags
+
+
+def test_bcc_monitor_kernel_filter(full_config, tmpdir):
+    class KernelFilterTracer(MockTracer, BccTracer):
+        kernel_filter = True
+
+        def attach(self, host):
+            pass
+
+        def set_callback(self, host, callback):
+            pass
+
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"].update(
+        {
+            "auto_init": False,
+            "kernel_filter": {"enabled": True},
+            "compile_failure_cache": {"enabled": False},
+        }
+    )
+    monitor = BccMonitor(config)
+    tracer = KernelFilterTracer()
+    tracer.prog = BccTracer.kernel_filter_prog
+    monitor.tracers = [tracer]
+    monitor.init(KernelFilterBPF)
+
+    host = monitor.bpf_tracers[tracer]
+    assert "-DKERNEL_FILTER" in host.cflags
+    assert set(host["kf_uid"].entries) == {0}
+    assert "/proc" in host["kf_path"].entries
+    assert not host["kf_pid"].entries
+
+    # Rules are updated at runtime
+    (pattern_filter,) = monitor.filters
+    pattern_filter.config._config_dict["exclude_pid"] = [42]
+    pattern_filter.reload_rules()
+    monitor.sync_kernel_filter()
+    assert set(host["kf_pid"].entries) == {42}
+
+    pattern_filter.config._config_dict["exclude_pid"] = []
+    pattern_filter.reload_rules()
+    monitor.sync_kernel_filter()
+    assert not host["kf_pid"].entries
+
+    # Over-long prefixes are skipped, other rules are still applied
+    long_prefix = "/" + "a" * tracer.kernel_filter_path_max
+    tracer.set_kernel_filter(
+        host, KernelRules(pids=frozenset({7}), path_prefixes=frozenset({"/tmp", long_prefix}))
+    )
+    assert set(host["kf_pid"].entries) == {7}
+    assert set(host["kf_path"].entries) == {"/tmp"}
+
+    # A bad key changes no map
+    with pytest.raises(TypeError):
+        tracer.set_kernel_filter(host, KernelRules(uids=frozenset({0, "root"})))
+    assert set(host["kf_pid"].entries) == {7}
+    monitor.shutdown()
+
+
+class AggregateTable(dict):
+    """
+    ``BPF_HASH`` without batch ops, like kernels before 5.6.
+    """
+
+    def items_lookup_and_delete_batch(self):
+        raise Exception("batch ops not supported")
+
+
+def test_bcc_tracer_aggregate():
+    assert TcpconnectTracer().cflags == ["-DRINGBUF_PAGES=16"]
+    assert not TcpconnectTracer().aggregating
+
+    config = {"tcpconnecttracer": {"aggregate": {"enabled": True}}}
+    tracer = TcpconnectTracer(config)
+    assert tracer.aggregating
+    assert tracer.aggregate_by == ("pid", "daddr", "dport")
+    assert tracer.cflags == [
+        "-DRINGBUF_PAGES=16",
+        "-DAGGREGATE",
+        "-DAGG_MAX_ENTRIES=10240",
+        "-DAGG_PID",
+        "-DAGG_DADDR",
+        "-DAGG_DPORT",
+    ]
+    config["tcpconnecttracer"]["aggregate"]["dimensions"] = ["pid", "fname"]
+    with pytest.raises(ConfigError):
+        TcpconnectTracer(config).aggregate_by
+
+    tracer = TcpconnectTracer({"tcpconnecttracer": {"aggregate": {"enabled": True}}})
+    key_t = namedtuple("agg_key_t", ["pid", "uid", "gid", "saddr", "daddr", "dport", "comm"])
+    key = key_t(pid=9999, uid=0, gid=0, saddr=0, daddr=0x0100007F, dport=80, comm=b"")
+    host = {"agg": AggregateTable({key: SimpleNamespace(count=3, first=1, last=timestamp)})}
+    emitted = []
+    tracer.set_aggregate_callback(host, emitted.append)
+    tracer.get_poller(host)(**tracer.poll_args)
+
+    (data,) = emitted
+    assert data == tracer.aggregate_t(
+        pid=9999, daddr="127.0.0.1", dport=80, count=3, first_timestamp=1, timestamp=timestamp
+    )
+    # Counts are reset after each poll
+    assert not host["agg"]
+    tracer.get_poller(host)()
+    assert len(emitted) == 1
+
+    record = TrackingRecord.from_namedtuple(tracer, data)
+    assert record.pid == 9999
+    assert record.extended == {
+        "daddr": "127.0.0.1",
+        "dport": 80,
+        "count": 3,
+        "first_timestamp": 1,
+    }
+    # Converted to the same clock as ``dt``
+    tracking = record.to_tracking()
+    assert tracking.dt == get_boot_time_duration_ns(timestamp)
+    assert tracking.extended["first_timestamp"] == get_boot_time_duration_ns(1).timestamp()
+    assert tracking.extended["first_timestamp"] <= tracking.dt.timestamp()
+    assert record.extended["first_timestamp"] == 1
+
+
+class QueueTracer(MockTracer, BccTracer):
+    """
+    Poller blocks on a queue, like ``ring_buffer_poll`` blocks on epoll.
+    """
+
+    poll_fn = "queue"
+
+    def get_poller(self, host) -> Callable:
+        def _(timeout):
+            try:
+                data = host["queue"].get(timeout=timeout / 1000)
+            except queue.Empty:
+                return
+            for callback in host["callback"]:
+                callback(data)
+
+        return _
+
+
+class EventDrivenMonitor(BccMonitor):
+    def init(self):
+        self.tracers = [QueueTracer()]
+        for tracer in self.tracers:
+            host = {"callback": [], "queue": queue.Queue()}
+            self._set_callback(host, tracer)
+            self.bpf_tracers[tracer] = host
+
+
+@pytest.fixture
+def event_driven_monitor(full_config):
+    config = copy.deepcopy(full_config)
+    config["monitor"]["bcc"]["event_driven"] = {"enabled": True, "wakeup_ms": 50}
+    yield EventDrivenMonitor(config)
+
+
+def test_bcc_monitor_event_driven(event_driven_monitor: EventDrivenMonitor):
+    m = event_driven_monitor
+    assert m.event_driven
+    tracer = m.tracers[0]
+    host = m.bpf_tracers[tracer]
+    handled = threading.Event()
+    host["callback"].append(lambda data: handled.set())
+
+    m.start_polling()
+    with pytest.raises(RuntimeError):
+        m.start_polling()
+    host["queue"].put(tracer.get_dummy_data())
+    # Handled on arrival, not on next poller interval
+    assert handled.wait(timeout=5)
+    # Left in buffer, drained on shutdown
+    host["queue"].put(tracer.get_dummy_data())
+    m.shutdown()
+    assert not m._consumers
+    assert host["queue"].empty()
+    assert m.summary()["EventDrivenMonitor"]["DBCollector"]["queuetracer"]["count"] == 2
+
+
+class RingBuffer:
+    def open_ring_buffer(self, callback):
+        self.callback = callback
+
+
+def test_bcc_tracer_varlen_record():
+    tracer = OpenTracer()
+    # offsetof(struct data_t, fname)
+    assert tracer.record.header.size == 56
+
+    host = {"buffer": RingBuffer()}
+    emitted = []
+    tracer.set_callback(host, emitted.append)
+    for fname in (b"/tmp/a", b"", b"f" * 254):
+        header = struct.pack("=QQIIIIII16s", timestamp, 42, 1, 2, 3, 4, 5, len(fname) + 1, b"dummy")
+        raw = header + fname + b"\0"
+        buf = ctypes.create_string_buffer(raw + b"left from previous events", len(raw) + 25)
+        host["buffer"].callback(None, ctypes.addressof(buf), len(raw))
+        assert emitted.pop() == OpenTracer.data_t(
+            pid=1,
+            uid=2,
+            gid=3,
+            comm="dummy",
+            fname=fname.decode(),
+            timestamp=timestamp,
+            cgroup_id=42,
+            pid_ns=4,
+            mnt_ns=5,
+        )
+
+
+def test_process_tracer():
+    watcher = ProcWatcher()
+    tracer = ProcessTracer({"processtracer": {"exit_delay_s": 0}})
+    host = {"buffer": RingBuffer()}
+    emitted = []
+    tracer.set_callback(host, emitted.append)
+    pid = os.getpid()
+
+    def _send(event, fname, exit_code=0):
+        header = (timestamp, 0, pid, 1, 2, 3, 4, 5, exit_code, event, len(fname) + 1, b"dummy")
+        raw = struct.pack("=QQIIIIIIIII16s", *header)
+        raw += fname + b"\0"
+        buf = ctypes.create_string_buffer(raw, len(raw))
+        host["buffer"].callback(None, ctypes.addressof(buf), len(raw))
+        return emitted.pop()
+
+    assert ProcessTracer().disabled
+    # Cached before exec, root and other namespaces are kept
+    watcher.update(
+        ProcInfo(pid=pid, root="/", exe="/bin/sh", ns={"pid": "pid:[1]", "net": "net:[6]"})
+    )
+    try:
+        assert _send(0, b"python") == ProcessTracer.data_t(
+            pid=pid,
+            ppid=1,
+            uid=2,
+            gid=3,
+            comm="dummy",
+            fname="python",
+            event="exec",
+            exit_code=0,
+            timestamp=timestamp,
+            cgroup_id=0,
+            pid_ns=4,
+            mnt_ns=5,
+        )
+        # Stop watching /proc, the cache is updated by events
+        assert watcher.event_driven and not watcher.thread
+        proc_info = watcher._cache[pid]
+        assert proc_info.cwd == os.getcwd()
+        # Resolved like /proc/{pid}/exe, not the exec'd file name
+        assert proc_info.exe == os.readlink(f"/proc/{pid}/exe")
+        assert proc_info.root == "/"
+        assert proc_info.ns == {"pid": "pid:[4]", "mnt": "mnt:[5]", "net": "net:[6]"}
+
+        data = _send(1, b"", exit_code=1)
+        assert (data.event, data.exit_code, data.fname) == ("exit", 1, "")
+        assert pid not in watcher._cache
+    finally:
+        watcher.event_driven = False
+        watcher._scheduler.remove_job("reconcile")
+        watcher.stop()
 
 
 if __name__ == "__main__":
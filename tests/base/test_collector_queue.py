@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import namedtuple
+
+import pytest
+
+from duetector.collectors.base import Collector
+from duetector.exceptions import ConfigError
+
+data_t = namedtuple("Tracking", ["pid", "uid", "gid", "comm", "fname", "timestamp"])
+
+
+class BlockingCollector(Collector):
+    """
+    Block the only backend worker until ``release`` is set.
+    """
+
+    def __init__(self, config=None, *args, **kwargs):
+        super().__init__(config, *args, **kwargs)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.emitted = []
+
+    def _emit(self, t):
+        self.started.set()
+        self.release.wait(5)
+        self.emitted.append(t.fname)
+
+    def summary(self):
+        return {"queue": self.queue_stats()}
+
+
+def get_data(i):
+    return data_t(pid=os.getpid(), uid=9999, gid=9999, comm="dummy", fname=str(i), timestamp=0)
+
+
+def get_collector(policy, max_size=2, sample_every=2):
+    return BlockingCollector(
+        {
+            "blockingcollector": {
+                "executor": "dedicated",
+                "backend_args": {"max_workers": 1},
+                "queue": {
+                    "max_size": max_size,
+                    "overflow_policy": policy,
+                    "sample_every": sample_every,
+                },
+            }
+        }
+    )
+
+
+def fill(collector, count):
+    futures = [collector.emit("dummy", get_data(0))]
+    # Make sure the first one is running
+    collector.started.wait(5)
+    futures.extend(collector.emit("dummy", get_data(i)) for i in range(1, count))
+    collector.release.set()
+    collector.shutdown()
+    return futures
+
+
+def test_unknown_policy():
+    with pytest.raises(ConfigError):
+        get_collector("unknown")
+
+
+def test_drop_newest():
+    c = get_collector("drop_newest")
+    futures = fill(c, 5)
+    assert [f is None for f in futures] == [False, False, True, True, True]
+    assert c.emitted == ["0", "1"]
+    assert c.queue_stats() == {"queued": 2, "dropped": 3, "pending": 0, "high_water_mark": 2}
+
+
+def test_drop_oldest():
+    c = get_collector("drop_oldest", max_size=3)
+    fill(c, 6)
+    # "0" is running when the queue overflows, so only the waiting ones are dropped
+    assert c.emitted == ["0", "4", "5"]
+    assert c.queue_stats()["dropped"] == 3
+    assert c.queue_stats()["high_water_mark"] == 3
+
+
+def test_sample():
+    c = get_collector("sample", max_size=3, sample_every=2)
+    fill(c, 7)
+    # Overflowing: 3, 4, 5, 6, keep 4 and 6 by dropping 1 and 2
+    assert c.emitted == ["0", "4", "6"]
+    assert c.queue_stats()["dropped"] == 4
+
+
+def test_block():
+    c = get_collector("block", max_size=1)
+    c.emit("dummy", get_data(0))
+    c.started.wait(5)
+    t = threading.Thread(target=c.emit, args=("dummy", get_data(1)))
+    t.start()
+    t.join(0.2)
+    # Blocked until the first one is emitted
+    assert t.is_alive()
+    c.release.set()
+    t.join(5)
+    assert not t.is_alive()
+    c.shutdown()
+    assert c.emitted == ["0", "1"]
+    assert c.queue_stats() == {"queued": 2, "dropped": 0, "pending": 0, "high_water_mark": 1}
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from duetector.exceptions import TracerCompileError
+from duetector.monitors.bcc_monitor import BccMonitor
+from duetector.tools.compile_failure_cache import CompileFailureCache
+
+
+@pytest.fixture
+def compile_failure_cache(tmpdir):
+    yield CompileFailureCache({"compile_failure_cache": {"path": str(tmpdir)}})
+
+
+class DummyBccTracer:
+    prog = "int dummy(void *ctx) { return 0; }"
+    cflags = ["-DRINGBUF_PAGES=16"]
+
+
+def test_compile_failure_cache(compile_failure_cache: CompileFailureCache):
+    key = compile_failure_cache.key(DummyBccTracer.prog, DummyBccTracer.cflags)
+    assert key == compile_failure_cache.key(DummyBccTracer.prog, DummyBccTracer.cflags)
+    assert key != compile_failure_cache.key(DummyBccTracer.prog, ["-DRINGBUF_PAGES=32"])
+    assert key != compile_failure_cache.key(DummyBccTracer.prog + " ", DummyBccTracer.cflags)
+
+    assert compile_failure_cache.get(key) is None
+    assert compile_failure_cache.compile_ms(key) is None
+    compile_failure_cache.put(key, "DummyBccTracer", ok=True, compile_ms=1.0)
+    assert compile_failure_cache.get(key)["ok"]
+    assert compile_failure_cache.compile_ms(key) == 1.0
+    assert compile_failure_cache.known_failure(key) is None
+
+    compile_failure_cache.put(key, "DummyBccTracer", ok=False, compile_ms=1.0, error="boom")
+    assert compile_failure_cache.known_failure(key)["error"] == "boom"
+    assert compile_failure_cache.compile_ms(key) is None
+
+    compile_failure_cache.config._config_dict["failure_ttl_s"] = 0
+    assert compile_failure_cache.known_failure(key) is None
+
+
+def test_compile_skip_known_failure(compile_failure_cache: CompileFailureCache):
+    compiled = []
+
+    error = "Failed to load BPF program b'dummy': Operation not permitted"
+
+    class FailingBPF:
+        def __init__(self, text, cflags):
+            compiled.append(text)
+            raise Exception(error)
+
+    monitor = SimpleNamespace(
+        compile_failure_cache=compile_failure_cache, get_cflags=lambda t: t.cflags
+    )
+    tracer = DummyBccTracer()
+    # Failures depending on the environment are retried
+    for _ in range(2):
+        with pytest.raises(Exception, match="Operation not permitted"):
+            BccMonitor._compile(monitor, tracer, FailingBPF)
+    assert len(compiled) == 2
+
+    error = "Failed to compile BPF module <text>"
+    with pytest.raises(Exception, match="Failed to compile"):
+        BccMonitor._compile(monitor, tracer, FailingBPF)
+    # Known failure is not compiled again
+    with pytest.raises(TracerCompileError, match="Failed to compile"):
+        BccMonitor._compile(monitor, tracer, FailingBPF)
+    assert len(compiled) == 3
+
+    class BPF:
+        def __init__(self, text, cflags):
+            compiled.append(text)
+
+    tracer.prog += "\n"
+    assert isinstance(BccMonitor._compile(monitor, tracer, BPF), BPF)
+    assert len(compiled) == 4
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
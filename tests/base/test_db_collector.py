@@ -1,5 +1,6 @@
 import os
 from collections import namedtuple
+from copy import deepcopy
 
 import pytest
 
@@ -50,14 +51,93 @@ def test_dbcollector(dbcollector: DBCollector, data_t):
                 uid=9999,
                 gid=9999,
                 comm="dummy",
-                cwd=None,
+                cwd=os.getcwd(),
                 fname="dummy.file",
                 dt=datetime,
                 extended={"custom": "dummy-xargs"},
             ),
-        }
+        },
+        "queue": {"queued": 1, "dropped": 0, "pending": 0, "high_water_mark": 1},
     }
 
 
+def test_dbcollector_emit_batch(dbcollector: DBCollector, data_t):
+    dbcollector.emit_batch("dummy", [data_t, data_t]).result()
+    dbcollector.emit_batch("dummy2", [data_t]).result()
+    dbcollector.shutdown()
+    summary = dbcollector.summary()
+    assert summary["dummy"]["count"] == 2
+    assert summary["dummy2"]["count"] == 1
+    assert set(summary) == {"dummy", "dummy2", "queue"}
+    assert summary["queue"]["queued"] == 3
+
+
+@pytest.fixture
+def batch_dbcollector(config):
+    c = deepcopy(config)
+    c["dbcollector"]["batch"] = {"enabled": True, "max_size": 2, "max_age_ms": 60000}
+    dbcollector = DBCollector(c)
+    yield dbcollector
+    dbcollector.shutdown()
+
+
+def test_dbcollector_batch(batch_dbcollector: DBCollector, data_t):
+    futures = [batch_dbcollector.emit("dummy", data_t) for _ in range(3)]
+    # Done when written, the first two are flushed by ``max_size``
+    futures[1].result(timeout=5)
+    assert not futures[2].done()
+    # Summary flushes pending trackings
+    assert batch_dbcollector.summary()["dummy"]["count"] == 3
+    assert futures[2].done()
+
+    batch_dbcollector.emit("dummy", data_t)
+    batch_dbcollector.shutdown()
+    assert batch_dbcollector.summary()["dummy"]["count"] == 4
+    assert batch_dbcollector.queue_stats()["pending"] == 0
+
+
+def test_dbcollector_batch_overflow(config, data_t):
+    c = deepcopy(config)
+    c["dbcollector"]["batch"] = {"enabled": True, "max_size": 1024, "max_age_ms": 60000}
+    c["dbcollector"]["queue"] = {"max_size": 2, "overflow_policy": "drop_newest"}
+    dbcollector = DBCollector(c)
+    try:
+        # Pending trackings of the writer count in the queue until written
+        assert dbcollector.emit("dummy", data_t)
+        assert dbcollector.emit_batch("dummy", [data_t])
+        assert dbcollector.emit("dummy", data_t) is None
+        assert dbcollector.queue_stats()["dropped"] == 1
+
+        dbcollector.flush()
+        assert dbcollector.queue_stats()["pending"] == 0
+        assert dbcollector.emit("dummy", data_t)
+    finally:
+        dbcollector.shutdown()
+    assert dbcollector.summary()["dummy"]["count"] == 3
+
+
+def test_dbcollector_batch_failures(batch_dbcollector: DBCollector, data_t, monkeypatch):
+    def _(tracer, rows):
+        raise RuntimeError("disk full")
+
+    # Failed writes fail their futures
+    with monkeypatch.context() as m:
+        m.setattr(batch_dbcollector, "_write_batch", _)
+        future = batch_dbcollector.emit("dummy", data_t)
+        batch_dbcollector.flush()
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+
+    # Dead writer fails pending and later trackings, flush and shutdown do not block
+    future = batch_dbcollector.emit("dummy", data_t)
+    batch_dbcollector._queue.put("crash the writer")
+    batch_dbcollector._writer.join(timeout=5)
+    assert not batch_dbcollector._writer.is_alive()
+    assert isinstance(future.exception(timeout=5), RuntimeError)
+    assert isinstance(batch_dbcollector.emit("dummy", data_t).exception(timeout=5), RuntimeError)
+    batch_dbcollector.flush()
+    batch_dbcollector.shutdown()
+    assert batch_dbcollector.queue_stats()["pending"] == 0
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 from collections import namedtuple
 
 import pytest
@@ -83,6 +85,103 @@ def test_filter(pattern_filter, data_args, passed):
         assert pattern_filter(data) == None
 
 
+def test_required_fields(pattern_filter):
+    # Empty ``re_exclude_comm`` and ``exclude_pid`` are skipped
+    assert pattern_filter.required_fields == {
+        "fname",
+        "uid",
+        "gid",
+        "custom",
+        "gcustom",
+    }
+
+
+def test_rule_plan(pattern_filter):
+    plan = pattern_filter.rule_plan
+    assert plan is pattern_filter.rule_plan
+    assert not plan.ignore_pids
+    assert PatternFilter().rule_plan.ignore_pids == frozenset({os.getpid()})
+    assert dict((f, ints) for f, ints, _ in plan.exclude)["uid"] == frozenset({0})
+    # Default ``re_exclude_fname`` is combined into one pattern
+    assert len(dict(plan.re_exclude)["fname"]) == 1
+
+    data = data_t(**{**passed, "custom": "keep"})
+    assert pattern_filter(data) == data
+    pattern_filter.config._config_dict["exclude_custom"] = ["keep"]
+    # In place modification needs reload
+    assert pattern_filter(data) == data
+    assert pattern_filter.reload_rules() is not plan
+    assert pattern_filter(data) == None
+
+
+def test_compile_patterns():
+    assert len(PatternFilter._compile_patterns(["a", "b"])) == 1
+    # Backreference and global flags can't be combined
+    assert len(PatternFilter._compile_patterns(["(a)\\1", "b"])) == 2
+    assert len(PatternFilter._compile_patterns(["a", "(?i)b"])) == 2
+    assert PatternFilter._int_values(frozenset({"0", "01", "x", "-1"})) == frozenset({0, -1})
+
+
+def test_kernel_rules(pattern_filter):
+    rules = pattern_filter.kernel_rules()
+    assert rules.uids == rules.gids == frozenset({0})
+    assert not rules.pids and not rules.tgids
+    # ``/re/*`` is a regex, left to ``filter``
+    assert rules.path_prefixes == {
+        "/proc",
+        "/sys",
+        "/lib",
+        "/dev",
+        "/run",
+        "/usr/lib",
+        "/etc/ld.so.cache",
+    }
+    # Every event dropped in kernel is dropped by ``filter`` too
+    for prefix in rules.path_prefixes:
+        assert pattern_filter(data_t(**{**passed, "fname": prefix + "/x"})) is None
+
+    assert PatternFilter().kernel_rules().tgids == frozenset({os.getpid()})
+    # Not changed until rules are recompiled
+    assert pattern_filter.kernel_rules() is rules
+    pattern_filter.config._config_dict["re_exclude_fname"] = ["^/tmp/a", "/home/.*", "relative"]
+    pattern_filter.reload_rules()
+    assert pattern_filter.kernel_rules().path_prefixes == {"/tmp/a"}
+
+
+def test_ignore_agent_threads():
+    pattern_filter = PatternFilter()
+    tgid = os.getpid()
+    thread = threading.Thread(target=time.sleep, args=(0.5,))
+    thread.start()
+    try:
+        # ``pid`` of events is a thread id, all threads of the agent are dropped as in kernel
+        assert tgid in pattern_filter.kernel_rules().tgids
+        assert pattern_filter(data_t(**{**passed, "pid": thread.native_id})) is None
+        assert pattern_filter(data_t(**{**passed, "pid": tgid})) is None
+        data = data_t(**{**passed, "pid": 2**22 + 1})
+        assert pattern_filter(data) == data
+    finally:
+        thread.join()
+
+
+def test_batch_capable_hook(full_config):
+    from duetector.extension.filter import hookimpl
+
+    manager = FilterManager(full_config)
+    (f,) = manager.init()
+    assert not f.batch_capable
+
+    class Plugin:
+        @hookimpl
+        def batch_capable(obj):
+            return isinstance(obj, PatternFilter) or None
+
+    manager.register(Plugin)
+    (f,) = manager.init()
+    assert f.batch_capable
+    assert not PatternFilter.batch_capable
+
+
 @pytest.fixture
 def config_loader(full_config_file):
     yield ConfigLoader(full_config_file, load_env=True)
@@ -0,0 +1,86 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from duetector.collectors.base import DequeCollector
+from duetector.exceptions import ConfigError
+from duetector.tools.scheduler import InlineExecutor, Scheduler
+from duetector.utils import Singleton
+
+data_t = namedtuple("Tracking", ["pid", "uid", "gid", "comm", "fname", "timestamp"])
+
+
+@pytest.fixture
+def scheduler():
+    previous = Singleton._instances.pop(Scheduler, None)
+    s = Scheduler({"scheduler": {"max_workers": 8, "poll_workers": 2}})
+    yield s
+    s.shutdown()
+    Singleton._instances.pop(Scheduler, None)
+    if previous:
+        Singleton._instances[Scheduler] = previous
+
+
+def test_singleton(scheduler):
+    assert Scheduler() is scheduler
+    assert Scheduler({"scheduler": {"max_workers": 1}}).max_workers == 8
+
+
+def test_inline_executor():
+    f = InlineExecutor().submit(lambda x: x + 1, 1)
+    assert f.done() and f.result() == 2
+    f = InlineExecutor().submit(lambda: 1 / 0)
+    assert isinstance(f.exception(), ZeroDivisionError)
+
+
+def test_budget(scheduler: Scheduler):
+    dedicated = scheduler.get_executor("dedicated", dedicated_workers=3)
+    assert isinstance(dedicated, ThreadPoolExecutor)
+    assert scheduler.reserved_workers == 3
+
+    poll = scheduler.get_executor("pooled", lane="poll")
+    emit = scheduler.get_executor("pooled", lane="emit")
+    assert poll is scheduler.get_executor("pooled", lane="poll")
+    assert emit is not poll
+    # 8 - 2 for poll - 3 for dedicated
+    assert scheduler.stats() == {
+        "max_workers": 8,
+        "workers": 8,
+        "pools": {"poll": 2, "emit": 3},
+        "dedicated": 3,
+    }
+
+    # Blocking lane is out of the budget
+    blocking = scheduler.get_executor("pooled", lane="blocking")
+    assert blocking is not poll
+    assert scheduler.stats()["workers"] == 8
+    assert scheduler.stats()["pools"]["blocking"] == 4
+
+    scheduler.release(emit)
+    assert emit.submit(lambda: 1).result() == 1
+    scheduler.release(dedicated)
+    assert scheduler.reserved_workers == 0
+    with pytest.raises(RuntimeError):
+        dedicated.submit(lambda: 1)
+
+    with pytest.raises(ConfigError):
+        scheduler.get_executor("unknown")
+
+
+def test_inline_collector(scheduler: Scheduler):
+    c = DequeCollector({"dequecollector": {"disabled": False}})
+    assert c.executor == "inline"
+    data = data_t(pid=os.getpid(), uid=0, gid=0, comm="dummy", fname="f", timestamp=0)
+    assert c.emit("dummy", data) is None
+    # Emitted in caller's thread
+    assert len(c._trackings["dummy"]) == 1
+    assert c.queue_stats()["queued"] == 1
+    c.shutdown()
+    # No pool is created for inline collector
+    assert not scheduler.stats()["pools"]
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from duetector.tools.timer_wheel import TimerWheel
+
+
+@pytest.fixture
+def wheel():
+    w = TimerWheel(tick_s=0.01, slots=8)
+    yield w
+    w.stop()
+
+
+def test_timer_wheel(wheel: TimerWheel):
+    fired = []
+    done = threading.Event()
+
+    wheel.schedule(0.05, "a", lambda: fired.append("a"))
+    # More than one round of the wheel
+    wheel.schedule(0.2, "b", lambda: (fired.append("b"), done.set()))
+    wheel.schedule(0.03, "c", lambda: fired.append("c"))
+    # Replaced by scheduling the key again
+    wheel.schedule(0.1, "a", lambda: fired.append("a2"))
+    wheel.schedule(0.01, "d", lambda: fired.append("d"))
+    assert wheel.cancel("d")
+    assert not wheel.cancel("d")
+    assert len(wheel) == 3 and "b" in wheel
+
+    assert done.wait(timeout=5)
+    assert fired == ["c", "a2", "b"]
+    assert not len(wheel)
+
+
+def test_timer_wheel_stop(wheel: TimerWheel):
+    fired = []
+    wheel.schedule(0.5, "a", lambda: fired.append("a"))
+    wheel.stop()
+    assert not len(wheel)
+    # Restarted by scheduling
+    done = threading.Event()
+    wheel.schedule(0.01, "b", done.set)
+    assert done.wait(timeout=5)
+    assert not fired
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
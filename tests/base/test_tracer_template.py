@@ -37,7 +37,11 @@ def test_get_wrap_tracer():
         "sh", "tracer_name", {"comm": ["ps", "-aux"], "config": {"enable_cache": False}}
     )
     assert isinstance(tracer, ShellTracer)
-    assert tracer.config._config_dict == {"disabled": False, "enable_cache": False}
+    assert tracer.config._config_dict == {
+        "disabled": False,
+        "resolve_cwd": True,
+        "enable_cache": False,
+    }
     assert tracer.comm == ["ps", "-aux"]
 
 
@@ -0,0 +1,95 @@
+import json
+import os
+from collections import namedtuple
+
+import pydantic
+import pytest
+
+from duetector.collectors.models import Tracking, TrackingRecord
+from duetector.utils import get_boot_time_duration_ns
+
+timestamp = 13205215231927
+
+data_t = namedtuple("Tracking", ["pid", "uid", "gid", "comm", "fname", "timestamp", "custom"])
+
+
+@pytest.fixture
+def tracking():
+    yield Tracking.from_namedtuple(
+        "dummy",
+        data_t(
+            pid=os.getpid(),
+            uid=9999,
+            gid=9999,
+            comm="dummy",
+            fname="dummy.file",
+            timestamp=timestamp,
+            custom="dummy-xargs",
+        ),
+    )
+
+
+def test_tracking_cwd(tracking: Tracking):
+    assert tracking.cwd == os.getcwd()
+
+
+def test_tracking_without_cwd():
+    class Tracer:
+        name = "dummy"
+        resolve_cwd = False
+
+    t = Tracking.from_namedtuple(Tracer(), data_t(os.getpid(), 0, 0, "dummy", "f", timestamp, ""))
+    assert t.cwd is None
+
+
+def test_tracking_immutable(tracking: Tracking):
+    with pytest.raises(pydantic.ValidationError):
+        tracking.pid = 1
+
+
+def test_tracking_cached_forms(tracking: Tracking):
+    assert tracking.as_dict is tracking.as_dict
+    assert tracking.as_dict == tracking.model_dump()
+    assert tracking.as_json is tracking.as_json
+    assert json.loads(tracking.as_json)["extended"] == {"custom": "dummy-xargs"}
+
+    attributes = tracking.span_attributes
+    assert attributes is tracking.span_attributes
+    assert attributes["timestamp"] == get_boot_time_duration_ns(timestamp).timestamp()
+    assert attributes["custom"] == "dummy-xargs"
+    assert "tracer" not in attributes
+
+
+def test_tracking_record(tracking: Tracking):
+    data = data_t(os.getpid(), 9999, 9999, "dummy", "dummy.file", timestamp, "dummy-xargs")
+    r = TrackingRecord.from_namedtuple("Dummy", data)
+    assert r.tracer == "dummy"
+    # Raw timestamp is kept until converted
+    assert r.timestamp == timestamp
+    assert r.extended == {"custom": "dummy-xargs"}
+    assert not hasattr(r, "__dict__")
+
+    t = r.to_tracking()
+    assert t is r.to_tracking()
+    assert t == tracking
+    assert t.dt == get_boot_time_duration_ns(timestamp)
+
+
+def test_tracking_record_normalize_field(monkeypatch):
+    normalize_field = Tracking.normalize_field
+
+    def _(field, data):
+        if field == "custom":
+            return "fname", data
+        return normalize_field(field, data)
+
+    # Fields are normalized by ``Tracking.normalize_field`` on conversion
+    monkeypatch.setattr(Tracking, "normalize_field", _)
+    data = data_t(os.getpid(), 9999, 9999, "dummy", None, timestamp, "custom.file")
+    t = TrackingRecord.from_namedtuple("Dummy", data).to_tracking()
+    assert t.fname == "custom.file"
+    assert t.extended == {}
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])